@@ -10,6 +10,7 @@ import os
 import sys
 import warnings
 
+from numba import config as numba_config
 from numba import jit as numba_jit
 from numba import NumbaDeprecationWarning
 from numpy import (
@@ -20,7 +21,7 @@ from numpy import (
     complex64, complex128, complex256,
 )
 import numpy as np
-from pint import UnitRegistry
+from pint import UnitRegistry, set_application_registry
 
 from ._version import get_versions
 
@@ -83,6 +84,10 @@ __version__ = get_versions()['version']
 ureg = UnitRegistry() # pylint: disable=invalid-name
 """Single Pint unit registry that should be used by all PISA code"""
 
+# Unpickled quantities are attached to Pint's application registry, so make
+# that ours
+set_application_registry(ureg)
+
 Q_ = ureg.Quantity # pylint: disable=invalid-name
 """Shortcut for Quantity that uses central PISA Pint unit regeistry"""
 
@@ -92,7 +97,7 @@ CACHE_DIR = '~/.cache/pisa'
 """Root directory for storing PISA cache files"""
 
 # message later on written to stderr for user convenience
-ini_msgs = [] # pylint: disable=invalid-name
+_ini_msgs = []
 
 # PISA users can define cache directory directly via PISA_CACHE_DIR env var;
 # PISA_CACHE_DIR has priority over XDG_CACHE_HOME, so it is checked first
@@ -112,6 +117,8 @@ CACHE_DIR = os.path.expanduser(os.path.expandvars(CACHE_DIR))
 # `PISA_CACHE_DIR/numba` for caching Numba's compiled objects
 if 'NUMBA_CACHE_DIR' not in os.environ:
     os.environ['NUMBA_CACHE_DIR'] = os.path.join(CACHE_DIR, 'numba')
+    # Numba has read its env vars upon import above, so make it re-read them
+    numba_config.reload_config()
 
 
 # Default to single thread, then try to read from env
@@ -126,26 +133,6 @@ if 'OMP_NUM_THREADS' in os.environ:
 # Get SmartArray DeprecationWarning out of the way silently
 warnings.filterwarnings("ignore", category=NumbaDeprecationWarning)
 
-NUMBA_CUDA_AVAIL = False
-def dummy_func(x):
-    """Decorate to to see if Numba actually works"""
-    x += 1
-
-try:
-    from numba import cuda
-    assert cuda.gpus, 'No GPUs detected'
-    cuda.jit('void(float64)')(dummy_func)
-except Exception:
-    pass
-else:
-    NUMBA_CUDA_AVAIL = True
-finally:
-    if 'cuda' in globals() or 'cuda' in locals():
-        if NUMBA_CUDA_AVAIL:
-            cuda.close()
-        del cuda
-del dummy_func
-
 # Default values for float, complex types
 FTYPE = np.float64
 """Global floating-point data type. C, CUDA, and Numba datatype definitions are
@@ -160,7 +147,7 @@ FLOAT32_STRINGS = ['single', 'float32', 'fp32', '32', 'f4']
 FLOAT64_STRINGS = ['double', 'float64', 'fp64', '64', 'f8']
 if 'PISA_FTYPE' in os.environ:
     PISA_FTYPE = os.environ['PISA_FTYPE']
-    ini_msgs.append('PISA_FTYPE env var is defined as: "%s"' % PISA_FTYPE)
+    _ini_msgs.append('PISA_FTYPE env var is defined as: "%s"' % PISA_FTYPE)
     if PISA_FTYPE.strip().lower() in FLOAT32_STRINGS:
         FTYPE = np.float32
         CTYPE = np.complex64
@@ -177,47 +164,6 @@ if 'PISA_FTYPE' in os.environ:
 ITYPE = np.int32 if FTYPE == np.float32 else np.int64
 del FLOAT32_STRINGS, FLOAT64_STRINGS
 
-# set default target
-if NUMBA_CUDA_AVAIL:
-    TARGET = 'cuda'
-else:
-    TARGET = 'cpu'
-
-cpu_targets = ['cpu', 'numba'] # pylint: disable=invalid-name
-parallel_targets = ['parallel', 'multicore'] # pylint: disable=invalid-name
-gpu_targets = ['cuda', 'gpu', 'numba-cuda'] # pylint: disable=invalid-name
-
-# ignore PISA_TARGET env var if no numba support at all available
-if TARGET is not None and 'PISA_TARGET' in os.environ:
-    PISA_TARGET = os.environ['PISA_TARGET']
-    ini_msgs.append('PISA_TARGET env var is defined as: "%s"' % PISA_TARGET)
-    try_target = PISA_TARGET.strip().lower() # pylint: disable=invalid-name
-    if try_target in gpu_targets:
-        if NUMBA_CUDA_AVAIL:
-            TARGET = 'cuda'
-        else:
-            raise ValueError(
-                'Environment var PISA_TARGET="%s" set, even though numba-cuda'
-                ' is not available\n'%(PISA_TARGET)
-            )
-    elif try_target in cpu_targets or try_target in parallel_targets:
-        if try_target in cpu_targets:
-            TARGET = 'cpu'
-        elif try_target in parallel_targets:
-            TARGET = 'parallel'
-    else:
-        raise ValueError(
-            'Environment var PISA_TARGET="%s" is unrecognized.\n'
-            '--> For cpu set PISA_TARGET to one of %s\n'
-            '--> For parallel set PISA_TARGET to one of %s\n'
-            '--> For gpu set PISA_TARGET to one of %s\n'
-            %(PISA_TARGET, cpu_targets, parallel_targets, gpu_targets)
-        )
-    del try_target
-
-del cpu_targets, gpu_targets, parallel_targets
-
-
 # Define HASH_SIGFIGS to set hashing precision based on FTYPE above; value here
 # is default (i.e. for FTYPE == np.float64)
 HASH_SIGFIGS = 12
@@ -262,22 +208,106 @@ elif FTYPE == np.float64:
 else:
     raise ValueError('FTYPE must be one of `np.float32` or `np.float64`. Got'
                      ' %s instead.' %FTYPE)
-ini_msgs.append(ftype_msg)
+_ini_msgs.append(ftype_msg)
 del ftype_msg
 
-if TARGET is None:
-    target_msg = 'numba is not present' # pylint: disable=invalid-name
-elif TARGET == 'cpu':
-    target_msg = 'numba is running on CPU (single core)' # pylint: disable=invalid-name
-elif TARGET == 'parallel':
-    target_msg = 'numba is running on CPU (multicore)' # pylint: disable=invalid-name
-elif TARGET == 'cuda':
-    target_msg = 'numba is running on GPU' # pylint: disable=invalid-name
-ini_msgs.append(target_msg)
-del target_msg
 
-sys.stderr.write("<< "+"; ".join(ini_msgs)+" >>\n")
-del ini_msgs
+def _dummy_func(x):
+    """Decorate to to see if Numba actually works"""
+    x += 1
+
+
+def _probe_numba_cuda():
+    """Set and return `NUMBA_CUDA_AVAIL`, i.e. whether Numba can compile a
+    (dummy) function for a CUDA GPU"""
+    # pylint: disable=global-variable-undefined, import-outside-toplevel
+    global NUMBA_CUDA_AVAIL
+    if 'NUMBA_CUDA_AVAIL' in globals():
+        return NUMBA_CUDA_AVAIL
+
+    NUMBA_CUDA_AVAIL = False
+    try:
+        from numba import cuda
+        assert cuda.gpus, 'No GPUs detected'
+        cuda.jit('void(float64)')(_dummy_func)
+    except Exception:
+        pass
+    else:
+        NUMBA_CUDA_AVAIL = True
+        cuda.close()
+    return NUMBA_CUDA_AVAIL
+
+
+def _init_target():
+    """Set `TARGET` and write the start-up message to stderr.
+
+    Probing for CUDA can take seconds (initializing the driver and compiling a
+    dummy kernel), so this is deferred until `TARGET` is first accessed (see
+    `__getattr__`), and the probe is skipped if PISA_TARGET requests a CPU
+    target.
+
+    """
+    # pylint: disable=global-variable-undefined, invalid-name
+    global TARGET
+
+    cpu_targets = ['cpu', 'numba']
+    parallel_targets = ['parallel', 'multicore']
+    gpu_targets = ['cuda', 'gpu', 'numba-cuda']
+
+    if 'PISA_TARGET' not in os.environ:
+        TARGET = 'cuda' if _probe_numba_cuda() else 'cpu'
+    else:
+        PISA_TARGET = os.environ['PISA_TARGET']
+        _ini_msgs.append('PISA_TARGET env var is defined as: "%s"' % PISA_TARGET)
+        try_target = PISA_TARGET.strip().lower()
+        if try_target in gpu_targets:
+            if _probe_numba_cuda():
+                TARGET = 'cuda'
+            else:
+                raise ValueError(
+                    'Environment var PISA_TARGET="%s" set, even though numba-cuda'
+                    ' is not available\n'%(PISA_TARGET)
+                )
+        elif try_target in cpu_targets:
+            TARGET = 'cpu'
+        elif try_target in parallel_targets:
+            TARGET = 'parallel'
+        else:
+            raise ValueError(
+                'Environment var PISA_TARGET="%s" is unrecognized.\n'
+                '--> For cpu set PISA_TARGET to one of %s\n'
+                '--> For parallel set PISA_TARGET to one of %s\n'
+                '--> For gpu set PISA_TARGET to one of %s\n'
+                %(PISA_TARGET, cpu_targets, parallel_targets, gpu_targets)
+            )
+
+    if TARGET == 'cpu':
+        target_msg = 'numba is running on CPU (single core)'
+    elif TARGET == 'parallel':
+        target_msg = 'numba is running on CPU (multicore)'
+    elif TARGET == 'cuda':
+        target_msg = 'numba is running on GPU'
+    _ini_msgs.append(target_msg)
+
+    sys.stderr.write("<< "+"; ".join(_ini_msgs)+" >>\n")
+
+
+def __getattr__(name):
+    """Resolve `NUMBA_CUDA_AVAIL` and `TARGET` upon first access"""
+    if name == 'NUMBA_CUDA_AVAIL':
+        return _probe_numba_cuda()
+    if name == 'TARGET':
+        _init_target()
+        return TARGET
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+# Module-level `__getattr__` (PEP 562) requires Python >= 3.7, so resolve the
+# deferred names at import time on older versions
+if sys.version_info < (3, 7):
+    _init_target()
+    _probe_numba_cuda()
+
 
 # Clean up imported names
-del os, sys, np, UnitRegistry, get_versions
+del np, numba_config, UnitRegistry, get_versions
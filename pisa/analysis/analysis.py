@@ -24,6 +24,7 @@ from pisa.core.param import ParamSet
 from pisa.utils.comparisons import recursiveEquality
 from pisa.utils.log import logging
 from pisa.utils.fileio import to_file
+from pisa.utils.profiler import TIMINGS
 from pisa.utils.stats import METRICS_TO_MAXIMIZE, METRICS_TO_MINIMIZE
 
 
@@ -1137,20 +1138,21 @@ class Analysis(object):
         # Assess the fit: whether the data came from the hypo_asimov_dist
         #
         try:
-            if isinstance(hypo_maker, Detectors):
-                metric_val = 0
-                for i in range(len(hypo_maker._distribution_makers)):
-                    data = data_dist[i].metric_total(expected_values=hypo_asimov_dist[i],
-                                                  metric=metric[i], metric_kwargs=metric_kwargs)
-                    metric_val += data
-                priors = hypo_maker.params.priors_penalty(metric=metric[0]) # uses just the "first" metric for prior
-                metric_val += priors
-            else: # DistributionMaker object
-                metric_val = (
-                    data_dist.metric_total(expected_values=hypo_asimov_dist,
-                                               metric=metric[0], metric_kwargs=metric_kwargs)
-                        + hypo_maker.params.priors_penalty(metric=metric[0])
-                    )
+            with TIMINGS.time('analysis.metric'):
+                if isinstance(hypo_maker, Detectors):
+                    metric_val = 0
+                    for i in range(len(hypo_maker._distribution_makers)):
+                        data = data_dist[i].metric_total(expected_values=hypo_asimov_dist[i],
+                                                      metric=metric[i], metric_kwargs=metric_kwargs)
+                        metric_val += data
+                    priors = hypo_maker.params.priors_penalty(metric=metric[0]) # uses just the "first" metric for prior
+                    metric_val += priors
+                else: # DistributionMaker object
+                    metric_val = (
+                        data_dist.metric_total(expected_values=hypo_asimov_dist,
+                                                   metric=metric[0], metric_kwargs=metric_kwargs)
+                            + hypo_maker.params.priors_penalty(metric=metric[0])
+                        )
         except Exception as e:
             if blind:
                 logging.error('Minimizer failed')
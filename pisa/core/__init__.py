@@ -1,12 +1,54 @@
 # Useful for interactive sessions to be able to say `from pisa.core import *`
 # (though this is discouraged for any script; use instead full, explicit paths
 # in imports)
-from .binning import *
-from .distribution_maker import *
-from .events import *
-from .map import *
-from .param import *
-from .pipeline import *
-from .prior import *
-from .stage import *
-from .transform import *
+#
+# NOTE: The submodules are only imported once any of their names is requested
+# from `pisa.core` (including by `from pisa.core import *`), such that e.g.
+# `import pisa.core.binning` does not pull in pipelines, stages, and all of
+# their dependencies. (Module-level `__getattr__` requires Python >= 3.7; on
+# older versions, the submodules are imported eagerly.)
+
+from importlib import import_module
+import sys
+
+
+_SUBMODULES = (
+    'binning',
+    'distribution_maker',
+    'events',
+    'map',
+    'param',
+    'pipeline',
+    'prior',
+    'stage',
+    'transform',
+)
+
+
+def _import_submodules():
+    """Import all of `_SUBMODULES` and their public names into this namespace;
+    return the list of those names"""
+    names = []
+    for submodule in _SUBMODULES:
+        module = import_module('.' + submodule, __name__)
+        for name in module.__all__:
+            globals()[name] = getattr(module, name)
+        names.extend(module.__all__)
+    return names
+
+
+def __getattr__(name):
+    """Import submodules upon first access of any of their public names"""
+    if name.startswith('__') and name != '__all__':
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    names = _import_submodules()
+    globals()['__all__'] = names
+    if name == '__all__':
+        return names
+    if name in names:
+        return globals()[name]
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if sys.version_info < (3, 7):
+    __all__ = _import_submodules()
@@ -28,9 +28,9 @@ from numba import guvectorize, SmartArray
 
 from pisa import FTYPE, TARGET
 from pisa.core.binning import OneDimBinning, MultiDimBinning
-from pisa.core.translation import find_index
+from pisa.core.translation import bin_descriptor, find_index_fast
 from pisa.utils.log import logging, set_verbosity
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 
 
 __all__ = ["lookup_indices", "test_lookup_indices"]
@@ -40,25 +40,30 @@ FX = "f4" if FTYPE == np.float32 else "f8"
 
 
 @guvectorize(
-    [f"({FX}[:], {FX}[:], i8[:])"],
-    "(), (j) -> ()",
+    [f"({FX}[:], {FX}[:], {FX}[:], i8[:])"],
+    "(), (j), (n) -> ()",
     target=TARGET,
+    cache=CACHE,
 )
-def lookup_indices_vectorized_1d(sample_x, bin_edges_x, out):
+def lookup_indices_vectorized_1d(sample_x, bin_edges_x, descr_x, out):
     """Lookup bin indices for sample_x values, where binning is defined by
-    `bin_edges_x`."""
-    out[0] = find_index(sample_x[0], bin_edges_x)
+    `bin_edges_x` (and described by `descr_x`, see
+    `pisa.core.translation.bin_descriptor`)."""
+    out[0] = find_index_fast(sample_x[0], bin_edges_x, descr_x)
 
 
 @guvectorize(
-    [f"({FX}[:], {FX}[:], {FX}[:], {FX}[:], i8[:])"],
-    "(), (), (a), (b) -> ()",
+    [f"({FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], i8[:])"],
+    "(), (), (a), (b), (n), (n) -> ()",
     target=TARGET,
+    cache=CACHE,
 )
-def lookup_indices_vectorized_2d(sample_x, sample_y, bin_edges_x, bin_edges_y, out):
+def lookup_indices_vectorized_2d(
+    sample_x, sample_y, bin_edges_x, bin_edges_y, descr_x, descr_y, out
+):
     """Same as above, except we get back the index"""
-    idx_x = find_index(sample_x[0], bin_edges_x)
-    idx_y = find_index(sample_y[0], bin_edges_y)
+    idx_x = find_index_fast(sample_x[0], bin_edges_x, descr_x)
+    idx_y = find_index_fast(sample_y[0], bin_edges_y, descr_y)
 
     n_x_bins = len(bin_edges_x) - 1
     n_y_bins = len(bin_edges_y) - 1
@@ -75,17 +80,30 @@ def lookup_indices_vectorized_2d(sample_x, sample_y, bin_edges_x, bin_edges_y, o
 
 
 @guvectorize(
-    [f"({FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], i8[:])"],
-    "(), (), (), (a), (b), (c) -> ()",
+    [
+        f"({FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], "
+        f"{FX}[:], {FX}[:], i8[:])"
+    ],
+    "(), (), (), (a), (b), (c), (n), (n), (n) -> ()",
     target=TARGET,
+    cache=CACHE,
 )
 def lookup_indices_vectorized_3d(
-    sample_x, sample_y, sample_z, bin_edges_x, bin_edges_y, bin_edges_z, out
+    sample_x,
+    sample_y,
+    sample_z,
+    bin_edges_x,
+    bin_edges_y,
+    bin_edges_z,
+    descr_x,
+    descr_y,
+    descr_z,
+    out,
 ):
     """Vectorized gufunc to perform the lookup"""
-    idx_x = find_index(sample_x[0], bin_edges_x)
-    idx_y = find_index(sample_y[0], bin_edges_y)
-    idx_z = find_index(sample_z[0], bin_edges_z)
+    idx_x = find_index_fast(sample_x[0], bin_edges_x, descr_x)
+    idx_y = find_index_fast(sample_y[0], bin_edges_y, descr_y)
+    idx_z = find_index_fast(sample_z[0], bin_edges_z, descr_z)
 
     n_x_bins = len(bin_edges_x) - 1
     n_y_bins = len(bin_edges_y) - 1
@@ -155,8 +173,9 @@ def lookup_indices(sample, binning):
     lookup_func_args = (
         [a.get(WHERE) for a in sample]
         + [SmartArray(dim.edge_magnitudes.astype(FTYPE)).get(WHERE) for dim in binning]
+        + [SmartArray(bin_descriptor(dim)).get(WHERE) for dim in binning]
     )
-    logging.trace("lookup_func_args = {}".format(lookup_func_args))
+    logging.trace("lookup_func_args = %s", lookup_func_args)
 
     # Create an array to store the results
     indices = SmartArray(np.empty_like(sample[0], dtype=np.int64))
@@ -31,16 +31,17 @@ import re
 import numpy as np
 
 from pisa import FTYPE, HASH_SIGFIGS, ureg
+from pisa.utils.cache import MemoryCache
 from pisa.utils.comparisons import interpret_quantity, normQuant, recursiveEquality
 from pisa.utils.comparisons import ALLCLOSE_KW
 from pisa.utils.format import (make_valid_python_name, text2tex,
                                strip_outer_dollars)
 from pisa.utils.hash import hash_obj
 from pisa.utils import jsons
-from pisa.utils.log import logging, set_verbosity, tprofile
+from pisa.utils.log import Lazy, logging, set_verbosity, tprofile
 
 
-__all__ = ['NAME_FIXES', 'NAME_SEPCHARS', 'NAME_FIXES_REGEXES',
+__all__ = ['NAME_FIXES', 'NAME_SEPCHARS', 'NAME_FIXES_REGEXES', 'DERIVED_CACHE',
            'basename', '_new_obj', 'is_binning',
            'OneDimBinning', 'MultiDimBinning',
            'test_OneDimBinning', 'test_MultiDimBinning']
@@ -70,6 +71,11 @@ NAME_FIXES_REGEXES = tuple(
     + [re.compile(p, re.IGNORECASE) for p in NAME_FIXES]
 )
 
+DERIVED_CACHE = MemoryCache(max_depth=256, is_lru=True, freeze=True)
+"""Arrays derived from binnings (e.g. meshgrids and bin volumes) keyed by the
+binning's hash and units, such that these are computed only once for equal binnings.
+Arrays are stored without units and are read-only."""
+
 
 # TODO: move this to a centralized utils location
 def basename(n):
@@ -139,6 +145,13 @@ def _new_obj(original_function):
     return new_function
 
 
+def _read_only(quantity):
+    """Make the magnitude of `quantity` read-only (for values that are derived
+    from and cached within a binning) and return `quantity`"""
+    quantity.magnitude.setflags(write=False)
+    return quantity
+
+
 class OneDimBinning(object):
     # pylint: disable=line-too-long
     """Histogram-oriented binning specialized to a single dimension.
@@ -890,7 +903,9 @@ class OneDimBinning(object):
         """array : Midpoints of the bins: linear average of each bin's
         edges."""
         if self._midpoints is None:
-            self._midpoints = (self.bin_edges[:-1] + self.bin_edges[1:])/2.0
+            self._midpoints = _read_only(
+                (self.bin_edges[:-1] + self.bin_edges[1:])/2.0
+            )
         return self._midpoints
 
     @property
@@ -900,8 +915,9 @@ class OneDimBinning(object):
         the same `midpoints`, whereas in all other cases, it is identical."""
         if self._weighted_centers is None:
             if self.is_log:
-                self._weighted_centers = np.sqrt(self.bin_edges[:-1] *
-                                                 self.bin_edges[1:])
+                self._weighted_centers = _read_only(
+                    np.sqrt(self.bin_edges[:-1] * self.bin_edges[1:])
+                )
             else:
                 self._weighted_centers = self.midpoints
         return self._weighted_centers
@@ -970,7 +986,9 @@ class OneDimBinning(object):
     def bin_widths(self):
         """Absolute widths of bins."""
         if self._bin_widths is None:
-            self._bin_widths = np.abs(np.diff(self.bin_edges.m)) * self.units
+            self._bin_widths = _read_only(
+                np.abs(np.diff(self.bin_edges.m)) * self.units
+            )
         return self._bin_widths
 
     @property
@@ -978,9 +996,10 @@ class OneDimBinning(object):
         """Absolute widths of bins."""
         if self._weighted_bin_widths is None:
             if self.is_log:
-                self._weighted_bin_widths = (
+                self._weighted_bin_widths = _read_only(
                     np.log(self.edge_magnitudes[1:] / self.edge_magnitudes[:-1])
-                ) * ureg.dimensionless
+                    * ureg.dimensionless
+                )
             else:
                 self._weighted_bin_widths = self.bin_widths
         return self._weighted_bin_widths
@@ -1176,7 +1195,8 @@ class OneDimBinning(object):
 
         logging.trace('self.bin_edges not a subset of other.bin_edges')
         logging.trace('Bins in this map not found in other = %s',
-                      my_normed_bin_edges.difference(other_normed_bin_edges))
+                      Lazy(my_normed_bin_edges.difference,
+                           other_normed_bin_edges))
 
         return False
 
@@ -1823,6 +1843,12 @@ class MultiDimBinning(object):
         """int : hash on the list of hashes for each dimension's edge values"""
         return hash_obj([d.edges_hash for d in self])
 
+    @property
+    def _derived_key(self):
+        """Key for arrays derived from this binning in `DERIVED_CACHE`; units
+        are included since `hash` is invariant under unit conversions"""
+        return (self.hash,) + tuple(d.units for d in self)
+
     @property
     def bin_edges(self):
         """Return a list of the contained dimensions' bin_edges that is
@@ -2557,7 +2583,8 @@ class MultiDimBinning(object):
         -------
         [X1, X2,..., XN] : list of numpy ndarray or Pint quantities of the same
             One ndarray or quantity is returned per dimension; see docs for
-            `numpy.meshgrid` for details
+            `numpy.meshgrid` for details. The arrays are read-only, as these
+            are cached (see `DERIVED_CACHE`).
 
         See Also
         --------
@@ -2566,33 +2593,41 @@ class MultiDimBinning(object):
         """
         entity = entity.lower().strip()
 
-        arrays = []
-        units = []
-        for dim in self.iterdims():
-            try:
-                quantity_array = getattr(dim, entity)
-            except AttributeError:
-                logging.error(
-                    "Dimension %s does not contain entity '%s'", dim.name, entity
-                )
-                raise
-            if attach_units:
+        key = (self._derived_key, 'meshgrid', entity)
+        cached = DERIVED_CACHE.get(key)
+        if cached is None:
+            arrays = []
+            units = []
+            for dim in self.iterdims():
+                try:
+                    quantity_array = getattr(dim, entity)
+                except AttributeError:
+                    logging.error(
+                        "Dimension %s does not contain entity '%s'", dim.name,
+                        entity
+                    )
+                    raise
                 units.append(quantity_array.units)
-            arrays.append(quantity_array.magnitude)
-
-        # NOTE: numpy versions prior to 1.13.0, meshgrid returned float64 even
-        # if inputs are float32 to mesghrid. Use `astype` as a fix. Note that
-        # since `astype` already creates a copy of the array even if dtype of
-        # input is the same, setting `copy` to False is ok in the argument to
-        # meshgrid; i.e., if a user modifies an element of the returned array,
-        # it should not affect the original `entity` from which the meshgrid
-        # was generated.
-        mg = [a.astype(FTYPE) for a in np.meshgrid(*arrays, indexing='ij', copy=False)]
+                arrays.append(quantity_array.magnitude)
+
+            # NOTE: numpy versions prior to 1.13.0, meshgrid returned float64
+            # even if inputs are float32 to mesghrid. Use `astype` as a fix.
+            # Since `astype` already creates a copy of the array even if dtype
+            # of input is the same, setting `copy` to False is ok in the
+            # argument to meshgrid. The result is cached (read-only), so
+            # modify a copy of the returned arrays if necessary.
+            mg = tuple(
+                a.astype(FTYPE)
+                for a in np.meshgrid(*arrays, indexing='ij', copy=False)
+            )
+            cached = (mg, tuple(units))
+            DERIVED_CACHE[key] = cached
 
+        mg, units = cached
         if attach_units:
-            return [m*u for m, u in zip(mg, units)]
+            return [ureg.Quantity(m, u) for m, u in zip(mg, units)]
 
-        return mg
+        return list(mg)
 
     # TODO: modify technique depending upon grid size for memory concerns, or
     # even take a `method` argument to force method manually.
@@ -2607,13 +2642,21 @@ class MultiDimBinning(object):
         Returns
         -------
         volumes : array
-            Bin volumes
+            Bin volumes (read-only, as these are cached; see `DERIVED_CACHE`)
 
         """
-        meshgrid = self.meshgrid(entity='bin_widths', attach_units=False)
-        volumes = reduce(mul, meshgrid)
+        key = (self._derived_key, 'bin_volumes')
+        cached = DERIVED_CACHE.get(key)
+        if cached is None:
+            meshgrid = self.meshgrid(entity='bin_widths', attach_units=False)
+            volumes = reduce(mul, meshgrid)
+            units = reduce(mul, (ureg(str(d.units)) for d in self.iterdims()))
+            cached = (volumes * units.magnitude, units.units)
+            DERIVED_CACHE[key] = cached
+
+        volumes, units = cached
         if attach_units:
-            volumes *= reduce(mul, (ureg(str(d.units)) for d in self.iterdims()))
+            return ureg.Quantity(volumes, units)
         return volumes
 
     def weighted_bin_volumes(self, attach_units=True):
@@ -2630,18 +2673,27 @@ class MultiDimBinning(object):
         Returns
         -------
         volumes : array
-            Bin volumes
+            Bin volumes (read-only, as these are cached; see `DERIVED_CACHE`)
 
         """
-        meshgrid = self.meshgrid(entity='weighted_bin_widths', attach_units=False)
-        volumes = reduce(mul, meshgrid)
-        if attach_units:
+        key = (self._derived_key, 'weighted_bin_volumes')
+        cached = DERIVED_CACHE.get(key)
+        if cached is None:
+            meshgrid = self.meshgrid(entity='weighted_bin_widths',
+                                     attach_units=False)
+            volumes = reduce(mul, meshgrid)
             # NOTE we use the units from `weighted_bin_widths` because these
             # can be different from those of the dimension
-            volumes *= reduce(
+            units = reduce(
                 mul,
                 (ureg(str(d.weighted_bin_widths.units)) for d in self.iterdims()),
             )
+            cached = (volumes * units.magnitude, units.units)
+            DERIVED_CACHE[key] = cached
+
+        volumes, units = cached
+        if attach_units:
+            return ureg.Quantity(volumes, units)
         return volumes
 
     def empty(self, name, map_kw=None, **kwargs):
@@ -3163,6 +3215,21 @@ def test_MultiDimBinning():
     _ = binning.bin_volumes(attach_units=True)
     _ = binning.weighted_bin_volumes(attach_units=False)
     _ = binning.weighted_bin_volumes(attach_units=True)
+
+    # Derived arrays are cached (read-only) and shared by equal binnings, but
+    # not by binnings in different units
+    mg = binning.meshgrid(entity='weighted_centers', attach_units=False)
+    assert all(not m.flags.writeable for m in mg)
+    assert all(m0 is m1 for m0, m1 in zip(
+        mg, deepcopy(binning).meshgrid('weighted_centers', attach_units=False)
+    ))
+    mg_mev = binning.to('MeV', '').meshgrid(entity='weighted_centers')
+    assert np.allclose(mg_mev[0].m_as('GeV'), mg[0])
+    vols = binning.bin_volumes(attach_units=True)
+    assert vols.m is binning.bin_volumes(attach_units=False)
+    assert np.allclose(vols.m_as('MeV'),
+                       binning.to('MeV', '').bin_volumes(attach_units=False))
+
     binning.to('MeV', None)
     binning.to('MeV', '')
     binning.to(ureg.joule, '')
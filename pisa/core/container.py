@@ -104,7 +104,7 @@ class ContainerSet(object):
 
         """
         containers = [self.__getitem__(name) for name in names]
-        logging.debug('Linking containers %s into %s'%(names, key))
+        logging.debug('Linking containers %s into %s', names, key)
         new_container = VirtualContainer(key, containers)
         self.linked_containers.append(new_container)
 
@@ -381,7 +381,7 @@ class Container(object):
 
         """
         # TODO: make work for n-dim
-        logging.debug('Transforming %s array to binned data'%(key))
+        logging.debug('Transforming %s array to binned data', key)
         weights = self.array_data[key]
         sample = [self.array_data[n] for n in binning.names]
 
@@ -389,19 +389,29 @@ class Container(object):
 
         self.add_binned_data(key, (binning, hist))
 
-    def binned_to_array(self, key):
-        """Augmented binned data to array data"""
+    def binned_to_array(self, key, method='nearest'):
+        """Augmented binned data to array data
+
+        Parameters
+        ----------
+        key : str
+
+        method : str, one of `pisa.core.translation.LOOKUP_METHODS`
+            'nearest' assigns each event the value of the bin it falls in,
+            while 'linear' and 'cubic' interpolate between bin centers
+
+        """
         try:
             binning, hist = self.binned_data[key]
         except KeyError:
             if key in self.array_data:
-                logging.debug('No transformation for `%s` array data in container `%s`'%(key, self.name))
+                logging.debug('No transformation for `%s` array data in container `%s`', key, self.name)
                 return
             else:
                 raise ValueError('Key `%s` does not exist in container `%s`'%(key, self.name))
-        logging.debug('Transforming %s binned to array data'%(key))
+        logging.debug('Transforming %s binned to array data', key)
         sample = [self.array_data[n] for n in binning.names]
-        self.add_array_data(key, lookup(sample, hist, binning))
+        self.add_array_data(key, lookup(sample, hist, binning, method=method))
 
     def binned_to_binned(self, key, new_binning):
         """Resample a binned key into a different binning
@@ -414,7 +424,7 @@ class Container(object):
             the new binning
 
         """
-        logging.debug('Resampling %s'%(key))
+        logging.debug('Resampling %s', key)
         old_binning, hist = self.binned_data[key]
         sample = [self.get_binned_data(name, old_binning) for name in old_binning.names]
         new_sample = [SmartArray(self.unroll_binning(name, new_binning)) for name in new_binning.names]
@@ -460,8 +470,11 @@ class Container(object):
 
     @staticmethod
     def unroll_binning(key, binning):
+        """Flattened (read-only) weighted bin centers of the dimension `key` of
+        `binning` for all bins; the underlying meshgrid is cached per binning
+        (see `pisa.core.binning.DERIVED_CACHE`)"""
         grid = binning.meshgrid(entity='weighted_centers', attach_units=False)
-        return SmartArray(grid[binning.index(key)].ravel())
+        return SmartArray(grid[binning.index(key)].ravel(), copy=False)
 
 
     def get_hist(self, key):
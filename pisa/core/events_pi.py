@@ -3,16 +3,29 @@
 from __future__ import absolute_import, division, print_function
 
 import argparse
+import ast
+import builtins
 from collections.abc import Mapping, Iterable, Sequence
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import copy
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
 
 import numpy as np
 
-from pisa import FTYPE
+from pisa import CACHE_DIR, FTYPE, OMP_NUM_THREADS
 from pisa.core.binning import OneDimBinning, MultiDimBinning
-from pisa.utils.fileio import from_file
+from pisa.utils.fileio import from_file, mkdir
+from pisa.utils.hash import hash_obj
+from pisa.utils.hdf import HDF5_EXTS, to_hdf
+from pisa.utils.jsons import from_json, to_json
 from pisa.utils.log import logging
+from pisa.utils.resources import find_resource
 
 
 __all__ = [
@@ -20,9 +33,26 @@ __all__ = [
     "NU_INTERACTIONS",
     "OUTPUT_NUFLAVINT_KEYS",
     "LEGACY_FLAVKEY_XLATION",
+    "append_arrays_dict",
+    "concatenate_arrays_dicts",
+    "compile_cut",
+    "get_cut_mask",
     "EventsPi",
+    "EVENTS_CACHE_EXT",
+    "EVENTS_CACHE_MANIFEST",
+    "get_events_source_hash",
+    "get_events_key",
+    "get_shared_events",
+    "share_events",
+    "get_events_cache_path",
+    "save_events_cache",
+    "load_events_cache",
     "split_nu_events_by_flavor_and_interaction",
     "fix_oppo_flux",
+    "test_concatenate_arrays_dicts",
+    "test_load_events_file_streamed",
+    "test_events_cache",
+    "test_apply_cut",
     "main",
 ]
 
@@ -66,6 +96,13 @@ LEGACY_FLAVKEY_XLATION = dict(
 )
 
 
+# Cache of parsed cut expressions, see `compile_cut`
+_COMPILED_CUTS = {}
+
+# Events shared within this process, see `share_events`
+_SHARED_EVENTS = weakref.WeakValueDictionary()
+
+
 # Backwards cmpatiblity fixes
 OPPO_FLUX_LEGACY_FIX_MAPPING_NU = {
     "nominal_nue_flux" : "neutrino_nue_flux",
@@ -85,6 +122,9 @@ def append_arrays_dict(key, val, sdict):
     '''
     Helper function for appending multiple dicts of arrays (e.g. from 
     multiple input files) into a single dict of arrays 
+
+    Note that each call copies the accumulated array; use
+    `concatenate_arrays_dicts` to combine many dicts at once.
     '''
     if isinstance(val, Mapping):
         # Handle sub-dict
@@ -101,6 +141,189 @@ def append_arrays_dict(key, val, sdict):
             sdict[key] = val
 
 
+def concatenate_arrays_dicts(sdicts, release=False):
+    '''
+    Helper function for concatenating multiple dicts of arrays (e.g. from
+    multiple input files) into a single dict of arrays.
+
+    Each output array is allocated once and filled, so the cost is linear in
+    the total number of elements (unlike repeated `append_arrays_dict` calls).
+
+    Parameters
+    ----------
+    sdicts : sequence of mappings
+        (Nested) dicts of arrays, concatenated along the first axis in order.
+        Keys missing from some of the dicts are concatenated from the dicts
+        that have them.
+
+    release : bool or sequence of bool
+        Whether to remove each array from its input dict (one flag per dict)
+        once it has been copied into the output, such that peak memory stays
+        close to the size of the output. Only set this for dicts owned by the
+        caller.
+
+    Returns
+    -------
+    output : OrderedDict
+
+    '''
+    if isinstance(release, bool):
+        release = [release] * len(sdicts)
+    assert len(release) == len(sdicts)
+
+    keys = OrderedDict()
+    for sdict in sdicts:
+        for key in sdict.keys():
+            keys[key] = None
+
+    output = OrderedDict()
+    for key in keys:
+        idx = [i for i, sdict in enumerate(sdicts) if key in sdict]
+        vals = [sdicts[i][key] for i in idx]
+
+        if isinstance(vals[0], Mapping):
+            # Handle sub-dict
+            for val in vals:
+                assert isinstance(val, Mapping), "'%s' is not a mapping in all inputs" % key
+            output[key] = concatenate_arrays_dicts(
+                vals, release=[release[i] for i in idx]
+            )
+            continue
+
+        # Have now reached a variable
+        for val in vals:
+            assert isinstance(val, np.ndarray), "'%s' is not an array, is a %s" % (key, type(val))
+        if len(vals) == 1:
+            output[key] = vals[0]
+        else:
+            inner_shape = vals[0].shape[1:]
+            for val in vals:
+                assert val.shape[1:] == inner_shape, "'%s' has inconsistent shapes" % key
+            total = sum(val.shape[0] for val in vals)
+            out = np.empty((total,) + inner_shape, dtype=np.result_type(*vals))
+            start = 0
+            for val in vals:
+                stop = start + val.shape[0]
+                out[start:stop] = val
+                start = stop
+            output[key] = out
+
+        for i in idx:
+            if release[i]:
+                del sdicts[i][key]
+
+    return output
+
+
+def _map_variables(data, variable_mapping, names=None):
+    """Return an OrderedDict of the arrays in `data` under their destination
+    names in `variable_mapping` (see `EventsPi.load_events_file`), cast to
+    FTYPE. Variables whose sources are missing from `data` are skipped, as
+    are those not in `names` (if specified)."""
+    if variable_mapping is None:
+        variable_mapping = OrderedDict((k, k) for k in data.keys())
+
+    variables = OrderedDict()
+    for var_dst, var_src in variable_mapping.items():
+        if names is not None and var_dst not in names:
+            continue
+        if isinstance(var_src, str):
+            var_src = [var_src]
+        if not all(var in data for var in var_src):
+            continue
+        variables[var_dst] = np.squeeze(
+            np.stack([data[var].astype(FTYPE) for var in var_src], axis=1)
+        )
+    return variables
+
+
+def compile_cut(keep_criteria):
+    """Parse the cut expression `keep_criteria` (see `EventsPi.apply_cut`)
+    once, returning the compiled expression and the names of the variables it
+    references. Results are cached per expression.
+
+    Parameters
+    ----------
+    keep_criteria : string
+
+    Returns
+    -------
+    code : code object
+    names : tuple of strings
+
+    """
+    if keep_criteria in _COMPILED_CUTS:
+        return _COMPILED_CUTS[keep_criteria]
+
+    tree = ast.parse(keep_criteria.strip(), mode="eval")
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id != "np" and node.id not in names:
+            names.append(node.id)
+    code = compile(tree, "<cut: %s>" % keep_criteria, "eval")
+
+    _COMPILED_CUTS[keep_criteria] = (code, tuple(names))
+    return _COMPILED_CUTS[keep_criteria]
+
+
+def get_cut_mask(keep_criteria, variables, key=None):
+    """Evaluate the cut expression `keep_criteria` (see `EventsPi.apply_cut`)
+    on the mapping of arrays `variables`, returning the boolean mask of
+    events to keep. Only the variables referenced in the expression are
+    accessed.
+
+    Parameters
+    ----------
+    keep_criteria : string
+    variables : mapping of arrays
+    key : string, optional
+        Name of the events category, for error messages
+
+    Returns
+    -------
+    mask : array of bool
+
+    """
+    code, names = compile_cut(keep_criteria)
+    namespace = {}
+    for name in names:
+        if name not in variables:
+            if hasattr(builtins, name):
+                continue
+            raise KeyError(
+                "Variable '%s' in cut '%s' cannot be found for '%s' events"
+                % (name, keep_criteria, key)
+            )
+        namespace[name] = variables[name]
+    mask = eval(code, {"np": np}, namespace)  # pylint: disable=eval-used
+    return np.asarray(mask, dtype=bool)
+
+
+def _select_rows_in_dict(data, select, path=""):
+    """Apply `select` (with the signature used by `pisa.utils.hdf.from_hdf`)
+    to the row-aligned arrays of each (nested) mapping in `data`, returning
+    new OrderedDicts"""
+    output = OrderedDict()
+    rows = OrderedDict()
+    for key, val in data.items():
+        if isinstance(val, Mapping):
+            output[key] = _select_rows_in_dict(val, select, path=path + "/" + key)
+        else:
+            output[key] = val
+            if isinstance(val, np.ndarray) and val.ndim > 0:
+                rows[key] = val
+
+    if rows:
+        num_rows = next(iter(rows.values())).shape[0]
+        rows = OrderedDict((k, v) for k, v in rows.items() if v.shape[0] == num_rows)
+        mask = select(path if path else "/", slice(0, num_rows), num_rows, rows)
+        if mask is not None:
+            for key, val in rows.items():
+                output[key] = val[mask]
+
+    return output
+
+
 class EventsPi(OrderedDict):
     """
     Container for events for use with PISA pi
@@ -155,7 +378,15 @@ class EventsPi(OrderedDict):
         )
 
 
-    def load_events_file(self, events_file, variable_mapping=None, required_metadata=None):
+    def load_events_file(
+        self,
+        events_file,
+        variable_mapping=None,
+        required_metadata=None,
+        num_threads=None,
+        keep_criteria=None,
+        chunk_size=None,
+    ):
         """Fill this events container from an input HDF5 file filled with event
         data Optionally can provide a variable mapping so select a subset of
         variables, rename them, etc.
@@ -178,6 +409,23 @@ class EventsPi(OrderedDict):
             Can optionally specify metadata keys to parse from the input file metdata.
             ONLY metadata specified here will be parsed.
             Anything specified here MUST exist in the files. 
+
+        num_threads : None or int, optional
+            Number of threads used to read multiple files concurrently. If
+            None, use `pisa.OMP_NUM_THREADS`.
+
+        keep_criteria : None or str, optional
+            Cut to apply while reading the events (see `apply_cut`), in terms
+            of the destination variable names. HDF5 files are streamed in
+            chunks of `chunk_size` rows and only events passing the cut are
+            kept, so memory scales with the post-cut sample rather than the
+            size of the file. Other inputs are cut after reading each file.
+            The cut is recorded in `metadata["cuts"]`.
+
+        chunk_size : None or int, optional
+            Number of rows read at a time from HDF5 files when streaming. If
+            specified (or if `keep_criteria` is), `fraction_events_to_keep`
+            is applied while reading, per file, rather than after loading.
         """
 
         # Validate `events_file`
@@ -221,9 +469,6 @@ class EventsPi(OrderedDict):
         # Loop over files
         #
 
-        input_data = OrderedDict()
-        metadata = OrderedDict()
-
         # Handle list of files vs single file
         events_files_list = []
         if isinstance(events_file, str):
@@ -233,61 +478,120 @@ class EventsPi(OrderedDict):
         elif isinstance(events_file, Sequence):
             events_files_list = events_file
 
-        # Loop over files
-        for i_file, infile in enumerate(events_files_list) :
+        # If user provided a variable mapping, only load the requested variables
+        # (saves time/memory). Remember to andle cases where the variable is
+        # defined as a list of variables in the cfg file.
+        if variable_mapping is None :
+            choose = None
+        else :
+            choose = []
+            for var_name in variable_mapping.values() :
+                if isinstance(var_name, str) :
+                    choose.append(var_name)
+                elif isinstance(var_name, Sequence) :
+                    for sub_var_name in var_name :
+                        assert isinstance(sub_var_name, str), "Unknown variable format, must be `str`"
+                        choose.append(sub_var_name)
+                else :
+                    raise IOError("Unknown variable name format, must be `str` or list of `str`")
+
+            # Handle "oppo" flux backwards compatibility
+            # This means adding the old variable names into the chosen variable list
+            # The actual renaming is done later by `fix_oppo_flux`
+            for var_name in choose :
+                if var_name in OPPO_FLUX_LEGACY_FIX_MAPPING_NU :
+                    choose.append( OPPO_FLUX_LEGACY_FIX_MAPPING_NU[var_name] )
+                if var_name in OPPO_FLUX_LEGACY_FIX_MAPPING_NUBAR :
+                    choose.append( OPPO_FLUX_LEGACY_FIX_MAPPING_NUBAR[var_name] )
+
+        # When streaming, select events (subsample and cut) while reading
+        stream = keep_criteria is not None or chunk_size is not None
+        if keep_criteria is not None:
+            assert isinstance(keep_criteria, str)
+
+        def get_row_selector():
+            """Return a function selecting the rows to keep while reading one
+            file (see `select` in `pisa.utils.hdf.from_hdf`). Each file gets
+            its own selector, such that the subsample is drawn per file."""
+            subsample_masks = {}
+
+            def select_rows(path, rows, num_rows, chunk):
+                """Return mask of the rows in `chunk` (rows `rows` out of
+                `num_rows` in the group at `path`) to keep"""
+                mask = None
+                if self.fraction_events_to_keep is not None:
+                    if path not in subsample_masks:
+                        # Same events as when subsampling after loading
+                        rand = np.random.RandomState(123456)
+                        num_events_to_keep = int(np.round(self.fraction_events_to_keep*float(num_rows)))
+                        subsample_mask = np.zeros(num_rows, dtype=bool)
+                        subsample_mask[rand.choice(num_rows, size=num_events_to_keep, replace=False)] = True
+                        subsample_masks[path] = subsample_mask
+                    mask = subsample_masks[path][rows]
+                if keep_criteria is not None:
+                    variables = _map_variables(
+                        chunk, variable_mapping, names=compile_cut(keep_criteria)[1]
+                    )
+                    cut_mask = get_cut_mask(keep_criteria, variables, key=path)
+                    mask = cut_mask if mask is None else mask & cut_mask
+                return mask
 
-            #
-            # Parse variables from file
-            #
+            return select_rows
 
-            # Read the file
-            # If `variable_mapping` was specified, only load those variables (saves time/memory)
-            if isinstance(infile, str):
+        def is_streamed(infile):
+            """Whether events are selected while reading `infile`"""
+            return (
+                stream and isinstance(infile, str)
+                and infile.lower().endswith(tuple("." + ext for ext in HDF5_EXTS))
+            )
 
-                # If user provided a variable mapping, only load the requested variables.
-                # Remember to andle cases where the variable is defined as a list of variables in
-                # the cfg file.
-                if variable_mapping is None :
-                    choose = None
-                else :
-                    choose = []
-                    for var_name in variable_mapping.values() :
-                        if isinstance(var_name, str) :
-                            choose.append(var_name)
-                        elif isinstance(var_name, Sequence) :
-                            for sub_var_name in var_name :
-                                assert isinstance(sub_var_name, str), "Unknown variable format, must be `str`"
-                                choose.append(sub_var_name)
-                        else :
-                            raise IOError("Unknown variable name format, must be `str` or list of `str`")
-
-                # Handle "oppo" flux backwards compatibility
-                # This means adding the old variable names into the chosen variable list
-                # The actual renaming is done later by `fix_oppo_flux`
-                if variable_mapping is not None :
-                    for var_name in choose :
-                        if var_name in OPPO_FLUX_LEGACY_FIX_MAPPING_NU :
-                            choose.append( OPPO_FLUX_LEGACY_FIX_MAPPING_NU[var_name] )
-                        if var_name in OPPO_FLUX_LEGACY_FIX_MAPPING_NUBAR :
-                            choose.append( OPPO_FLUX_LEGACY_FIX_MAPPING_NUBAR[var_name] )
-
-                # Load the file
+        def read_file(infile):
+            """Load the file at path `infile`"""
+            if is_streamed(infile):
+                file_input_data = from_file(
+                    infile, choose=choose, select=get_row_selector(),
+                    chunk_size=chunk_size
+                )
+            else:
                 file_input_data = from_file(infile, choose=choose)
-                if not isinstance(file_input_data, Mapping):
-                    raise TypeError(
-                        'Contents loaded from "%s" must be a mapping; got: %s'
-                        % (infile, type(file_input_data))
-                    )
-                assert len(file_input_data) > 0, "No input data found"
+            if not isinstance(file_input_data, Mapping):
+                raise TypeError(
+                    'Contents loaded from "%s" must be a mapping; got: %s'
+                    % (infile, type(file_input_data))
+                )
+            assert len(file_input_data) > 0, "No input data found"
+            return file_input_data
+
+        # First pass: read the files (concurrently, if requested), keeping the
+        # per-file arrays. Mappings passed in by the user are used as-is.
+        paths = [infile for infile in events_files_list if isinstance(infile, str)]
+        if num_threads is None:
+            num_threads = OMP_NUM_THREADS
+        if num_threads > 1 and len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=min(num_threads, len(paths))) as executor:
+                loaded = list(executor.map(read_file, paths))
+        else:
+            loaded = [read_file(infile) for infile in paths]
+        loaded.reverse()
 
+        files_input_data = []
+        release = []
+        for infile in events_files_list :
+
+            if isinstance(infile, str):
+                file_input_data = loaded.pop()
 
             # File already loaded
             elif isinstance(infile, Mapping) :
                 file_input_data = infile
 
-            # Add to overall container
-            for k, v in file_input_data.items() :
-                append_arrays_dict(k, v, input_data)
+            release.append(isinstance(infile, str))
+            if stream and not is_streamed(infile):
+                file_input_data = _select_rows_in_dict(
+                    file_input_data, get_row_selector()
+                )
+                release[-1] = True
+            files_input_data.append(file_input_data)
 
 
             #
@@ -328,6 +632,16 @@ class EventsPi(OrderedDict):
                         else :
                             self.metadata[k] = file_metadata[k]
 
+        # Second pass: allocate each array once and fill it from the files
+        del loaded
+        input_data = concatenate_arrays_dicts(files_input_data, release=release)
+        del files_input_data
+
+        # Events have already been selected while reading if streaming
+        fraction_events_to_keep = None if stream else self.fraction_events_to_keep
+        if keep_criteria is not None:
+            self.metadata["cuts"].append(keep_criteria)
+
 
 
         #
@@ -429,9 +743,9 @@ class EventsPi(OrderedDict):
                     )
                 else:
                     # Down sample events if required
-                    if self.fraction_events_to_keep is not None:
+                    if fraction_events_to_keep is not None:
                         rand = np.random.RandomState(123456) # Enforce same sample each time
-                        num_events_to_keep = int(np.round(self.fraction_events_to_keep*float(array_data.size)))
+                        num_events_to_keep = int(np.round(fraction_events_to_keep*float(array_data.size)))
                         array_data = rand.choice(array_data, size=num_events_to_keep, replace=False)
 
                     # Add to array
@@ -477,7 +791,11 @@ class EventsPi(OrderedDict):
         # TODO Get everything from the GPU first ?
 
         # Prepare the post-cut data container
-        cut_data = EventsPi(name=self.name)
+        cut_data = EventsPi(
+            name=self.name,
+            neutrinos=self.neutrinos,
+            fraction_events_to_keep=self.fraction_events_to_keep,
+        )
         cut_data.metadata = copy.deepcopy(self.metadata)
 
         # Loop over the data containers
@@ -487,21 +805,14 @@ class EventsPi(OrderedDict):
             # TODO Need to think about how to handle array, scalar and binned data
             # TODO Check for `events` data mode, or should this kind of logic
             # already be in the Container class?
-            variables = self[key].keys()
 
-            # Create the cut expression, and get the resulting mask
-            crit_str = keep_criteria
-            for variable_name in variables:
-                crit_str = crit_str.replace(
-                    variable_name, 'self["%s"]["%s"]' % (key, variable_name)
-                )
-            mask = eval(crit_str)  # pylint: disable=eval-used
+            # Get the mask from the (once-parsed) cut expression
+            mask = get_cut_mask(keep_criteria, self[key], key=key)
 
-            # Fill a new container with the post-cut data
-            for variable_name in variables:
-                cut_data[key][variable_name] = copy.deepcopy(
-                    self[key][variable_name][mask]
-                )
+            # Fill a new container with the post-cut data (`compress` returns
+            # a new array, so no further copy is needed)
+            for variable_name, array_data in self[key].items():
+                cut_data[key][variable_name] = np.compress(mask, array_data, axis=0)
 
         # TODO update to GPUs?
 
@@ -564,6 +875,228 @@ class EventsPi(OrderedDict):
         return string
 
 
+# Extension of directories holding cached events
+EVENTS_CACHE_EXT = ".evtnpy"
+
+# Name of the manifest in these directories
+EVENTS_CACHE_MANIFEST = "manifest.json"
+
+
+def get_events_source_hash(events_file):
+    """Hash identifying the version of the events file(s) `events_file`, based
+    on their paths, sizes and modification times (hashing the contents of
+    large events files would defeat the purpose of caching them).
+
+    Parameters
+    ----------
+    events_file : string or sequence of strings
+
+    Returns
+    -------
+    source_hash : string
+
+    """
+    if isinstance(events_file, str):
+        events_file = [events_file]
+    info = []
+    for infile in events_file:
+        path = os.path.abspath(find_resource(infile))
+        stat = os.stat(path)
+        info.append((path, stat.st_size, stat.st_mtime))
+    return hash_obj(info, hash_to="hex")
+
+
+def get_events_key(events_file, selection):
+    """Key identifying the events loaded from `events_file` with the options
+    `selection` (e.g. cuts and variable mapping), used for the events cache
+    and for sharing events within a process.
+
+    Parameters
+    ----------
+    events_file : string or sequence of strings
+
+    selection : mapping
+        JSON-serializable options determining the loaded events
+
+    Returns
+    -------
+    key : string
+
+    """
+    selection_str = json.dumps(selection, sort_keys=True)
+    return hash_obj((get_events_source_hash(events_file), selection_str), hash_to="hex")
+
+
+def get_shared_events(key):
+    """Return the events registered with `share_events` under `key` in this
+    process, or None if there are none (anymore).
+
+    Parameters
+    ----------
+    key : string
+        See `get_events_key`
+
+    Returns
+    -------
+    events : EventsPi or None
+
+    """
+    return _SHARED_EVENTS.get(key)
+
+
+def share_events(key, events):
+    """Register `events` under `key` such that other users in this process
+    (e.g. the data and hypothesis distribution makers in a hypothesis test)
+    can use them instead of loading their own copy. All arrays are made
+    read-only, since they are shared. Events are only kept in the registry
+    as long as they are referenced elsewhere.
+
+    Parameters
+    ----------
+    key : string
+        See `get_events_key`
+
+    events : EventsPi
+
+    Returns
+    -------
+    events : EventsPi
+
+    """
+    for cat_dict in events.values():
+        for array_data in cat_dict.values():
+            array_data.flags.writeable = False
+    _SHARED_EVENTS[key] = events
+    return events
+
+
+def get_events_cache_path(events_file, selection, cache_dir=None):
+    """Path of the cache of the events loaded from `events_file` with the
+    options `selection` (e.g. cuts and variable mapping).
+
+    Parameters
+    ----------
+    events_file : string or sequence of strings
+
+    selection : mapping
+        JSON-serializable options determining the cached events
+
+    cache_dir : string, optional
+        Directory holding the caches; defaults to `CACHE_DIR/events`
+
+    Returns
+    -------
+    cache_path : string
+    cache_key : string
+        Key identifying the cached events (see `get_events_key`), recorded in
+        the manifest
+
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(CACHE_DIR, "events")
+    cache_key = get_events_key(events_file, selection)
+    return os.path.join(cache_dir, cache_key + EVENTS_CACHE_EXT), cache_key
+
+
+def save_events_cache(events, cache_path, manifest=None):
+    """Store `events` in a columnar format that can be memory-mapped, with one
+    `.npy` file per variable of each category plus a JSON manifest.
+
+    The directory is written under a temporary name and renamed once complete,
+    so concurrent jobs never see a partially written cache.
+
+    Parameters
+    ----------
+    events : EventsPi
+
+    cache_path : string
+        Directory to write to, by convention ending with `EVENTS_CACHE_EXT`
+
+    manifest : mapping, optional
+        Additional (JSON-serializable) entries for the manifest, such as the
+        source hash, cuts and variable mapping the events were loaded with
+
+    """
+    parent_dir = os.path.dirname(os.path.abspath(cache_path))
+    mkdir(parent_dir, warn=False)
+    tmp_path = tempfile.mkdtemp(dir=parent_dir, prefix=".tmp")
+    os.chmod(tmp_path, 0o750)
+
+    try:
+        containers = OrderedDict()
+        for key, cat_dict in events.items():
+            mkdir(os.path.join(tmp_path, key), warn=False)
+            containers[key] = OrderedDict()
+            for var, array_data in cat_dict.items():
+                file_name = os.path.join(key, var + ".npy")
+                np.save(os.path.join(tmp_path, file_name), np.ascontiguousarray(array_data))
+                containers[key][var] = file_name
+
+        full_manifest = OrderedDict()
+        if manifest is not None:
+            full_manifest.update(manifest)
+        full_manifest["name"] = events.name
+        full_manifest["neutrinos"] = events.neutrinos
+        full_manifest["metadata"] = events.metadata
+        full_manifest["containers"] = containers
+        to_json(full_manifest, os.path.join(tmp_path, EVENTS_CACHE_MANIFEST), warn=False)
+
+        try:
+            os.rename(tmp_path, cache_path)
+        except OSError:
+            # Another process has written the same cache in the meantime
+            if not os.path.isdir(cache_path):
+                raise
+            shutil.rmtree(tmp_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    logging.info("Wrote events cache to %s", cache_path)
+
+
+def load_events_cache(cache_path, cache_key=None):
+    """Load events stored by `save_events_cache`.
+
+    Arrays are memory-mapped (copy-on-write) rather than read, such that
+    concurrent jobs on a node share the same pages.
+
+    Parameters
+    ----------
+    cache_path : string
+
+    cache_key : string, optional
+        If specified, the cache is only used if its manifest has this
+        `cache_key` (see `get_events_cache_path`)
+
+    Returns
+    -------
+    events : EventsPi or None
+        None if there is no (matching) cache
+
+    """
+    manifest_file = os.path.join(cache_path, EVENTS_CACHE_MANIFEST)
+    if not os.path.isfile(manifest_file):
+        return None
+    manifest = from_json(manifest_file)
+    if cache_key is not None and manifest.get("cache_key") != cache_key:
+        logging.warning("Ignoring events cache %s, which does not match", cache_path)
+        return None
+
+    events = EventsPi(name=manifest["name"], neutrinos=manifest["neutrinos"])
+    events.metadata = OrderedDict(manifest["metadata"])
+    for key, files in manifest["containers"].items():
+        events[key] = OrderedDict()
+        for var, file_name in files.items():
+            # plain ndarray view of the memory map
+            events[key][var] = np.asarray(
+                np.load(os.path.join(cache_path, file_name), mmap_mode="c")
+            )
+
+    logging.info("Loaded events from cache %s", cache_path)
+    return events
+
+
 def split_nu_events_by_flavor_and_interaction(input_data):
     """Split neutrino events by nu vs nubar, and CC vs NC.
 
@@ -671,6 +1204,292 @@ def fix_oppo_flux(input_data):
                 val[new] = val.pop(old)
 
 
+def test_concatenate_arrays_dicts():
+    """Unit test for `concatenate_arrays_dicts` and the concatenation of
+    several events files in `EventsPi.load_events_file`"""
+    rand = np.random.RandomState(0)
+
+    def make_data(num_events):
+        """Legacy-format (nested) neutrino events with a 2D column"""
+        data = OrderedDict()
+        for flav in ["numu", "nue_bar"]:
+            data[flav] = OrderedDict()
+            for int_type in ["cc", "nc"]:
+                data[flav][int_type] = OrderedDict([
+                    ("true_energy", rand.uniform(1, 80, num_events)),
+                    ("pid", rand.randint(0, 2, num_events)),
+                    ("dir", rand.uniform(-1, 1, (num_events, 3))),
+                ])
+        return data
+
+    def concatenate(sdicts):
+        """Reference for `concatenate_arrays_dicts`"""
+        output = OrderedDict()
+        for key, val in sdicts[0].items():
+            if isinstance(val, Mapping):
+                output[key] = concatenate([sdict[key] for sdict in sdicts])
+            else:
+                output[key] = np.concatenate([sdict[key] for sdict in sdicts])
+        return output
+
+    def assert_equal(test, ref):
+        assert list(test.keys()) == list(ref.keys())
+        for key, val in ref.items():
+            if isinstance(val, Mapping):
+                assert_equal(test[key], val)
+            else:
+                assert test[key].dtype == val.dtype, key
+                assert np.array_equal(test[key], val), key
+
+    # Nested dicts, 2D arrays, and (with `release`) emptying of the inputs
+    sdicts = [make_data(num_events) for num_events in [10, 1, 25]]
+    expected = concatenate(sdicts)
+    assert_equal(concatenate_arrays_dicts(sdicts), expected)
+    assert_equal(concatenate_arrays_dicts(sdicts, release=[False, True, False]), expected)
+    assert "true_energy" in sdicts[0]["numu"]["cc"]
+    assert not sdicts[1]["numu"]["cc"]
+
+    # Keys missing from some of the dicts, and mixed dtypes
+    output = concatenate_arrays_dicts([
+        OrderedDict(a=np.arange(3), b=np.ones(2)),
+        OrderedDict(a=np.linspace(0, 1, 4)),
+    ])
+    assert list(output.keys()) == ["a", "b"]
+    assert output["a"].dtype == np.float64 and len(output["a"]) == 7
+    assert np.array_equal(output["b"], np.ones(2))
+
+    # Loading several files, sequentially or concurrently
+    testdir = tempfile.mkdtemp()
+    try:
+        events_files = []
+        file_data = []
+        for i, num_events in enumerate([20, 5, 40, 13]):
+            events_file = os.path.join(testdir, "%d.hdf5" % i)
+            data = make_data(num_events)
+            to_hdf(data, events_file, warn=False)
+            events_files.append(events_file)
+            file_data.append(from_file(events_file))
+        expected = concatenate(file_data)
+
+        for num_threads in [1, 4]:
+            events = EventsPi(neutrinos=True)
+            events.load_events_file(events_files, num_threads=num_threads)
+            for flav, new_flav in [("numu", "numu"), ("nue_bar", "nuebar")]:
+                for int_type in ["cc", "nc"]:
+                    loaded = events[new_flav + "_" + int_type]
+                    for var, array_data in expected[flav][int_type].items():
+                        assert loaded[var].shape == array_data.shape
+                        assert np.array_equal(loaded[var], array_data.astype(FTYPE))
+    finally:
+        shutil.rmtree(testdir, ignore_errors=True)
+
+    logging.info("<< PASS : test_concatenate_arrays_dicts >>")
+
+
+def test_load_events_file_streamed():
+    """Unit test for streaming (subsampling while reading) several events files
+    of different sizes in `EventsPi.load_events_file`"""
+    testdir = tempfile.mkdtemp()
+    try:
+        events_files = []
+        for num_rows in [100, 300, 200]:
+            events_file = os.path.join(testdir, "%d.hdf5" % num_rows)
+            to_hdf(
+                {"muons": {"x": np.arange(num_rows, dtype=FTYPE)}},
+                events_file, warn=False,
+            )
+            events_files.append(events_file)
+
+        def load(events_file, **kwargs):
+            events = EventsPi(neutrinos=False, fraction_events_to_keep=0.5)
+            events.load_events_file(events_file, **kwargs)
+            return events["muons"]["x"]
+
+        # Each file is subsampled as if it had been loaded on its own
+        for order in [events_files, events_files[::-1]]:
+            expected = np.concatenate([np.sort(load(f)) for f in order])
+            assert len(load(order)) == len(expected) == 300
+            for num_threads in [1, 3]:
+                streamed = load(order, chunk_size=50, num_threads=num_threads)
+                assert np.array_equal(streamed, expected), str(order)
+    finally:
+        shutil.rmtree(testdir, ignore_errors=True)
+
+    logging.info("<< PASS : test_load_events_file_streamed >>")
+
+
+def _is_memory_mapped(array):
+    """Whether `array` is (a view of) a memory-mapped file"""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def test_events_cache():
+    """Unit test for `get_events_key`, `save_events_cache` and
+    `load_events_cache`"""
+    testdir = tempfile.mkdtemp()
+    try:
+        events_file = os.path.join(testdir, "events.hdf5")
+        to_hdf({"muons": {"x": np.arange(10, dtype=FTYPE)}}, events_file, warn=False)
+        selection = dict(mc_cuts="x > 2", data_dict=None)
+
+        events = EventsPi(name="test", neutrinos=False)
+        events["muons"] = OrderedDict([
+            ("x", np.arange(10, dtype=FTYPE)),
+            ("xy", np.arange(20, dtype=FTYPE).reshape(10, 2)),
+        ])
+        events["noise"] = OrderedDict([("x", np.linspace(0, 1, 5, dtype=FTYPE))])
+        events.metadata["cuts"].append(selection["mc_cuts"])
+
+        # Round trip, with the arrays memory-mapped
+        cache_path, cache_key = get_events_cache_path(
+            events_file, selection, cache_dir=os.path.join(testdir, "cache")
+        )
+        save_events_cache(events, cache_path, manifest=dict(cache_key=cache_key))
+        loaded = load_events_cache(cache_path, cache_key=cache_key)
+        assert loaded.name == events.name
+        assert loaded.neutrinos is False
+        assert loaded.metadata == events.metadata
+        assert list(loaded.keys()) == list(events.keys())
+        for key, cat_dict in events.items():
+            assert list(loaded[key].keys()) == list(cat_dict.keys())
+            for var, array_data in cat_dict.items():
+                assert np.array_equal(loaded[key][var], array_data)
+                assert loaded[key][var].dtype == array_data.dtype
+                assert _is_memory_mapped(loaded[key][var])
+
+        # A cache with a different key in its manifest is ignored
+        assert load_events_cache(cache_path, cache_key="other") is None
+        assert load_events_cache(os.path.join(testdir, "missing")) is None
+
+        # Writing a cache that exists in the meantime keeps the existing one
+        # and leaves no temporary directory behind
+        other_events = EventsPi(name="other", neutrinos=False)
+        other_events["muons"] = OrderedDict([("x", np.zeros(3, dtype=FTYPE))])
+        save_events_cache(other_events, cache_path)
+        assert load_events_cache(cache_path, cache_key=cache_key).name == "test"
+        assert os.listdir(os.path.dirname(cache_path)) == [
+            os.path.basename(cache_path)
+        ]
+
+        # The key changes with the source file's modification time or size,
+        # and with the selection options
+        stat = os.stat(events_file)
+        os.utime(events_file, (stat.st_atime, stat.st_mtime + 10))
+        mtime_key = get_events_key(events_file, selection)
+        assert mtime_key != cache_key
+        to_hdf({"muons": {"x": np.arange(20, dtype=FTYPE)}}, events_file, warn=False)
+        os.utime(events_file, (stat.st_atime, stat.st_mtime + 10))
+        assert os.stat(events_file).st_size != stat.st_size
+        assert get_events_key(events_file, selection) not in (cache_key, mtime_key)
+        size_key = get_events_key(events_file, selection)
+        other_selection = dict(selection, mc_cuts="x > 3")
+        assert get_events_key(events_file, other_selection) != size_key
+        assert get_events_key(events_file, dict(selection)) == size_key
+    finally:
+        shutil.rmtree(testdir, ignore_errors=True)
+
+    logging.info("<< PASS : test_events_cache >>")
+
+
+def _replace_and_eval_cut(events, key, keep_criteria):
+    """Mask of events in `events[key]` passing `keep_criteria`, evaluated by
+    substituting the variables into the expression, as `EventsPi.apply_cut`
+    used to do (this fails if a variable name is part of another)"""
+    crit_str = keep_criteria
+    for variable_name in events[key].keys():
+        crit_str = crit_str.replace(
+            variable_name, 'events["%s"]["%s"]' % (key, variable_name)
+        )
+    return eval(crit_str)  # pylint: disable=eval-used
+
+
+def test_apply_cut():
+    """Unit test for `compile_cut`, `get_cut_mask`, `EventsPi.apply_cut` and
+    `EventsPi.keep_inbounds`"""
+    rand = np.random.RandomState(0)
+    events = EventsPi(name="test", neutrinos=False)
+    for key, num_events in [("numu_cc", 1000), ("nue_cc", 500)]:
+        events[key] = OrderedDict([
+            ("true_energy", rand.uniform(1, 10, num_events).astype(FTYPE)),
+            ("true_coszen", rand.uniform(-1, 1, num_events).astype(FTYPE)),
+            ("pid", rand.uniform(-2, 2, num_events).astype(FTYPE)),
+            ("dir", rand.uniform(-1, 1, (num_events, 3)).astype(FTYPE)),
+        ])
+
+    # Same results as substituting the variables into the expression
+    cuts = [
+        "(true_energy >= 2) & (true_coszen < 0)",
+        "(pid < 0) | (true_energy > 5) & ~(true_coszen > 0.5)",
+        "~((true_energy >= 1) & (true_energy <= 8))",
+        "np.log10(true_energy) >= 0.5",
+        "(np.abs(true_coszen) < 0.5) | (np.cos(pid) > 0.9)",
+        "dir[:, 2] > 0",
+    ]
+    for cut in cuts:
+        cut_events = events.apply_cut(cut)
+        assert cut_events.metadata["cuts"] == [cut]
+        assert cut_events.neutrinos == events.neutrinos
+        for key, cat_dict in events.items():
+            mask = _replace_and_eval_cut(events, key, cut)
+            assert np.array_equal(get_cut_mask(cut, cat_dict), mask), cut
+            for var, array_data in cat_dict.items():
+                assert np.array_equal(cut_events[key][var], array_data[mask])
+        assert cut_events.apply_cut(cut) is cut_events
+
+    # Variables whose names are part of others' names, which broke the
+    # substitution of the variables into the expression
+    events["numu_cc"]["energy"] = 2 * events["numu_cc"]["true_energy"]
+    code, names = compile_cut("(energy > 6) & (true_energy < 5) & (np.e > 1)")
+    assert names == ("energy", "true_energy")
+    assert compile_cut("(energy > 6) & (true_energy < 5) & (np.e > 1)") == (code, names)
+    mask = get_cut_mask("(energy > 6) & (true_energy < 5)", events["numu_cc"])
+    expected = (
+        (events["numu_cc"]["energy"] > 6) & (events["numu_cc"]["true_energy"] < 5)
+    )
+    assert np.any(expected) and np.array_equal(mask, expected)
+    try:
+        get_cut_mask("energy > 6", events["nue_cc"], key="nue_cc")
+    except KeyError:
+        pass
+    else:
+        raise Exception("missing variable should have been detected")
+    del events["numu_cc"]["energy"]
+
+    # Results are copies that do not alias the original arrays
+    cut_events = events.apply_cut(cuts[0])
+    for key, cat_dict in cut_events.items():
+        for var, array_data in cat_dict.items():
+            assert not np.shares_memory(array_data, events[key][var])
+            array_data[...] = -100
+    assert not np.any(events["numu_cc"]["true_energy"] == -100)
+
+    # Multi-dimensional binning, keeping events on the outer edges
+    binning = MultiDimBinning([
+        dict(name="true_energy", is_lin=True, domain=[2, 8], num_bins=3),
+        dict(name="true_coszen", is_lin=True, domain=[-0.5, 0.5], num_bins=2),
+    ])
+    events["nue_cc"]["true_energy"][:2] = [2, 8]
+    events["nue_cc"]["true_coszen"][:2] = [0.5, -0.5]
+    inbounds = events.keep_inbounds(binning)
+    criteria = " & ".join(str(dim.inbounds_criteria) for dim in binning)
+    for key, cat_dict in events.items():
+        mask = (
+            (cat_dict["true_energy"] >= 2) & (cat_dict["true_energy"] <= 8)
+            & (cat_dict["true_coszen"] >= -0.5) & (cat_dict["true_coszen"] <= 0.5)
+        )
+        assert np.any(mask) and not np.all(mask)
+        assert np.array_equal(_replace_and_eval_cut(events, key, criteria), mask)
+        for var, array_data in cat_dict.items():
+            assert np.array_equal(inbounds[key][var], array_data[mask])
+    assert np.all(np.isin([2, 8], inbounds["nue_cc"]["true_energy"]))
+
+    logging.info("<< PASS : test_apply_cut >>")
+
+
 def main():
     """Load an events file and print the contents"""
     parser = argparse.ArgumentParser(description="Events parsing")
@@ -446,8 +446,8 @@ class Param:
         if self.prior is None:
             return 0
         if metric in LLH_METRICS:
-            logging.trace('self.value: %s' %self.value)
-            logging.trace('self.prior: %s' %self.prior)
+            logging.trace('self.value: %s', self.value)
+            logging.trace('self.prior: %s', self.prior)
             return self.prior.llh(self.value)
         elif metric in CHI2_METRICS:
             return self.prior.chi2(self.value)
@@ -843,6 +843,11 @@ class ParamSet(MutableSequence, Set):
             setattr(result, k, deepcopy(v, memo))
         return result
 
+    def __setstate__(self, state):
+        # Defined explicitly, as otherwise unpickling looks it up via
+        # `__getattr__` on an instance without `_params`
+        self.__dict__.update(state)
+
     def __getitem__(self, i):
         if isinstance(i, int):
             return self._params[i]
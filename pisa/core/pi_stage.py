@@ -12,9 +12,10 @@ from numba import SmartArray
 from pisa.core.base_stage import BaseStage
 from pisa.core.binning import MultiDimBinning
 from pisa.core.container import ContainerSet
+from pisa.core.translation import LOOKUP_METHODS
 from pisa.utils.log import logging
 from pisa.utils.format import arg_to_tuple
-from pisa.utils.profiler import profile
+from pisa.utils.profiler import TIMINGS
 
 
 __all__ = ["PiStage"]
@@ -78,6 +79,14 @@ class PiStage(BaseStage):
         When producing outputs as a :obj:`Map`, this key is used to set the errors (i.e.
         standard deviations) in the :obj:`Map`. If `None` (default), maps will have no
         errors.
+
+    lookup_method : str
+        How binned data is translated to event arrays, one of
+        `pisa.core.translation.LOOKUP_METHODS`: 'nearest' (default) assigns each
+        event the value of the bin it falls in, 'linear' and 'cubic' interpolate
+        between bin centers (allowing for coarser `calc_specs`). Services
+        need not accept this argument themselves: `pisa.core.pipeline.Pipeline`
+        sets it on any service from its config.
     """
 
     def __init__(
@@ -98,6 +107,7 @@ class PiStage(BaseStage):
         output_calc_keys=None,
         map_output_key=None,
         map_output_error_key=None,
+        lookup_method="nearest",
     ):
         super().__init__(
             params=params,
@@ -115,6 +125,8 @@ class PiStage(BaseStage):
         self.map_output_error_key = map_output_error_key
         self.data = data
 
+        self.lookup_method = lookup_method
+
         if isinstance(self.input_specs, MultiDimBinning):
             self.input_mode = "binned"
         elif self.input_specs == "events":
@@ -170,6 +182,24 @@ class PiStage(BaseStage):
         # cake compatibility
         self.outputs = None
 
+        # timings are recorded to `pisa.utils.profiler.TIMINGS` under names
+        # starting with this prefix
+        self.timing_prefix = "%s.%s." % (self.stage_name, self.service_name)
+
+    @property
+    def lookup_method(self):
+        """str : how binned data is translated to event arrays"""
+        return self._lookup_method
+
+    @lookup_method.setter
+    def lookup_method(self, lookup_method):
+        if lookup_method not in LOOKUP_METHODS:
+            raise ValueError(
+                "`lookup_method` must be one of %s, got %s"
+                % (LOOKUP_METHODS, lookup_method)
+            )
+        self._lookup_method = lookup_method
+
     def setup(self):
 
         # check that data is a ContainerSet (downstream modules assume this)
@@ -192,7 +222,8 @@ class PiStage(BaseStage):
                         )
 
         # call the user-defined setup function
-        self.setup_function()
+        with TIMINGS.time(self.timing_prefix + "setup"):
+            self.setup_function()
 
         # invalidate param hash:
         self.param_hash = -1
@@ -201,9 +232,8 @@ class PiStage(BaseStage):
         """Implement in services (subclasses of PiStage)"""
         pass
 
-    @profile
     def compute(self):
-        
+
         if len(self.params) == 0 and len(self.output_calc_keys) == 0:
             return
 
@@ -216,14 +246,10 @@ class PiStage(BaseStage):
         self.data.data_specs = self.input_specs
         # convert any inputs if necessary:
         if self.mode[:2] == "EB":
-            for container in self.data:
-                for key in self.input_calc_keys:
-                    container.array_to_binned(key, self.calc_specs)
+            self._array_to_binned(self.input_calc_keys, self.calc_specs)
 
         elif self.mode == "EBE":
-            for container in self.data:
-                for key in self.input_calc_keys:
-                    container.binned_to_array(key)
+            self._binned_to_array(self.input_calc_keys)
 
         #elif self.mode == "BBE":
         #    for container in self.data:
@@ -231,57 +257,66 @@ class PiStage(BaseStage):
         #            container.binned_to_array(key)
 
         self.data.data_specs = self.calc_specs
-        self.compute_function()
+        with TIMINGS.time(self.timing_prefix + "compute"):
+            self.compute_function()
         self.param_hash = new_param_hash
 
         # convert any outputs if necessary:
         if self.mode[1:] == "EB":
-            for container in self.data:
-                for key in self.output_calc_keys:
-                    container.array_to_binned(key, self.output_specs)
+            self._array_to_binned(self.output_calc_keys, self.output_specs)
 
         elif self.mode[1:] == "BE":
-            for container in self.data:
-                for key in self.output_calc_keys:
-                    container.binned_to_array(key)
+            self._binned_to_array(self.output_calc_keys)
 
     def compute_function(self):
         """Implement in services (subclasses of PiStage)"""
         pass
 
-    @profile
     def apply(self):
 
         self.data.data_specs = self.input_specs
         # convert any inputs if necessary:
         if self.mode[0] + self.mode[2] == "EB":
-            for container in self.data:
-                for key in self.input_apply_keys:
-                    container.array_to_binned(key, self.output_specs)
+            self._array_to_binned(self.input_apply_keys, self.output_specs)
 
         # elif self.mode == 'BBE':
         #    pass
 
         elif self.mode[0] + self.mode[2] == "BE":
-            for container in self.data:
-                for key in self.input_apply_keys:
-                    container.binned_to_array(key)
+            self._binned_to_array(self.input_apply_keys)
 
         # if self.input_specs is not None:
         #    self.data.data_specs = self.input_specs
         # else:
         self.data.data_specs = self.output_specs
-        self.apply_function()
+        with TIMINGS.time(self.timing_prefix + "apply"):
+            self.apply_function()
 
         if self.mode == "BBE":
-            for container in self.data:
-                for key in self.output_apply_keys:
-                    container.binned_to_array(key)
+            self._binned_to_array(self.output_apply_keys)
 
     def apply_function(self):
         """Implement in services (subclasses of PiStage)"""
         pass
 
+    def _array_to_binned(self, keys, binning):
+        """Histogram the arrays `keys` of all containers into `binning`"""
+        if not keys:
+            return
+        with TIMINGS.time(self.timing_prefix + "array_to_binned"):
+            for container in self.data:
+                for key in keys:
+                    container.array_to_binned(key, binning)
+
+    def _binned_to_array(self, keys):
+        """Look up the binned data `keys` of all containers at the events"""
+        if not keys:
+            return
+        with TIMINGS.time(self.timing_prefix + "binned_to_array"):
+            for container in self.data:
+                for key in keys:
+                    container.binned_to_array(key, method=self.lookup_method)
+
     def run(self, inputs=None):
         if not inputs is None:
             raise ValueError("PISA pi requires there not be any inputs.")
@@ -13,8 +13,9 @@ from collections import OrderedDict
 from configparser import NoSectionError
 from copy import deepcopy
 from importlib import import_module
-from itertools import product
-from inspect import getsource
+from itertools import count, product
+from inspect import getsource, signature
+import json
 import os
 import traceback
 
@@ -33,7 +34,7 @@ from pisa.utils.config_parser import PISAConfigParser, parse_pipeline_config
 from pisa.utils.fileio import mkdir
 from pisa.utils.hash import hash_obj
 from pisa.utils.log import logging, set_verbosity
-from pisa.utils.profiler import profile
+from pisa.utils.profiler import TIMINGS
 
 
 __all__ = ["Pipeline", "test_Pipeline", "parse_args", "main"]
@@ -85,6 +86,9 @@ class Pipeline(object):
 
     """
 
+    # Numbers the pipelines instantiated in this process
+    _instance_counter = count()
+
     def __init__(self, config):
         if isinstance(config, (str, PISAConfigParser)):
             config = parse_pipeline_config(config=config)
@@ -99,6 +103,10 @@ class Pipeline(object):
         self.pisa_version = None
 
         self._stages = []
+        # timings of this pipeline (and its stages) are recorded to
+        # `pisa.utils.profiler.TIMINGS` under names starting with this prefix,
+        # distinguishing pipelines that use the same services
+        self.timing_prefix = "pipeline%d." % next(self._instance_counter)
         self._detector_name = config.pop('detector_name', None)
         self._config = config
         self._init_stages()
@@ -182,13 +190,23 @@ class Pipeline(object):
                 # Get service class from module
                 service_cls = getattr(module, service_name)
 
+                # `lookup_method` is handled by `PiStage` for all services,
+                # also those not taking it as an instantiation arg
+                lookup_method = None
+                if ("lookup_method" in settings and issubclass(service_cls, PiStage)
+                        and "lookup_method" not in signature(service_cls).parameters):
+                    settings = OrderedDict(settings)
+                    lookup_method = settings.pop("lookup_method")
+
                 # Instantiate service
                 logging.trace(
-                    "initializing stage.service %s.%s with settings %s"
-                    % (stage_name, service_name, settings)
+                    "initializing stage.service %s.%s with settings %s",
+                    stage_name, service_name, settings
                 )
                 try:
                     service = service_cls(**settings)
+                    if lookup_method is not None:
+                        service.lookup_method = lookup_method
                 except Exception:
                     logging.error(
                         "Failed to instantiate stage.service %s.%s with settings %s",
@@ -238,6 +256,7 @@ class Pipeline(object):
 
                 if self.pisa_version == "pi":
                     service.data = data
+                    service.timing_prefix = self.timing_prefix + service.timing_prefix
                 # add events object
 
                 # run setup on service
@@ -306,7 +325,6 @@ class Pipeline(object):
         self._stages = stages
 
     # TODO: handle other container(s)
-    @profile
     def get_outputs(self, inputs=None, idx=None, return_intermediate=False, output_mode=None, force_standard_output=True):
         """Run the pipeline to compute its outputs.
 
@@ -363,13 +381,14 @@ class Pipeline(object):
                 stage.service_name,
             )
             try:
-                logging.trace(">>> BEGIN: {}.run(...)".format(name))
-                outputs = stage.run(inputs=inputs) # pylint: disable=redefined-outer-name
+                logging.trace(">>> BEGIN: %s.run(...)", name)
+                with TIMINGS.time(self.timing_prefix + name + ".run"):
+                    outputs = stage.run(inputs=inputs) # pylint: disable=redefined-outer-name
                 if return_intermediate:
                     if outputs is None:  # e.g. for PISA pi
                         outputs = stage.get_outputs(output_mode=output_mode, force_standard_output=force_standard_output)
                     intermediate.append(outputs)
-                logging.trace(">>> END  : {}.run(...)".format(name))
+                logging.trace(">>> END  : %s.run(...)", name)
             except:
                 logging.error(
                     "Error occurred computing outputs in stage %s /" " service %s ...",
@@ -377,7 +396,7 @@ class Pipeline(object):
                     stage.service_name,
                 )
                 raise
-            logging.trace("outputs: %s" % (outputs,))
+            logging.trace("outputs: %s", outputs)
             inputs = outputs
 
         if outputs is None:  # e.g. for PISA pi
@@ -388,6 +407,40 @@ class Pipeline(object):
 
         return outputs
 
+    def report_timings(self, fmt="table", filename=None):
+        """Report the timings recorded by this pipeline's stages (see
+        `pisa.utils.profiler.TIMINGS`), e.g. of their `setup`, `compute`, and
+        `apply` functions, of translating between events and binned data
+        (`array_to_binned`, `binned_to_array`), and of entire `run`s. Names
+        start with this pipeline's `timing_prefix`.
+
+        Parameters
+        ----------
+        fmt : str, one of "table" or "json"
+            Table with times in milliseconds, or JSON with times in seconds
+
+        filename : str, optional
+            File to write the report to
+
+        Returns
+        -------
+        report : str
+
+        """
+        prefixes = [
+            "{}{}.{}.".format(self.timing_prefix, stage.stage_name, stage.service_name)
+            for stage in self.stages
+        ]
+        if fmt == "json":
+            return TIMINGS.to_json(prefixes, filename=filename)
+        if fmt != "table":
+            raise ValueError('`fmt` must be "table" or "json", got "%s"' % fmt)
+        report = TIMINGS.table(prefixes)
+        if filename is not None:
+            with open(filename, "w") as f:
+                f.write(report + "\n")
+        return report
+
     def update_params(self, params):
         """Update params for the pipeline.
 
@@ -565,6 +618,44 @@ def test_Pipeline():
         #current_hier = new_hier
         #current_mat = new_mat
 
+    #
+    # Test: report timings of the stages
+    #
+
+    for _ in range(2):
+        pipeline.get_outputs()
+    timings = json.loads(pipeline.report_timings(fmt="json"))
+    for stage in pipeline.stages:
+        name = "{}{}.{}.run".format(
+            pipeline.timing_prefix, stage.stage_name, stage.service_name
+        )
+        assert timings[name]["count"] >= 2, str(timings[name])
+    assert len(pipeline.report_timings().splitlines()) == len(timings) + 1
+
+    # Another pipeline with the same services reports its own timings
+    other_pipeline = Pipeline("settings/pipeline/example.cfg")
+    other_pipeline.get_outputs()
+    assert other_pipeline.timing_prefix != pipeline.timing_prefix
+    other_timings = json.loads(other_pipeline.report_timings(fmt="json"))
+    assert set(other_timings).isdisjoint(timings)
+    for name, stats in other_timings.items():
+        if name.endswith(".run"):
+            assert stats["count"] == 1, str(stats)
+
+    #
+    # Test: `lookup_method` is set on services not taking it as an argument
+    #
+
+    config = parse_pipeline_config("settings/pipeline/example.cfg")
+    flux_settings = config[("flux", "pi_barr_simple")]
+    flux_settings["calc_specs"] = config[("osc", "pi_prob3")]["calc_specs"]
+    flux_settings["lookup_method"] = "linear"
+    pipeline = Pipeline(config)
+    assert pipeline.flux.lookup_method == "linear"
+    assert pipeline.osc.lookup_method == "nearest"
+    assert flux_settings["lookup_method"] == "linear"
+    pipeline.get_outputs()
+
 
 def parse_args():
     """Parse command line arguments if `pipeline.py` is called as a script."""
@@ -658,6 +749,15 @@ def parse_args():
     parser.add_argument(
         "--annotate", action="store_true", help="""Annotate plots with counts per bin"""
     )
+    parser.add_argument(
+        "--timings",
+        metavar="FILE",
+        nargs="?",
+        const="-",
+        help="""Report the timings of the pipeline's stages, as a table to
+        stdout or, if FILE is given, to FILE (as JSON if FILE ends in
+        ".json").""",
+    )
     parser.add_argument(
         "-v",
         action="count",
@@ -780,6 +880,12 @@ def main(return_outputs=False):
 
         outputs = stage.run(inputs=inputs)
 
+    if args.timings == "-":
+        print(pipeline.report_timings())
+    elif args.timings is not None:
+        fmt = "json" if args.timings.endswith(".json") else "table"
+        pipeline.report_timings(fmt=fmt, filename=args.timings)
+
     for stage in pipeline[indices]:
         if not args.outdir:
             break
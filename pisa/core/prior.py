@@ -197,6 +197,14 @@ class Prior(object):
     def serializable_state(self):
         return self.state
 
+    def __getstate__(self):
+        # The llh/chi2 functions are closures and cannot be pickled; they are
+        # re-created from the state upon unpickling
+        return self.state
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
     def __init_uniform(self, llh_offset=0):
         self._state_attrs.append('llh_offset')
         self.kind = 'uniform'
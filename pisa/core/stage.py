@@ -83,12 +83,19 @@ class Stage(BaseStage):
         ensures no modification of mutable objects stored to a memory cache
         will affect other logic relying on that object remaining unchanged.
         However, this comes at the cost of more memory used and slower
-        operations.
+        operations. If False, the arrays within objects stored to the memory
+        caches are instead made read-only (see `pisa.utils.cache.freeze`), so
+        code modifying them must work on copies.
 
     outputs_cache_depth : int >= 0
 
     transforms_cache_depth : int >= 0
 
+    memcache_max_bytes : None or int >= 0
+        Limit on the size (in bytes) of each of the memory caches; least-
+        recently-used entries are removed to stay within this limit. None
+        imposes no limit beyond the cache depths.
+
     input_binning : None or interpretable as MultiDimBinning
 
     output_binning : None or interpretable as MultiDimBinning
@@ -137,9 +144,10 @@ class Stage(BaseStage):
         output_names=None,
         error_method=None,
         disk_cache=None,
-        memcache_deepcopy=True,
+        memcache_deepcopy=False,
         transforms_cache_depth=10,
         outputs_cache_depth=0,
+        memcache_max_bytes=None,
         input_binning=None,
         output_binning=None,
         debug_mode=None,
@@ -178,6 +186,8 @@ class Stage(BaseStage):
 
         self.memcache_deepcopy = memcache_deepcopy
 
+        self.memcache_max_bytes = memcache_max_bytes
+
         self.transforms_cache_depth = int(transforms_cache_depth)
 
         self.transforms_cache = None
@@ -193,11 +203,15 @@ class Stage(BaseStage):
             max_depth=self.transforms_cache_depth,
             is_lru=True,
             deepcopy=self.memcache_deepcopy,
+            max_bytes=self.memcache_max_bytes,
+            freeze=not self.memcache_deepcopy,
         )
         self.nominal_transforms_cache = MemoryCache(
             max_depth=self.transforms_cache_depth,
             is_lru=True,
             deepcopy=self.memcache_deepcopy,
+            max_bytes=self.memcache_max_bytes,
+            freeze=not self.memcache_deepcopy,
         )
 
         self.outputs_cache_depth = int(outputs_cache_depth)
@@ -212,6 +226,8 @@ class Stage(BaseStage):
                 max_depth=self.outputs_cache_depth,
                 is_lru=True,
                 deepcopy=self.memcache_deepcopy,
+                max_bytes=self.memcache_max_bytes,
+                freeze=not self.memcache_deepcopy,
             )
 
         self.disk_cache = disk_cache
@@ -394,7 +410,7 @@ class Stage(BaseStage):
             transforms_hash = self._derive_transforms_hash(
                 nominal_transforms_hash=nominal_transforms_hash
             )
-        logging.trace("transforms_hash: %s" % str(transforms_hash))
+        logging.trace("transforms_hash: %s", transforms_hash)
 
         # Load and return existing transforms if in the cache
         if (
@@ -503,7 +519,7 @@ class Stage(BaseStage):
         # `_compute_nominal_outputs` method.
         self.get_nominal_outputs(nominal_outputs_hash=nominal_transforms_hash)
 
-        logging.trace("outputs_hash: %s" % outputs_hash)
+        logging.trace("outputs_hash: %s", outputs_hash)
 
         if (
             self.outputs_cache is not None
@@ -701,7 +717,7 @@ class Stage(BaseStage):
         # If stage uses inputs, grab hash from the inputs container object
         if self.outputs_cache is not None and len(self.input_names) > 0:
             inhash = self.inputs.hash
-            logging.trace("inputs.hash = %s" % inhash)
+            logging.trace("inputs.hash = %s", inhash)
             id_objects.append(inhash)
 
         # If stage uses transforms, get hash from the transforms
@@ -709,7 +725,7 @@ class Stage(BaseStage):
         if self.use_transforms:
             transforms_hash, nominal_transforms_hash = self._derive_transforms_hash()
             id_objects.append(transforms_hash)
-            logging.trace("derived transforms hash = %s" % id_objects[-1])
+            logging.trace("derived transforms hash = %s", id_objects[-1])
 
         # Otherwise, generate sub-hash on binning and param values here
         else:
@@ -757,7 +773,7 @@ class Stage(BaseStage):
         """
         id_objects = []
         h = self.params.values_hash
-        logging.trace("self.params.values_hash = %s" % h)
+        logging.trace("self.params.values_hash = %s", h)
         id_objects.append(h)
 
         # Grab any provided nominal transforms hash, or derive it again
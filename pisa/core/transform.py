@@ -7,7 +7,7 @@ defining and applying linear transforms.
 
 from __future__ import absolute_import, division
 
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
 from collections import OrderedDict
 from copy import deepcopy
 from functools import wraps
@@ -17,8 +17,10 @@ import os
 import shutil
 import sys
 import tempfile
+import weakref
 
 import numpy as np
+from scipy import sparse
 from uncertainties import unumpy as unp
 
 from pisa import ureg, HASH_SIGFIGS
@@ -279,10 +281,29 @@ class TransformSet(object):
         output_names = []
         outputs = []
 
+        # Transforms mapping inputs through the same kernel to the same output
+        # are linear in their inputs, so apply the kernel once to the sum of
+        # the inputs rather than to each input separately. Inputs can only be
+        # summed (before being rebinned) if they share the same binning.
+        groups = OrderedDict()
+        for xform in self:
+            group_key = id(xform)
+            kernel_key = xform.kernel_key
+            if kernel_key is not None:
+                xform.validate_input(inputs)
+                binnings = set(inputs[n].binning.hash for n in xform.input_names)
+                if len(binnings) == 1:
+                    group_key = (kernel_key, binnings.pop())
+            groups.setdefault((xform.output_name, group_key), []).append(xform)
+
         # If any outputs have the same name, add them together to form a single
         # output for that name
-        for xform in self:
-            output = xform.apply(inputs)
+        for group in groups.values():
+            if len(group) == 1:
+                output = group[0].apply(inputs)
+            else:
+                input_names = [n for xform in group for n in xform.input_names]
+                output = group[0].apply_to_sum(inputs, input_names)
             name = output.name
             try:
                 idx = output_names.index(name)
@@ -305,6 +326,11 @@ class TransformSet(object):
     def __getattr__(self, attr):
         if attr in TRANS_SET_SLOTS:
             return super().__getattribute__(attr)
+        # Private and special attributes are not forwarded to the transforms
+        # (e.g. `__setstate__` is looked up before `_transforms` is set when
+        # unpickling)
+        if attr.startswith('_'):
+            raise AttributeError(attr)
         # TODO: return maps based upon name?
         #if attr in
         return TransformSet([getattr(t, attr) for t in self], name=self.name)
@@ -508,6 +534,13 @@ class Transform(object):
         """Override this method in subclasses"""
         raise NotImplementedError('Override this method in subclasses')
 
+    @property
+    def kernel_key(self):
+        """Key such that transforms with equal keys (and output names) can be
+        applied together to the sum of their inputs; None if this is not
+        possible. Override this method in subclasses supporting this."""
+        return None
+
     def validate_transform(self, xform):
         """Override this method in subclasses"""
         raise NotImplementedError('Override this method in subclasses')
@@ -557,6 +590,27 @@ def _new_obj(original_function):
     return new_function
 
 
+_SPARSE_KERNELS = {}
+"""Sparse versions of dense kernels, keyed by `id` of the dense array, such
+that transforms created from the same kernel share its sparse version"""
+
+
+def _to_sparse(xform_array, num_rows):
+    """Convert dense `xform_array` to a CSR matrix with `num_rows` rows (i.e.,
+    flattened input bins) and flattened output bins as columns"""
+    key = id(xform_array)
+    entry = _SPARSE_KERNELS.get(key)
+    if (entry is not None and entry[0]() is xform_array
+            and entry[1].shape[0] == num_rows):
+        return entry[1]
+    csr = sparse.csr_matrix(xform_array.reshape(num_rows, -1))
+    _SPARSE_KERNELS[key] = (
+        weakref.ref(xform_array, lambda _: _SPARSE_KERNELS.pop(key, None)),
+        csr
+    )
+    return csr
+
+
 # TODO: integrate uncertainties module in with this so that a transform can
 #       introduce (augment) error of an input Map for producing a more accurate
 #       estimate of the error in the output map.
@@ -609,6 +663,13 @@ class BinnedTensorTransform(Transform):
     error_method : None, bool, or string
         Define the method for error propaation on unumpy arrays
 
+    sparse : None or bool
+        Whether to store a smearing kernel (a transform contracted with all
+        input dimensions, see Notes) as a sparse (CSR) matrix of flattened
+        input bins by flattened output bins. If None, this is done if the
+        fraction of non-zero elements in `xform_array` is below
+        `SPARSE_DENSITY_THRESHOLD`. Transforms with errors are never sparse.
+
     output_name : string
 
     input_binning : MultiDimBinning
@@ -638,24 +699,37 @@ class BinnedTensorTransform(Transform):
     I.e., the first dimension of the input sent to the transform has a length
     the same number of input maps requested by the transform.
 
+    A smearing kernel is applied by contracting its leading dimensions, which
+    must match the shape of the input (see above), with all dimensions of the
+    input. Such kernels are mostly zeros and are stored and applied as sparse
+    matrices if `sparse` is True or if their density is low enough (see the
+    `sparse` parameter); `xform_array` nonetheless returns the dense array.
+
     """
     _slots = tuple(list(Transform._slots) +
-                   ['_input_binning', '_output_binning', '_xform_array'])
+                   ['_input_binning', '_output_binning', '_xform_array',
+                    '_xform_shape', 'sparse'])
 
     _state_attrs = tuple(list(Transform._state_attrs) +
                          ['input_binning', 'output_binning', 'xform_array'])
 
+    SPARSE_DENSITY_THRESHOLD = 0.1
+    """Kernels with a lower fraction of non-zero elements are stored as sparse
+    matrices if `sparse` is None"""
+
     def __init__(self, input_names, output_name, input_binning, output_binning,
                  xform_array, sum_inputs=False, error_array=None, tex=None,
-                 error_method=None, hash=None): # pylint: disable=redefined-builtin
+                 error_method=None, hash=None, sparse=None): # pylint: disable=redefined-builtin
         super().__init__(
             input_names=input_names, output_name=output_name,
             input_binning=input_binning, output_binning=output_binning,
             tex=tex, hash=hash, error_method=error_method
         )
+        self.sum_inputs = sum_inputs
+        self.sparse = sparse
         self._xform_array = None
+        self._xform_shape = None
         self.xform_array = xform_array
-        self.sum_inputs = sum_inputs
         if error_array is not None:
             self.set_errors(error_array)
 
@@ -663,17 +737,39 @@ class BinnedTensorTransform(Transform):
     def serializable_state(self):
         """OrderedDict : State of the object in a format that is serializable"""
         state = super().serializable_state
-        state['xform_array'] = self.nominal_values
-        state['error_array'] = self.std_devs
+        if self.is_sparse:
+            csr = self._xform_array
+            state['xform_array'] = OrderedDict([
+                ('sparse', 'csr'),
+                ('shape', self._xform_shape),
+                ('data', csr.data),
+                ('indices', csr.indices),
+                ('indptr', csr.indptr),
+            ])
+            state['error_array'] = None
+        else:
+            state['xform_array'] = self.nominal_values
+            state['error_array'] = self.std_devs
         return state
 
     @property
     def hashable_state(self):
         """OrderedDict : State of the objec that can be used for hashing"""
         state = super().hashable_state
-        state['xform_array'] = normQuant(self.nominal_values,
-                                         sigfigs=HASH_SIGFIGS)
-        state['error_array'] = normQuant(self.std_devs, sigfigs=HASH_SIGFIGS)
+        if self.is_sparse:
+            csr = self._xform_array
+            state['xform_array'] = OrderedDict([
+                ('shape', self._xform_shape),
+                ('data', normQuant(csr.data, sigfigs=HASH_SIGFIGS)),
+                ('indices', csr.indices),
+                ('indptr', csr.indptr),
+            ])
+            state['error_array'] = None
+        else:
+            state['xform_array'] = normQuant(self.nominal_values,
+                                             sigfigs=HASH_SIGFIGS)
+            state['error_array'] = normQuant(self.std_devs,
+                                             sigfigs=HASH_SIGFIGS)
         return state
 
     def set_errors(self, error_array):
@@ -689,11 +785,12 @@ class BinnedTensorTransform(Transform):
 
         """
         if error_array is None:
-            super().__setattr__(
-                '_xform_array', self.nominal_values
-            )
+            if not self.is_sparse:
+                super().__setattr__(
+                    '_xform_array', self.nominal_values
+                )
             return
-        assert error_array.shape == self.xform_array.shape
+        assert error_array.shape == self._xform_shape
         super().__setattr__(
             '_xform_array',
             unp.uarray(self.xform_array, np.ascontiguousarray(error_array))
@@ -702,12 +799,56 @@ class BinnedTensorTransform(Transform):
     @property
     def xform_array(self):
         """Numpy ndarray containing raw transform"""
+        if self.is_sparse:
+            return self._xform_array.toarray().reshape(self._xform_shape)
         return self._xform_array
 
     @xform_array.setter
     def xform_array(self, x):
+        # Sparse state, as produced by `serializable_state`
+        if isinstance(x, Mapping):
+            assert x['sparse'] == 'csr', str(x['sparse'])
+            shape = tuple(int(n) for n in x['shape'])
+            indptr = np.asarray(x['indptr'], dtype=np.int64)
+            num_rows = len(indptr) - 1
+            self._xform_array = sparse.csr_matrix(
+                (np.asarray(x['data']), np.asarray(x['indices'], np.int64),
+                 indptr),
+                shape=(num_rows, int(np.prod(shape)) // num_rows)
+            )
+            self._xform_shape = shape
+            return
+
         self.validate_transform(self.input_binning, self.output_binning, x)
-        self._xform_array = np.ascontiguousarray(x)
+        x = np.ascontiguousarray(x)
+        self._xform_shape = x.shape
+        num_rows = self._num_kernel_rows(x)
+        if num_rows is not None:
+            to_sparse = self.sparse
+            if to_sparse is None:
+                to_sparse = (
+                    np.count_nonzero(x) < self.SPARSE_DENSITY_THRESHOLD * x.size
+                )
+            if to_sparse:
+                x = _to_sparse(x, num_rows)
+        self._xform_array = x
+
+    def _num_kernel_rows(self, x):
+        """Number of (flattened) input bins if `x` is a smearing kernel that
+        can be stored as a sparse matrix, or else None"""
+        if x.dtype.hasobject or self.input_binning is None:
+            return None
+        in_shape = tuple(self.input_binning.shape)
+        if self.num_inputs > 1 and not self.sum_inputs:
+            in_shape = (self.num_inputs,) + in_shape
+        if x.ndim <= len(in_shape) or x.shape[:len(in_shape)] != in_shape:
+            return None
+        return int(np.prod(in_shape))
+
+    @property
+    def is_sparse(self):
+        """bool : whether the transform is stored as a sparse matrix"""
+        return sparse.issparse(self._xform_array)
 
     @property
     def nominal_values(self):
@@ -740,6 +881,16 @@ class BinnedTensorTransform(Transform):
     def __eq__(self, other):
         if not isinstance(other, BinnedTensorTransform):
             return False
+        if self.is_sparse != other.is_sparse:
+            return (
+                recursiveEquality(Transform.hashable_state.fget(self),
+                                  Transform.hashable_state.fget(other))
+                and recursiveEquality(
+                    normQuant(self.nominal_values, sigfigs=HASH_SIGFIGS),
+                    normQuant(other.nominal_values, sigfigs=HASH_SIGFIGS)
+                )
+                and np.all(self.std_devs == other.std_devs)
+            )
         return recursiveEquality(self.hashable_state, other.hashable_state)
 
     @_new_obj
@@ -851,9 +1002,9 @@ class BinnedTensorTransform(Transform):
         """
         self.validate_input(inputs)
 
-        # TODO: In the multiple inputs / single output case and depending upon
-        # the dimensions of the transform, for efficiency purposes we should
-        # make sure that an operation is not carried out like
+        # NOTE: In the multiple inputs / single output case and depending upon
+        # the dimensions of the transform, for efficiency purposes an operation
+        # is not carried out like
         #
         #   (input0 [*] transform) + (input1 [*] transform) = output
         #
@@ -862,7 +1013,10 @@ class BinnedTensorTransform(Transform):
         #   (input0 + input1) [*] transform = output
         #
         # where [*] is some linear operation, like element-by-element
-        # multiplication, a dot product, etc.
+        # multiplication, a dot product, etc. This is done here if
+        # `sum_inputs` is True, and by `TransformSet.apply` for separate
+        # transforms sharing the same kernel and output (see `kernel_key` and
+        # `apply_to_sum`).
         #
         # E.g., for a 1D dot product (dimensionality-reducing linear operation)
         # with M_in inputs and N_el elements in each
@@ -897,9 +1051,7 @@ class BinnedTensorTransform(Transform):
 
         # Stack inputs, sum inputs, *then* rebin (if necessary)
         elif self.sum_inputs:
-            input_array = np.sum([inputs[n].hist for n in names], axis=0)
-            input_array = rebin(input_array, orig_binning=in0.binning,
-                                new_binning=self.input_binning)
+            input_array = self._sum_inputs(inputs, names)
 
         # Rebin (if necessary) then stack
         else:
@@ -907,10 +1059,68 @@ class BinnedTensorTransform(Transform):
                            for n in names]
             input_array = np.stack(input_array, axis=0)
 
+        return self._apply_to_array(input_array)
+
+    def _sum_inputs(self, inputs, input_names):
+        """Sum the maps `input_names` in `inputs` and rebin to the
+        transform's input binning (rebinning each map first unless they all
+        share the same binning)"""
+        maps = [inputs[n] for n in input_names]
+        if any(m.binning != maps[0].binning for m in maps[1:]):
+            return np.sum([m.rebin(self.input_binning).hist for m in maps],
+                          axis=0)
+        input_array = np.sum([m.hist for m in maps], axis=0)
+        return rebin(input_array, orig_binning=maps[0].binning,
+                     new_binning=self.input_binning)
+
+    @property
+    def kernel_key(self):
+        """Key identifying this transform's kernel and binnings, or None if
+        the transform cannot be applied to the sum of its inputs. Transforms
+        with equal keys can be applied at once to the sum of their (summed)
+        inputs; see `apply_to_sum`."""
+        if self.num_inputs > 1 and not self.sum_inputs:
+            return None
+        if (isinstance(self.error_method, str) and
+                self.error_method.strip().lower() == 'fixed'):
+            return None
+        return (id(self._xform_array), self.input_binning.hash,
+                self.output_binning.hash)
+
+    def apply_to_sum(self, inputs, input_names):
+        """Apply the transform to the sum of the maps `input_names` in
+        `inputs`, which is equivalent to (but faster than) summing the outputs
+        of transforms with equal `kernel_key` applied to those maps. The maps
+        should share the same binning, else each is rebinned separately.
+
+        Parameters
+        ----------
+        inputs : MapSet
+        input_names : sequence of str
+
+        Returns
+        -------
+        output : Map
+
+        """
+        for input_name in input_names:
+            assert input_name in inputs, \
+                    'Input "%s" expected; got: %s.' \
+                    % (input_name, inputs.names)
+        output = self._apply_to_array(self._sum_inputs(inputs, input_names))
+        output.name = self.output_name
+        return output
+
+    def _apply_to_array(self, input_array):
+        """Apply the transform to the (rebinned, and summed or stacked) input
+        array and return the output Map"""
         # TODO: is logic kosher here?
 
+        if self.is_sparse:
+            output = self._apply_sparse(input_array)
+
         # Transform same shape: element-by-element multiplication
-        if self.xform_array.shape == input_array.shape:
+        elif self.xform_array.shape == input_array.shape:
             if (isinstance(self.error_method, str) and
                     self.error_method.strip().lower() == 'fixed'):
                 # don't scale errors here
@@ -942,8 +1152,9 @@ class BinnedTensorTransform(Transform):
         #    output = map2d_kernel4d(input_array, self.xform_array)
 
         elif len(self.xform_array.shape) == 2*len(input_array.shape):
+            axes = np.arange(len(input_array.shape))
             output = np.tensordot(input_array, self.xform_array,
-                                  axes=([0, 1], [0, 1]))
+                                  axes=(axes, axes))
 
         elif (input_array.shape ==
               self.xform_array.shape[0:len(input_array.shape)]):
@@ -969,6 +1180,34 @@ class BinnedTensorTransform(Transform):
 
         return output
 
+    def _apply_sparse(self, input_array):
+        """Contract `input_array` with the sparse kernel (equivalent to
+        `tensordot` over all dimensions of `input_array`)"""
+        num_rows = self._xform_array.shape[0]
+        if input_array.size != num_rows:
+            raise ValueError(
+                'Unhandled shapes for input(s) "%s": %s and'
+                ' transform: %s.'
+                %(', '.join(self.input_names), input_array.shape,
+                  self._xform_shape)
+            )
+        out_shape = self._xform_shape[input_array.ndim:]
+        vec = input_array.reshape(-1)
+        csr = self._xform_array
+        if not vec.dtype.hasobject:
+            return csr.T.dot(vec).reshape(out_shape)
+
+        # Values with uncertainties (not supported by scipy): add each input
+        # bin's contributions to the output bins it is smeared into
+        output = np.zeros(csr.shape[1], dtype=object)
+        indptr, indices, data = csr.indptr, csr.indices, csr.data
+        for in_idx in range(num_rows):
+            start, stop = indptr[in_idx], indptr[in_idx + 1]
+            if start == stop:
+                continue
+            output[indices[start:stop]] += vec[in_idx] * data[start:stop]
+        return output.reshape(out_shape)
+
 
 def test_BinnedTensorTransform():
     """Unit tests for BinnedTensorTransform class"""
@@ -1020,9 +1259,44 @@ def test_BinnedTensorTransform():
     )
     assert np.all((xform2 + 2).xform_array - xform2.xform_array == 2)
 
+    # Smearing kernel with few non-zero elements is stored sparse, but yields
+    # the same outputs as the dense kernel
+    kernel = np.zeros(binning.shape + binning.shape)
+    for idx in np.ndindex(*binning.shape):
+        kernel[idx][idx] = 0.7
+        kernel[idx][(idx[0] + 1) % binning.shape[0], idx[1]] = 0.3
+    xform3 = BinnedTensorTransform(
+        input_names=['nue', 'numu'],
+        output_name='nue_numu',
+        input_binning=binning,
+        output_binning=binning,
+        xform_array=kernel,
+        sum_inputs=True
+    )
+    xform3_dense = BinnedTensorTransform(
+        input_names=['nue', 'numu'],
+        output_name='nue_numu',
+        input_binning=binning,
+        output_binning=binning,
+        xform_array=kernel,
+        sum_inputs=True,
+        sparse=False
+    )
+    assert xform3.is_sparse and not xform3_dense.is_sparse
+    assert np.all(xform3.xform_array == kernel)
+    assert xform3 == xform3_dense
+    out, out_dense = xform3.apply(inputs), xform3_dense.apply(inputs)
+    assert np.allclose(out.nominal_values, out_dense.nominal_values)
+    assert np.allclose(out.std_devs, out_dense.std_devs)
+    inputs_nominal = MapSet([m.__class__(name=m.name, binning=m.binning,
+                                         hist=m.nominal_values)
+                             for m in inputs])
+    assert np.allclose(xform3.apply(inputs_nominal).hist,
+                       xform3_dense.apply(inputs_nominal).hist)
+
     testdir = tempfile.mkdtemp()
     try:
-        for i, t in enumerate([xform0, xform1, xform2]):
+        for i, t in enumerate([xform0, xform1, xform2, xform3]):
             t_file = os.path.join(testdir, str(i) + '.json')
             t.to_json(t_file)
             t_ = BinnedTensorTransform.from_json(t_file)
@@ -1044,6 +1318,43 @@ def test_BinnedTensorTransform():
 
     _ = xforms.apply(inputs)
 
+    # Transforms sharing a kernel and an output are applied to the sum of
+    # their inputs, with the same result as summing the individual outputs
+    xforms = TransformSet([
+        BinnedTensorTransform(
+            input_names=name, output_name='nu', input_binning=binning,
+            output_binning=binning, xform_array=xform_array
+        )
+        for name, xform_array in [('nue', kernel), ('numu', kernel),
+                                  ('nue', 2*np.ones(binning.shape))]
+    ])
+    assert xforms[0].kernel_key == xforms[1].kernel_key
+    assert xforms[0].kernel_key != xforms[2].kernel_key
+    outputs = xforms.apply(inputs)
+    assert outputs.names == ['nu']
+    expected = sum([xform.apply(inputs) for xform in xforms])
+    assert np.allclose(outputs['nu'].nominal_values, expected.nominal_values)
+    assert np.allclose(outputs['nu'].std_devs, expected.std_devs)
+
+    # Inputs with different binnings are not summed before being rebinned
+    fine_inputs = MapSet([
+        inputs['nue'],
+        Map(name='numu', binning=binning.oversample(2),
+            hist=np.random.random(binning.oversample(2).shape)),
+    ])
+    assert fine_inputs['numu'].binning != binning
+    outputs = xforms.apply(fine_inputs)
+    expected = sum([xform.apply(fine_inputs) for xform in xforms])
+    assert np.allclose(outputs['nu'].nominal_values, expected.nominal_values)
+
+    # Inputs of all transforms sharing a kernel are validated
+    try:
+        xforms.apply(MapSet([inputs['nue']]))
+    except AssertionError:
+        pass
+    else:
+        raise Exception('missing input "numu" should have been detected')
+
     # TODO: get this working above, then test here!
     #xforms2 = xforms * 2
 
@@ -13,6 +13,7 @@ Module for data representation translation methods
 from __future__ import absolute_import, print_function, division
 
 from copy import deepcopy
+import math
 
 import numpy as np
 from numba import guvectorize, SmartArray, cuda
@@ -21,26 +22,45 @@ from pisa import FTYPE, TARGET
 from pisa.core.binning import OneDimBinning, MultiDimBinning
 from pisa.utils.comparisons import recursiveEquality
 from pisa.utils.log import logging, set_verbosity
-from pisa.utils.numba_tools import myjit, WHERE
+from pisa.utils.numba_tools import myjit, CACHE, WHERE, ftype, int64
+from pisa.utils.profiler import TIMINGS
 from pisa.utils import vectorizer
 
 __all__ = [
+    'LOOKUP_METHODS',
+    'MAX_INTERP_DIMS',
     'resample',
     'histogram',
     'lookup',
+    'interpolate',
     'find_index',
     'find_index_unsafe',
     'find_index_cuda',
+    'find_index_fast',
+    'find_index_fast_unsafe',
+    'bin_descriptor',
     'test_histogram',
     'test_find_index',
+    'test_find_index_fast',
+    'test_interpolate',
 ]
 
 
 FX = 'f4' if FTYPE == np.float32 else 'f8'
 
+LOOKUP_METHODS = ('nearest', 'linear', 'cubic')
+"""Methods available for looking up binned values at event positions: the
+value of the bin an event falls into ('nearest'), or multi-linear ('linear') /
+tensor-product Catmull-Rom ('cubic') interpolation between bin centers"""
+
+MAX_INTERP_DIMS = 8
+"""Max number of binning dimensions supported by the interpolating lookup
+(limited by the size of the kernels' local arrays)"""
+
 
 # --------- resampling ------------
 
+@TIMINGS.timed('translation.resample')
 def resample(weights, old_sample, old_binning, new_sample, new_binning):
     """Resample binned data with a given binning into any arbitrary
     `new_binning`
@@ -90,6 +110,7 @@ def resample(weights, old_sample, old_binning, new_sample, new_binning):
 
 # --------- histogramming methods ---------------
 
+@TIMINGS.timed('translation.histogram')
 def histogram(sample, weights, binning, averaged):
     """Histogram `sample` points, weighting by `weights`, according to `binning`.
 
@@ -135,8 +156,11 @@ def histogram_gpu(sample, weights, binning, apply_weights=True):  # pylint: disa
             flat_hist = SmartArray(np.zeros(binning.size, dtype=FTYPE))
             arrays = False
         size = weights.shape[0]
+        descrs = [bin_descriptor(dim) for dim in binning]
         d_bin_edges_x = cuda.to_device(bin_edges[0])
         d_bin_edges_y = cuda.to_device(bin_edges[1])
+        d_descr_x = cuda.to_device(descrs[0])
+        d_descr_y = cuda.to_device(descrs[1])
         if binning.num_dims == 2:
             if arrays:
                 histogram_2d_kernel_arrays[(size + 511) // 512, 512](
@@ -145,6 +169,8 @@ def histogram_gpu(sample, weights, binning, apply_weights=True):  # pylint: disa
                     flat_hist,
                     d_bin_edges_x,
                     d_bin_edges_y,
+                    d_descr_x,
+                    d_descr_y,
                     weights.get('gpu'),
                     apply_weights,
                 )
@@ -155,11 +181,14 @@ def histogram_gpu(sample, weights, binning, apply_weights=True):  # pylint: disa
                     flat_hist,
                     d_bin_edges_x,
                     d_bin_edges_y,
+                    d_descr_x,
+                    d_descr_y,
                     weights.get('gpu'),
                     apply_weights,
                 )
         elif binning.num_dims == 3:
             d_bin_edges_z = cuda.to_device(bin_edges[2])
+            d_descr_z = cuda.to_device(descrs[2])
             if arrays:
                 histogram_3d_kernel_arrays[(size + 511) // 512, 512](
                     sample[0].get('gpu'),
@@ -169,6 +198,9 @@ def histogram_gpu(sample, weights, binning, apply_weights=True):  # pylint: disa
                     d_bin_edges_x,
                     d_bin_edges_y,
                     d_bin_edges_z,
+                    d_descr_x,
+                    d_descr_y,
+                    d_descr_z,
                     weights.get('gpu'),
                     apply_weights,
                 )
@@ -181,6 +213,9 @@ def histogram_gpu(sample, weights, binning, apply_weights=True):  # pylint: disa
                     d_bin_edges_x,
                     d_bin_edges_y,
                     d_bin_edges_z,
+                    d_descr_x,
+                    d_descr_y,
+                    d_descr_z,
                     weights.get('gpu'),
                     apply_weights,
                 )
@@ -224,6 +259,8 @@ def histogram_2d_kernel(
     flat_hist,
     bin_edges_x,
     bin_edges_y,
+    descr_x,
+    descr_y,
     weights,
     apply_weights,
 ):
@@ -235,8 +272,8 @@ def histogram_2d_kernel(
             and sample_y[i] >= bin_edges_y[0]
             and sample_y[i] <= bin_edges_y[-1]
         ):
-            idx_x = find_index_unsafe(sample_x[i], bin_edges_x)
-            idx_y = find_index_unsafe(sample_y[i], bin_edges_y)
+            idx_x = find_index_fast_unsafe(sample_x[i], bin_edges_x, descr_x)
+            idx_y = find_index_fast_unsafe(sample_y[i], bin_edges_y, descr_y)
             idx = idx_x * (bin_edges_y.size - 1) + idx_y
             if apply_weights:
                 cuda.atomic.add(flat_hist, idx, weights[i])
@@ -252,6 +289,8 @@ def histogram_2d_kernel_arrays(
     flat_hist,
     bin_edges_x,
     bin_edges_y,
+    descr_x,
+    descr_y,
     weights,
     apply_weights,
 ):
@@ -263,8 +302,8 @@ def histogram_2d_kernel_arrays(
             and sample_y[i] >= bin_edges_y[0]
             and sample_y[i] <= bin_edges_y[-1]
         ):
-            idx_x = find_index_unsafe(sample_x[i], bin_edges_x)
-            idx_y = find_index_unsafe(sample_y[i], bin_edges_y)
+            idx_x = find_index_fast_unsafe(sample_x[i], bin_edges_x, descr_x)
+            idx_y = find_index_fast_unsafe(sample_y[i], bin_edges_y, descr_y)
             idx = idx_x * (bin_edges_y.size - 1) + idx_y
             for j in range(flat_hist.shape[1]):
                 if apply_weights:
@@ -283,6 +322,9 @@ def histogram_3d_kernel(
     bin_edges_x,
     bin_edges_y,
     bin_edges_z,
+    descr_x,
+    descr_y,
+    descr_z,
     weights,
     apply_weights,
 ):
@@ -296,9 +338,9 @@ def histogram_3d_kernel(
             and sample_z[i] >= bin_edges_z[0]
             and sample_z[i] <= bin_edges_z[-1]
         ):
-            idx_x = find_index_unsafe(sample_x[i], bin_edges_x)
-            idx_y = find_index_unsafe(sample_y[i], bin_edges_y)
-            idx_z = find_index_unsafe(sample_z[i], bin_edges_z)
+            idx_x = find_index_fast_unsafe(sample_x[i], bin_edges_x, descr_x)
+            idx_y = find_index_fast_unsafe(sample_y[i], bin_edges_y, descr_y)
+            idx_z = find_index_fast_unsafe(sample_z[i], bin_edges_z, descr_z)
             idx = (
                 idx_x * (bin_edges_y.size - 1) * (bin_edges_z.size - 1)
                 + idx_y * (bin_edges_z.size - 1)
@@ -320,6 +362,9 @@ def histogram_3d_kernel_arrays(
     bin_edges_x,
     bin_edges_y,
     bin_edges_z,
+    descr_x,
+    descr_y,
+    descr_z,
     weights,
     apply_weights,
 ):
@@ -333,9 +378,9 @@ def histogram_3d_kernel_arrays(
             and sample_z[i] >= bin_edges_z[0]
             and sample_z[i] <= bin_edges_z[-1]
         ):
-            idx_x = find_index_unsafe(sample_x[i], bin_edges_x)
-            idx_y = find_index_unsafe(sample_y[i], bin_edges_y)
-            idx_z = find_index_unsafe(sample_z[i], bin_edges_z)
+            idx_x = find_index_fast_unsafe(sample_x[i], bin_edges_x, descr_x)
+            idx_y = find_index_fast_unsafe(sample_y[i], bin_edges_y, descr_y)
+            idx_z = find_index_fast_unsafe(sample_z[i], bin_edges_z, descr_z)
             idx = (
                 idx_x * (bin_edges_y.size - 1) * (bin_edges_z.size - 1)
                 + idx_y * (bin_edges_z.size - 1)
@@ -351,7 +396,8 @@ def histogram_3d_kernel_arrays(
 
 # ---------- Lookup methods ---------------
 
-def lookup(sample, flat_hist, binning):
+@TIMINGS.timed('translation.lookup')
+def lookup(sample, flat_hist, binning, method='nearest'):
     """The inverse of histograming: Extract the histogram values at `sample`
     points.
 
@@ -363,6 +409,10 @@ def lookup(sample, flat_hist, binning):
         Histogram values
     binning : num_dims MultiDimBinning
         Histogram's binning
+    method : str, one of `LOOKUP_METHODS`
+        'nearest' assigns each sample point the value of the bin it falls in;
+        'linear' and 'cubic' interpolate between bin centers (see
+        `interpolate`)
 
     Returns
     -------
@@ -370,11 +420,19 @@ def lookup(sample, flat_hist, binning):
 
     Notes
     -----
-    Only handles 2d and 3d right now
+    Only handles 2d and 3d right now for `method` 'nearest'
 
     """
+    if method not in LOOKUP_METHODS:
+        raise ValueError(
+            f'`method` must be one of {LOOKUP_METHODS}; got "{method}" instead'
+        )
+    if method != 'nearest':
+        return interpolate(sample, flat_hist, binning, method=method)
+
     assert binning.num_dims in [2, 3], 'can only do 2d and 3d at the moment'
     bin_edges = [edges.magnitude for edges in binning.bin_edges]
+    descrs = [bin_descriptor(dim) for dim in binning]
     # TODO: directly return smart array
     if flat_hist.ndim == 1:
         #print 'looking up 1D'
@@ -386,6 +444,8 @@ def lookup(sample, flat_hist, binning):
                 flat_hist.get(WHERE),
                 bin_edges[0],
                 bin_edges[1],
+                descrs[0],
+                descrs[1],
                 out=hist_vals.get(WHERE),
             )
         elif binning.num_dims == 3:
@@ -397,6 +457,9 @@ def lookup(sample, flat_hist, binning):
                 bin_edges[0],
                 bin_edges[1],
                 bin_edges[2],
+                descrs[0],
+                descrs[1],
+                descrs[2],
                 out=hist_vals.get(WHERE),
             )
     elif flat_hist.ndim == 2:
@@ -411,6 +474,8 @@ def lookup(sample, flat_hist, binning):
                 flat_hist.get(WHERE),
                 bin_edges[0],
                 bin_edges[1],
+                descrs[0],
+                descrs[1],
                 out=hist_vals.get(WHERE),
             )
         elif binning.num_dims == 3:
@@ -422,6 +487,9 @@ def lookup(sample, flat_hist, binning):
                 bin_edges[0],
                 bin_edges[1],
                 bin_edges[2],
+                descrs[0],
+                descrs[1],
+                descrs[2],
                 out=hist_vals.get(WHERE),
             )
     else:
@@ -432,6 +500,92 @@ def lookup(sample, flat_hist, binning):
     return hist_vals
 
 
+def interpolate(sample, flat_hist, binning, method='linear'):
+    """Interpolate histogram values at `sample` points between the (weighted)
+    centers of the bins of an arbitrary-dimensional `binning`.
+
+    Dimensions that are logarithmic (`is_log`) are interpolated in the log of
+    the coordinate. Between the outermost bin centers and the outer bin edges
+    the value of the outermost bin is extended, while points outside of the
+    binning (or nan) get a value of zero, the same as for
+    `lookup(..., method='nearest')`.
+
+    Parameters
+    ----------
+    sample : num_dims list of length-num_samples SmartArrays
+        Points at which to interpolate the histogram's values
+    flat_hist : SmartArray
+        Histogram values, either of shape (num_bins,) or (num_bins, d)
+    binning : num_dims MultiDimBinning
+        Histogram's binning
+    method : str, 'linear' or 'cubic'
+        Multi-linear or tensor-product cubic (Catmull-Rom) interpolation. Note
+        that the latter can over-/undershoot the values of neighbouring bins,
+        e.g. yield (slightly) negative values close to zero.
+
+    Returns
+    -------
+    hist_vals : SmartArray of shape (num_samples,) or (num_samples, d)
+
+    """
+    binning = MultiDimBinning(binning)
+    if binning.num_dims > MAX_INTERP_DIMS:
+        raise NotImplementedError(
+            f'Can interpolate in at most {MAX_INTERP_DIMS} dimensions'
+        )
+    if method == 'linear':
+        interp_func = interp_linear_vectorized
+    elif method == 'cubic':
+        interp_func = interp_cubic_vectorized
+    else:
+        raise ValueError(f'Unknown interpolation method "{method}"')
+
+    # concatenate the interpolation nodes of all dimensions, which are the
+    # bin centers (in log space for log dimensions)
+    centers, offsets, is_log, lower, upper = [], [0], [], [], []
+    for dim in binning:
+        dim_centers = dim.weighted_centers.m
+        if dim.is_log:
+            dim_centers = np.log(dim_centers)
+        centers.append(dim_centers)
+        offsets.append(offsets[-1] + dim.num_bins)
+        is_log.append(dim.is_log)
+        lower.append(dim.edge_magnitudes[0])
+        upper.append(dim.edge_magnitudes[-1])
+
+    centers = SmartArray(np.concatenate(centers).astype(FTYPE))
+    offsets = SmartArray(np.array(offsets, dtype=np.int64))
+    is_log = SmartArray(np.array(is_log, dtype=np.int64))
+    lower = SmartArray(np.array(lower, dtype=FTYPE))
+    upper = SmartArray(np.array(upper, dtype=FTYPE))
+
+    points = SmartArray(
+        np.stack([s.get('host') for s in sample], axis=1).astype(FTYPE)
+    )
+    hist = flat_hist.get('host')
+    scalar = hist.ndim == 1
+    hist = SmartArray(hist.reshape(hist.shape[0], -1).astype(FTYPE))
+
+    hist_vals = SmartArray(
+        np.zeros((points.shape[0], hist.shape[1]), dtype=FTYPE)
+    )
+    interp_func(
+        points.get(WHERE),
+        hist.get(WHERE),
+        centers.get(WHERE),
+        offsets.get(WHERE),
+        is_log.get(WHERE),
+        lower.get(WHERE),
+        upper.get(WHERE),
+        out=hist_vals.get(WHERE),
+    )
+    hist_vals.mark_changed(WHERE)
+
+    if scalar:
+        return SmartArray(hist_vals.get('host').ravel())
+    return hist_vals
+
+
 @myjit
 def find_index(val, bin_edges):
     """Find index in binning for `val`. If `val` is below binning range or is
@@ -461,8 +615,6 @@ def find_index(val, bin_edges):
         0 <= `bin_idx` <= num_bins - 1
 
     """
-    # TODO: support fast computation for lin and log binnings?
-
     num_edges = len(bin_edges)
     num_bins = num_edges - 1
     assert num_bins >= 1, 'bin_edges must define at least one bin'
@@ -505,6 +657,7 @@ def find_index_unsafe(val, bin_edges):
     See also
     --------
     find_index : includes bounds checking and handling of special cases
+    find_index_fast_unsafe : constant-time lookup for regular binnings
 
     """
     # Initialize to point to left-most edge
@@ -530,6 +683,116 @@ def find_index_unsafe(val, bin_edges):
     return left_edge_idx - 1
 
 
+def bin_descriptor(dim):
+    """Describe the spacing of the bins of `dim` such that bin indices of
+    regularly spaced (linear or logarithmic) binnings can be computed
+    arithmetically by `find_index_fast`.
+
+    Parameters
+    ----------
+    dim : OneDimBinning
+
+    Returns
+    -------
+    descriptor : length-3 array of FTYPE
+        ``[kind, offset, scale]`` where `kind` is 0 for irregular, 1 for
+        linearly-uniform and 2 for logarithmically-uniform binnings; the
+        (approximate) index of a value `x` is then ``floor((x - offset) *
+        scale)``, with `x` replaced by ``log(x)`` for `kind` 2
+
+    """
+    edges = dim.edge_magnitudes
+    kind, offset, scale = 0, 0., 0.
+    if dim.num_bins > 1 and not dim.is_irregular and np.all(np.isfinite(edges)):
+        if dim.is_log:
+            kind = 2
+            edges = np.log(edges)
+        else:
+            kind = 1
+        offset = edges[0]
+        scale = dim.num_bins / (edges[-1] - edges[0])
+    return np.array([kind, offset, scale], dtype=FTYPE)
+
+
+@myjit
+def find_index_fast(val, bin_edges, descriptor):
+    """Find index in binning for `val`, same as `find_index` but computing the
+    index of regularly spaced binnings arithmetically.
+
+    Parameters
+    ----------
+    val : scalar
+    bin_edges : 1d numpy ndarray of 2 or more scalars
+    descriptor : array
+        As returned by `bin_descriptor` for the binning `bin_edges` belong to
+
+    Returns
+    -------
+    bin_idx : int in [-1, num_bins]
+        See `find_index`
+
+    """
+    num_bins = len(bin_edges) - 1
+
+    if val >= bin_edges[0]:
+        if val <= bin_edges[-1]:
+            bin_idx = find_index_fast_unsafe(val, bin_edges, descriptor)
+        else:
+            bin_idx = num_bins
+    else:  # either value is below first bin or is NaN
+        bin_idx = -1
+
+    return bin_idx
+
+
+@myjit
+def find_index_fast_unsafe(val, bin_edges, descriptor):
+    """Find bin index of `val` within binning defined by `bin_edges` and
+    `descriptor`.
+
+    For linearly- or logarithmically-uniform binnings the index is computed
+    with a single multiply-and-floor; the result is then moved to the
+    neighbouring bin if rounding put it on the wrong side of an edge, such
+    that edge inclusivity is exactly that of `find_index_unsafe`, which is
+    used for irregular binnings.
+
+    Validity of `val` and `bin_edges` is not checked.
+
+    Parameters
+    ----------
+    val : scalar
+        Assumed to be within range of `bin_edges` (including lower and upper
+        bin edges)
+    bin_edges : array
+    descriptor : array
+        As returned by `bin_descriptor`
+
+    Returns
+    -------
+    index
+
+    """
+    kind = descriptor[0]
+    if kind == 0:
+        return find_index_unsafe(val, bin_edges)
+
+    x = val
+    if kind == 2:
+        x = math.log(val)
+
+    last_idx = len(bin_edges) - 2
+    bin_idx = int(math.floor((x - descriptor[1]) * descriptor[2]))
+    bin_idx = min(max(0, bin_idx), last_idx)
+
+    # ``>=``: bin left edges are inclusive
+    while bin_idx > 0 and val < bin_edges[bin_idx]:
+        bin_idx -= 1
+    while bin_idx < last_idx and val >= bin_edges[bin_idx + 1]:
+        bin_idx += 1
+
+    return bin_idx
+
+
 @cuda.jit
 def find_index_cuda(val, bin_edges, out):
     """CUDA wrapper of `find_index` kernel e.g. for running tests on GPU
@@ -548,9 +811,10 @@ def find_index_cuda(val, bin_edges, out):
 
 
 @guvectorize(
-    [f'({FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:])'],
-    '(), (), (j), (k), (l) -> ()',
+    [f'({FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:])'],
+    '(), (), (j), (k), (l), (n), (n) -> ()',
     target=TARGET,
+    cache=CACHE,
 )
 def lookup_vectorized_2d(
     sample_x,
@@ -558,6 +822,8 @@ def lookup_vectorized_2d(
     flat_hist,
     bin_edges_x,
     bin_edges_y,
+    descr_x,
+    descr_y,
     weights,
 ):
     """Vectorized gufunc to perform the lookup"""
@@ -569,8 +835,8 @@ def lookup_vectorized_2d(
         and y >= bin_edges_y[0]
         and y <= bin_edges_y[-1]
     ):
-        idx_x = find_index_unsafe(x, bin_edges_x)
-        idx_y = find_index_unsafe(y, bin_edges_y)
+        idx_x = find_index_fast_unsafe(x, bin_edges_x, descr_x)
+        idx_y = find_index_fast_unsafe(y, bin_edges_y, descr_y)
         idx = idx_x * (len(bin_edges_y) - 1) + idx_y
         weights[0] = flat_hist[idx]
     else:  # outside of binning or nan
@@ -578,9 +844,10 @@ def lookup_vectorized_2d(
 
 
 @guvectorize(
-    [f'({FX}[:], {FX}[:], {FX}[:, :], {FX}[:], {FX}[:], {FX}[:])'],
-    '(), (), (j, d), (k), (l) -> (d)',
+    [f'({FX}[:], {FX}[:], {FX}[:, :], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:])'],
+    '(), (), (j, d), (k), (l), (n), (n) -> (d)',
     target=TARGET,
+    cache=CACHE,
 )
 def lookup_vectorized_2d_arrays(
     sample_x,
@@ -588,6 +855,8 @@ def lookup_vectorized_2d_arrays(
     flat_hist,
     bin_edges_x,
     bin_edges_y,
+    descr_x,
+    descr_y,
     weights,
 ):
     """Vectorized gufunc to perform the lookup while flat hist and weights have
@@ -601,8 +870,8 @@ def lookup_vectorized_2d_arrays(
         and y >= bin_edges_y[0]
         and y <= bin_edges_y[-1]
     ):
-        idx_x = find_index_unsafe(x, bin_edges_x)
-        idx_y = find_index_unsafe(y, bin_edges_y)
+        idx_x = find_index_fast_unsafe(x, bin_edges_x, descr_x)
+        idx_y = find_index_fast_unsafe(y, bin_edges_y, descr_y)
         idx = idx_x * (len(bin_edges_y) - 1) + idx_y
         for i in range(weights.size):
             weights[i] = flat_hist[idx, i]
@@ -612,9 +881,11 @@ def lookup_vectorized_2d_arrays(
 
 
 @guvectorize(
-    [f'({FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:])'],
-    '(), (), (), (j), (k), (l), (m) -> ()',
+    [f'({FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], {FX}[:], '
+      f'{FX}[:], {FX}[:], {FX}[:], {FX}[:])'],
+    '(), (), (), (j), (k), (l), (m), (n), (n), (n) -> ()',
     target=TARGET,
+    cache=CACHE,
 )
 def lookup_vectorized_3d(
     sample_x,
@@ -624,6 +895,9 @@ def lookup_vectorized_3d(
     bin_edges_x,
     bin_edges_y,
     bin_edges_z,
+    descr_x,
+    descr_y,
+    descr_z,
     weights,
 ):
     """Vectorized gufunc to perform the lookup"""
@@ -638,9 +912,9 @@ def lookup_vectorized_3d(
         and z >= bin_edges_z[0]
         and z <= bin_edges_z[-1]
     ):
-        idx_x = find_index_unsafe(x, bin_edges_x)
-        idx_y = find_index_unsafe(y, bin_edges_y)
-        idx_z = find_index_unsafe(z, bin_edges_z)
+        idx_x = find_index_fast_unsafe(x, bin_edges_x, descr_x)
+        idx_y = find_index_fast_unsafe(y, bin_edges_y, descr_y)
+        idx_z = find_index_fast_unsafe(z, bin_edges_z, descr_z)
         idx = (idx_x * (len(bin_edges_y) - 1) + idx_y) * (len(bin_edges_z) - 1) + idx_z
         weights[0] = flat_hist[idx]
     else:  # outside of binning or nan
@@ -648,9 +922,11 @@ def lookup_vectorized_3d(
 
 
 @guvectorize(
-    [f'({FX}[:], {FX}[:], {FX}[:], {FX}[:, :], {FX}[:], {FX}[:], {FX}[:], {FX}[:])'],
-    '(), (), (), (j, d), (k), (l), (m) -> (d)',
+    [f'({FX}[:], {FX}[:], {FX}[:], {FX}[:, :], {FX}[:], {FX}[:], {FX}[:], '
+      f'{FX}[:], {FX}[:], {FX}[:], {FX}[:])'],
+    '(), (), (), (j, d), (k), (l), (m), (n), (n), (n) -> (d)',
     target=TARGET,
+    cache=CACHE,
 )
 def lookup_vectorized_3d_arrays(
     sample_x,
@@ -660,6 +936,9 @@ def lookup_vectorized_3d_arrays(
     bin_edges_x,
     bin_edges_y,
     bin_edges_z,
+    descr_x,
+    descr_y,
+    descr_z,
     weights,
 ):
     """Vectorized gufunc to perform the lookup while flat hist and weights have
@@ -675,9 +954,9 @@ def lookup_vectorized_3d_arrays(
         and z >= bin_edges_z[0]
         and z <= bin_edges_z[-1]
     ):
-        idx_x = find_index_unsafe(x, bin_edges_x)
-        idx_y = find_index_unsafe(y, bin_edges_y)
-        idx_z = find_index_unsafe(z, bin_edges_z)
+        idx_x = find_index_fast_unsafe(x, bin_edges_x, descr_x)
+        idx_y = find_index_fast_unsafe(y, bin_edges_y, descr_y)
+        idx_z = find_index_fast_unsafe(z, bin_edges_z, descr_z)
         idx = (idx_x * (len(bin_edges_y) - 1) + idx_y) * (len(bin_edges_z) - 1) + idx_z
         for i in range(weights.size):
             weights[i] = flat_hist[idx, i]
@@ -686,6 +965,168 @@ def lookup_vectorized_3d_arrays(
             weights[i] = 0.
 
 
+@myjit
+def find_interp_node(x, centers, first, last):
+    """Find left neighbour among interpolation nodes `centers[first:last]` of
+    `x` and the fractional distance of `x` to it. Values outside of the nodes'
+    range are clamped to the first (last) node.
+
+    Parameters
+    ----------
+    x : scalar
+    centers : array
+        Monotonically increasing node positions (of all dimensions)
+    first, last : int
+        Nodes of the dimension of interest are ``centers[first:last]``
+
+    Returns
+    -------
+    node_idx : int
+        Index of left neighbour relative to `first`
+    frac : scalar in [0, 1]
+        Fractional distance between left and right neighbour
+
+    """
+    num_nodes = last - first
+    if num_nodes == 1 or x <= centers[first]:
+        return 0, 0.
+    if x >= centers[last - 1]:
+        return num_nodes - 2, 1.
+
+    left_idx = first
+    right_idx = last - 1
+    while right_idx - left_idx > 1:
+        test_idx = (left_idx + right_idx) >> 1
+        if x >= centers[test_idx]:
+            left_idx = test_idx
+        else:
+            right_idx = test_idx
+
+    frac = (x - centers[left_idx]) / (centers[left_idx + 1] - centers[left_idx])
+    return left_idx - first, frac
+
+
+@myjit
+def interp_linear(point, flat_hist, centers, offsets, is_log, lower, upper, out):
+    """Multi-linear interpolation of `flat_hist` at `point`"""
+    num_dims = point.shape[0]
+    node_idx = cuda.local.array(shape=8, dtype=int64)
+    frac = cuda.local.array(shape=8, dtype=ftype)
+
+    for k in range(out.shape[0]):
+        out[k] = 0.
+
+    for d in range(num_dims):
+        x = point[d]
+        if not (x >= lower[d] and x <= upper[d]):
+            # outside of binning or nan
+            return
+        if is_log[d]:
+            x = math.log(x)
+        idx, t = find_interp_node(x, centers, offsets[d], offsets[d + 1])
+        node_idx[d] = idx
+        frac[d] = t
+
+    # loop over the 2^num_dims corners of the hypercube enclosing `point`
+    for corner in range(1 << num_dims):
+        weight = 1.
+        flat_idx = 0
+        for d in range(num_dims):
+            num_nodes = offsets[d + 1] - offsets[d]
+            idx = node_idx[d]
+            if (corner >> d) & 1:
+                weight *= frac[d]
+                idx = min(idx + 1, num_nodes - 1)
+            else:
+                weight *= 1. - frac[d]
+            flat_idx = flat_idx * num_nodes + idx
+        if weight != 0.:
+            for k in range(out.shape[0]):
+                out[k] += weight * flat_hist[flat_idx, k]
+
+
+@myjit
+def interp_cubic(point, flat_hist, centers, offsets, is_log, lower, upper, out):
+    """Tensor-product cubic (Catmull-Rom) interpolation of `flat_hist` at
+    `point`; nodes beyond the outermost bin centers are clamped to those"""
+    num_dims = point.shape[0]
+    node_idx = cuda.local.array(shape=8, dtype=int64)
+    node_weights = cuda.local.array(shape=32, dtype=ftype)
+
+    for k in range(out.shape[0]):
+        out[k] = 0.
+
+    for d in range(num_dims):
+        x = point[d]
+        if not (x >= lower[d] and x <= upper[d]):
+            # outside of binning or nan
+            return
+        if is_log[d]:
+            x = math.log(x)
+        idx, t = find_interp_node(x, centers, offsets[d], offsets[d + 1])
+        node_idx[d] = idx
+        t2 = t * t
+        t3 = t2 * t
+        node_weights[4*d] = 0.5 * (-t3 + 2.*t2 - t)
+        node_weights[4*d + 1] = 0.5 * (3.*t3 - 5.*t2 + 2.)
+        node_weights[4*d + 2] = 0.5 * (-3.*t3 + 4.*t2 + t)
+        node_weights[4*d + 3] = 0.5 * (t3 - t2)
+
+    # loop over the 4^num_dims nodes surrounding `point`
+    for corner in range(1 << (2 * num_dims)):
+        weight = 1.
+        flat_idx = 0
+        for d in range(num_dims):
+            num_nodes = offsets[d + 1] - offsets[d]
+            step = (corner >> (2 * d)) & 3
+            idx = min(max(node_idx[d] - 1 + step, 0), num_nodes - 1)
+            weight *= node_weights[4*d + step]
+            flat_idx = flat_idx * num_nodes + idx
+        if weight != 0.:
+            for k in range(out.shape[0]):
+                out[k] += weight * flat_hist[flat_idx, k]
+
+
+@guvectorize(
+    [f'({FX}[:], {FX}[:, :], {FX}[:], i8[:], i8[:], {FX}[:], {FX}[:], {FX}[:])'],
+    '(d), (j, k), (c), (e), (d), (d), (d) -> (k)',
+    target=TARGET,
+    cache=CACHE,
+)
+def interp_linear_vectorized(
+    point,
+    flat_hist,
+    centers,
+    offsets,
+    is_log,
+    lower,
+    upper,
+    out,
+):
+    """Vectorized gufunc to perform the linear interpolation"""
+    interp_linear(point, flat_hist, centers, offsets, is_log, lower, upper, out)
+
+
+@guvectorize(
+    [f'({FX}[:], {FX}[:, :], {FX}[:], i8[:], i8[:], {FX}[:], {FX}[:], {FX}[:])'],
+    '(d), (j, k), (c), (e), (d), (d), (d) -> (k)',
+    target=TARGET,
+    cache=CACHE,
+)
+def interp_cubic_vectorized(
+    point,
+    flat_hist,
+    centers,
+    offsets,
+    is_log,
+    lower,
+    upper,
+    out,
+):
+    """Vectorized gufunc to perform the cubic interpolation"""
+    interp_cubic(point, flat_hist, centers, offsets, is_log, lower, upper, out)
+
+
 def test_histogram():
     """Unit tests for `histogram` function.
 
@@ -866,7 +1307,127 @@ def test_find_index():
     logging.info('<< PASS : test_find_index >>')
 
 
+def test_find_index_fast():
+    """Unit tests for `find_index_fast` function.
+
+    Correctness is defined as returning the same indices as `find_index`, in
+    particular for values on and within one unit of floating point accuracy of
+    the bin edges of linearly- and logarithmically-uniform binnings.
+    """
+    if TARGET != 'cpu':
+        logging.info('<< SKIP : test_find_index_fast (TARGET=%s) >>', TARGET)
+        return
+
+    rand = np.random.RandomState(seed=0)
+    eps = np.finfo(FTYPE).eps  # pylint: disable=no-member
+
+    failures = 0
+    for dim in [
+        OneDimBinning(name='x', num_bins=10, is_lin=True, domain=[-1, 1]),
+        OneDimBinning(name='x', num_bins=7, is_lin=True, domain=[0, 0.7]),
+        OneDimBinning(name='x', num_bins=1, is_lin=True, domain=[0, 1]),
+        OneDimBinning(name='x', num_bins=30, is_log=True, domain=[1, 1000]),
+        OneDimBinning(name='x', num_bins=13, is_log=True, domain=[0.3, 17]),
+        OneDimBinning(name='x', bin_edges=[0, 0.1, 1, 10, np.inf]),
+    ]:
+        descriptor = bin_descriptor(dim)
+        expected_kind = 0 if dim.is_irregular else 2 if dim.is_log else 1
+        if dim.num_bins > 1:
+            assert descriptor[0] == expected_kind, f'{descriptor}'
+
+        bin_edges = dim.edge_magnitudes.astype(FTYPE)
+        finite_edges = bin_edges[np.isfinite(bin_edges)]
+        test_vals = np.concatenate([
+            [-np.inf, np.inf, np.nan],
+            bin_edges,
+            (1 - eps)*finite_edges,
+            (1 + eps)*finite_edges,
+            rand.uniform(finite_edges[0] - 1, finite_edges[-1] + 1, size=1000),
+        ]).astype(FTYPE)
+
+        for val in test_vals:
+            expected_idx = find_index(val, bin_edges)
+            found_idx = find_index_fast(val, bin_edges, descriptor)
+            if found_idx != expected_idx:
+                failures += 1
+                logging.error(
+                    'val=%s, edges=%s: Expected idx=%s, found idx=%s',
+                    val, bin_edges, expected_idx, found_idx
+                )
+
+    assert failures == 0, f"{failures} failures, inspect ERROR messages above for info"
+
+    logging.info('<< PASS : test_find_index_fast >>')
+
+
+def test_interpolate():
+    """Unit tests for `interpolate` function.
+
+    A function that is linear in the (log-)coordinates of each dimension must
+    be reproduced exactly by linear interpolation between the bin centers,
+    and also by cubic interpolation away from the outermost bins.
+    """
+    rand = np.random.RandomState(seed=0)
+    n_evts = 1000
+
+    binning = MultiDimBinning([
+        OneDimBinning(name='x', num_bins=10, is_lin=True, domain=[-1, 1]),
+        OneDimBinning(name='y', num_bins=8, is_log=True, domain=[1, 100]),
+        OneDimBinning(name='z', num_bins=5, is_lin=True, domain=[0, 5]),
+    ])
+
+    def func(x, y, z):
+        return 2*x - 0.5*np.log(y) + 0.1*z + 3
+
+    grid = binning.meshgrid(entity='weighted_centers', attach_units=False)
+    flat_hist = SmartArray(func(*grid).ravel().astype(FTYPE))
+
+    # points between the outermost bin centers
+    sample = []
+    for dim in binning:
+        centers = dim.weighted_centers.m
+        if dim.is_log:
+            vals = np.exp(rand.uniform(*np.log(centers[[0, -1]]), size=n_evts))
+        else:
+            vals = rand.uniform(*centers[[0, -1]], size=n_evts)
+        sample.append(SmartArray(vals.astype(FTYPE)))
+    ref = func(*[s.get() for s in sample])
+
+    test = lookup(sample, flat_hist, binning, method='linear').get()
+    assert np.allclose(test, ref, rtol=1e-4, atol=1e-4), f'\ntest:\n{test}\n\nref:\n{ref}'
+
+    # cubic interpolation is exact for linear functions away from the edges
+    inner = np.ones(n_evts, dtype=bool)
+    for dim, s in zip(binning, sample):
+        centers = dim.weighted_centers.m
+        inner &= (s.get() >= centers[1]) & (s.get() <= centers[-2])
+    test = lookup(sample, flat_hist, binning, method='cubic').get()
+    assert np.allclose(test[inner], ref[inner], rtol=1e-4, atol=1e-4)
+
+    # vector-valued histogram entries
+    flat_hist_2d = SmartArray(np.stack([flat_hist.get(), 2*flat_hist.get()], axis=1))
+    test = interpolate(sample, flat_hist_2d, binning, method='linear').get()
+    assert np.allclose(test[:, 1], 2*ref, rtol=1e-4, atol=1e-4)
+
+    # at the bin centers, all methods agree
+    center_sample = [SmartArray(g.ravel().astype(FTYPE)) for g in grid]
+    nearest = lookup(center_sample, flat_hist, binning, method='nearest').get()
+    for method in ['linear', 'cubic']:
+        test = lookup(center_sample, flat_hist, binning, method=method).get()
+        assert np.allclose(test, nearest, rtol=1e-4, atol=1e-4), method
+
+    # outside of binning or nan
+    out_sample = [SmartArray(np.array(v, dtype=FTYPE)) for v in
+                  [[-2, 0, np.nan], [10, 1000, 10], [1, 1, 1]]]
+    test = lookup(out_sample, flat_hist, binning, method='linear').get()
+    assert np.all(test == 0), f'{test}'
+
+    logging.info('<< PASS : test_interpolate >>')
+
+
 if __name__ == '__main__':
     set_verbosity(1)
     test_find_index()
+    test_find_index_fast()
     test_histogram()
+    test_interpolate()
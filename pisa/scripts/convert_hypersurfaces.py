@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""
+Convert hypersurface fit files (as produced by `fit_hypersurfaces.py`) to the binary
+format, in which the arrays are stored as `.npy` files that are memory-mapped when
+loading instead of being decompressed and parsed.
+
+By default, the binary version is written next to the input file, where
+`pisa.utils.hypersurface.load_hypersurfaces` (and thereby the
+`discr_sys.pi_hypersurfaces` service) picks it up automatically as long as the input
+file is not modified. For files describing interpolated hypersurfaces, all of the
+referenced fit files are converted.
+"""
+
+
+from __future__ import absolute_import
+
+from argparse import ArgumentParser
+
+from pisa.utils.hypersurface import convert_hypersurfaces_to_binary
+from pisa.utils.log import logging, set_verbosity
+
+
+__all__ = ['parse_args', 'main']
+
+__license__ = '''Copyright (c) 2014-2020, The IceCube Collaboration
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.'''
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        'input_files', nargs='+',
+        help='''Hypersurface fit file(s) or interpolated hypersurface file(s) to
+        convert''',
+    )
+    parser.add_argument(
+        '-o', '--output-dir', default=None,
+        help='''Output directory (only for a single, non-interpolated input file).
+        Default is to write next to the input file.''',
+    )
+    parser.add_argument('-v', action='count', default=None,
+                        help='set verbosity level')
+    args = parser.parse_args()
+    assert args.output_dir is None or len(args.input_files) == 1, \
+        'Can only specify the output directory for a single input file'
+    return args
+
+
+def main():
+    """Run `convert_hypersurfaces_to_binary` on each input file"""
+    args = parse_args()
+    set_verbosity(args.v)
+    for input_file in args.input_files:
+        output_dirs = convert_hypersurfaces_to_binary(input_file,
+                                                      output_dir=args.output_dir)
+        for output_dir in output_dirs:
+            logging.info('Converted %s -> %s', input_file, output_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+"""
+Compile all of PISA's Numba kernels for the configured FTYPE and TARGET (see
+PISA_FTYPE and PISA_TARGET env vars) and store them in Numba's on-disk cache
+(NUMBA_CACHE_DIR, by default `<PISA_CACHE_DIR>/numba`), such that later
+processes sharing that cache directory (e.g. jobs on a batch farm) load the
+kernels instead of compiling them.
+"""
+
+
+from __future__ import absolute_import, division
+
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+from collections import OrderedDict
+from importlib import import_module
+import os
+import re
+from time import time
+
+from numba import config as numba_config
+
+import pisa
+from pisa.utils.fileio import nsort_key_func
+from pisa.utils.log import logging, set_verbosity
+
+
+__all__ = [
+    'KERNEL_DECORATOR_RE',
+    'find_kernel_modules',
+    'warmup',
+    'parse_args',
+    'main',
+]
+
+__license__ = '''Copyright (c) 2014-2020, The IceCube Collaboration
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.'''
+
+
+KERNEL_DECORATOR_RE = re.compile(
+    r'^@(guvectorize|vectorize|njit|jit|numba_jit|myjit)\b', re.MULTILINE
+)
+"""Decorators of module-level functions that are compiled by Numba"""
+
+
+def find_kernel_modules(path=None):
+    """Find the PISA modules that define Numba kernels.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory within the PISA package to (recursively) search; defaults to
+        the entire package
+
+    Returns
+    -------
+    modules : list of str
+        Full module paths, e.g. "pisa.core.translation"
+
+    """
+    pisa_path = os.path.dirname(pisa.__file__)
+    if path is None:
+        path = pisa_path
+
+    modules = []
+    for dirpath, dirs, files in os.walk(path):
+        dirs.sort(key=nsort_key_func)
+        for filename in sorted(files, key=nsort_key_func):
+            if not filename.endswith('.py') or filename.startswith('test_'):
+                continue
+            filepath = os.path.join(dirpath, filename)
+            with open(filepath, 'r') as f:
+                if not KERNEL_DECORATOR_RE.search(f.read()):
+                    continue
+            relpath = os.path.relpath(filepath, os.path.dirname(pisa_path))
+            modules.append(os.path.splitext(relpath)[0].replace(os.sep, '.'))
+
+    return modules
+
+
+def warmup(modules=None):
+    """Import `modules` such that their Numba kernels are compiled and cached.
+
+    Kernels with explicit signatures (all gufuncs and the `myjit` functions
+    they call) are compiled (or loaded from the cache) upon import, while
+    kernels without signatures are only compiled (and cached) once first
+    called.
+
+    Parameters
+    ----------
+    modules : sequence of str, optional
+        Full module paths; defaults to all modules defining kernels (see
+        `find_kernel_modules`)
+
+    Returns
+    -------
+    timings : OrderedDict
+        Seconds it took to import each module, or None if it failed to import
+        (e.g. due to a missing optional dependency)
+
+    """
+    if modules is None:
+        modules = find_kernel_modules()
+
+    logging.info(
+        'Compiling kernels for FTYPE=%s, TARGET=%s into "%s"',
+        pisa.FTYPE.__name__, pisa.TARGET, numba_config.CACHE_DIR
+    )
+
+    timings = OrderedDict()
+    for module in modules:
+        t0 = time()
+        try:
+            import_module(module)
+        except ImportError as err:
+            logging.warning('Skipping %s: %s', module, err)
+            timings[module] = None
+            continue
+        timings[module] = time() - t0
+        logging.info('%s: %.2f s', module, timings[module])
+
+    return timings
+
+
+def parse_args(description=__doc__):
+    """Parse command line arguments"""
+    parser = ArgumentParser(
+        description=description,
+        formatter_class=ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        'modules',
+        nargs='*',
+        help='''Full paths of modules to compile kernels of; if none are
+        specified, all of PISA's modules that define kernels are compiled''',
+    )
+    parser.add_argument(
+        '-v', action='count', default=1,
+        help='set verbosity level'
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Script interface to `warmup` function"""
+    args = parse_args()
+    set_verbosity(args.v)
+
+    timings = warmup(args.modules or None)
+    failed = [module for module, seconds in timings.items() if seconds is None]
+    total = sum(seconds for seconds in timings.values() if seconds is not None)
+    logging.info(
+        'Warmed up %d module(s) in %.2f s; %d failed to import',
+        len(timings) - len(failed), total, len(failed)
+    )
+
+
+if __name__ == '__main__':
+    main()
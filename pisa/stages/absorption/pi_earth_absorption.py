@@ -20,7 +20,7 @@ from pisa import ureg
 from pisa.core.pi_stage import PiStage
 from pisa.utils.profiler import profile
 from pisa.stages.osc.layers import Layers
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 from pisa.utils import vectorizer
 from pisa.utils.resources import find_resource
 
@@ -237,7 +237,7 @@ signatures = [
 
 # TODO: make this work with the 'cuda' target. Right now, it seems like np.dot
 # does not work or is used incorrectly.
-@guvectorize(signatures, '(n),(n)->()', target=TARGET)
+@guvectorize(signatures, '(n),(n)->()', target=TARGET, cache=CACHE)
 def calculate_integrated_rho(layer_dists, layer_densities, out):
     """Calculate density integrated over the path through all layers.
     Gives the length of a matter-equivalent water column in cm.
@@ -257,7 +257,7 @@ def calculate_integrated_rho(layer_dists, layer_densities, out):
         out[0] += layer_dists[i]*layer_densities[i]
     out[0] *= 1e5  # distances are converted from km to cm
 
-@guvectorize(signatures, '(),()->()', target=TARGET)
+@guvectorize(signatures, '(),()->()', target=TARGET, cache=CACHE)
 def calculate_survivalprob(int_rho, xsection, out):
     """Calculate survival probability given layer distances,
     layer densities and (pre-computed) cross-sections.
@@ -6,6 +6,9 @@ A Stage to load data from a PISA style hdf5 file into a PISA pi ContainerSet
 
 from __future__ import absolute_import, print_function, division
 
+import os
+
+from numba import SmartArray
 import numpy as np
 
 from pisa import FTYPE
@@ -13,8 +16,17 @@ from pisa.core.pi_stage import PiStage
 from pisa.utils import vectorizer
 from pisa.utils.profiler import profile
 from pisa.core.container import Container
-from pisa.core.events_pi import EventsPi
+from pisa.core.events_pi import (
+    EventsPi,
+    get_events_cache_path,
+    get_events_key,
+    get_shared_events,
+    load_events_cache,
+    save_events_cache,
+    share_events,
+)
 from pisa.utils.format import arg_str_seq_none, split
+from pisa.utils.log import logging, set_verbosity
 
 
 class simple_data_loader(PiStage):
@@ -46,6 +58,27 @@ class simple_data_loader(PiStage):
         Must be in range [0.,1.], or disable by setting to `None`.
         Default in None.
 
+    chunk_size : int, optional
+        If specified, stream HDF5 events files in chunks of this many rows,
+        applying `mc_cuts` and `fraction_events_to_keep` to each chunk such
+        that only the surviving events are ever held in memory. Note that the
+        subsample is then drawn separately for each events file.
+
+    events_cache : bool or str, optional
+        If True (or a directory path), store the loaded events after cuts in
+        a memory-mappable cache (under `CACHE_DIR/events` by default) on the
+        first load, and map the cache on subsequent loads with the same
+        events file(s) and options instead of reading the events file(s).
+        Concurrent jobs then share the cached events in memory.
+
+    share_events : bool
+        Share the (read-only) event variables with other loaders in this
+        process using the same events file(s) and options, such as the data
+        and hypothesis distribution makers of a hypothesis test, instead of
+        loading and storing a copy for each. Only the `weights` arrays are
+        then specific to this loader. Stages that modify event variables in
+        place must then write into copies of their own. Default is False.
+
     Notes
     -----
     Looks for `initial_weights` fields in events file, which will serve
@@ -68,6 +101,9 @@ class simple_data_loader(PiStage):
                  calc_specs=None,
                  output_specs=None,
                  fraction_events_to_keep=None,
+                 chunk_size=None,
+                 events_cache=None,
+                 share_events=False,
                 ):
 
         # instantiation args that should not change
@@ -77,6 +113,9 @@ class simple_data_loader(PiStage):
         self.neutrinos = neutrinos
         self.required_metadata = required_metadata
         self.fraction_events_to_keep = fraction_events_to_keep
+        self.chunk_size = chunk_size
+        self.events_cache = events_cache
+        self.share_events = share_events
 
         # Handle list inputs
         self.events_file = split(self.events_file)
@@ -123,8 +162,89 @@ class simple_data_loader(PiStage):
                 ' unique.'
             )
 
-        self.load_events()
-        self.apply_cuts_to_events()
+        # Parse the variable mapping string if one exists
+        if self.data_dict is not None:
+            self.data_dict = eval(self.data_dict)
+
+        if not self.load_shared_events():
+            if not self.load_events_from_cache():
+                self.load_events()
+                self.apply_cuts_to_events()
+            self.register_shared_events()
+        self.save_events_to_cache()
+
+    @property
+    def events_key(self):
+        '''Key identifying the loaded events, see
+        `pisa.core.events_pi.get_events_key`'''
+        return get_events_key(self.events_file, self.events_selection)
+
+    def load_shared_events(self):
+        '''Uses the events already loaded by another loader in this process
+        with the same events file(s) and options, if sharing is enabled.
+        Returns whether such events were found.'''
+        if not self.share_events:
+            return False
+        evts = get_shared_events(self.events_key)
+        if evts is None:
+            return False
+        self.evts = evts
+        self.metadata = self.evts.metadata
+        return True
+
+    def get_events_cache_path(self):
+        '''Path of and key identifying the events cache (see
+        `pisa.core.events_pi.get_events_cache_path`), or (None, None) if
+        caching is disabled'''
+        if not self.events_cache:
+            return None, None
+        cache_dir = None if self.events_cache is True else self.events_cache
+        return get_events_cache_path(
+            events_file=self.events_file,
+            selection=self.events_selection,
+            cache_dir=cache_dir,
+        )
+
+    @property
+    def events_selection(self):
+        '''Options determining the loaded events'''
+        return dict(
+            mc_cuts=self.mc_cuts,
+            data_dict=self.data_dict,
+            neutrinos=self.neutrinos,
+            required_metadata=self.required_metadata,
+            fraction_events_to_keep=self.fraction_events_to_keep,
+            chunk_size=self.chunk_size,
+        )
+
+    def register_shared_events(self):
+        '''Makes the loaded events available to other loaders in this
+        process, if sharing is enabled'''
+        if self.share_events:
+            share_events(self.events_key, self.evts)
+
+    def load_events_from_cache(self):
+        '''Loads events from the events cache, if enabled and present.
+        Returns whether the events were loaded.'''
+        cache_path, cache_key = self.get_events_cache_path()
+        if cache_path is None:
+            return False
+        evts = load_events_cache(cache_path, cache_key=cache_key)
+        if evts is None:
+            return False
+        self.evts = evts
+        self.metadata = self.evts.metadata
+        return True
+
+    def save_events_to_cache(self):
+        '''Stores the (cut) events in the events cache, if enabled and not
+        present yet'''
+        cache_path, cache_key = self.get_events_cache_path()
+        if cache_path is None or os.path.isdir(cache_path):
+            return
+        manifest = dict(cache_key=cache_key)
+        manifest.update(self.events_selection)
+        save_events_cache(self.evts, cache_path, manifest=manifest)
 
     def load_events(self):
         '''Loads events from events file'''
@@ -136,15 +256,17 @@ class simple_data_loader(PiStage):
             fraction_events_to_keep=self.fraction_events_to_keep,
         )
 
-        # Parse the variable mapping string if one exists
-        if self.data_dict is not None:
-            self.data_dict = eval(self.data_dict)
-
-        # Load the event file into the events structure
+        # Load the event file into the events structure (applying the cuts
+        # while reading if streaming)
+        keep_criteria = None
+        if self.chunk_size is not None and self.mc_cuts:
+            keep_criteria = self.mc_cuts
         self.evts.load_events_file(
             events_file=self.events_file,
             variable_mapping=self.data_dict,
             required_metadata=self.required_metadata,
+            keep_criteria=keep_criteria,
+            chunk_size=self.chunk_size,
         )
 
         if hasattr(self.evts, "metadata"):
@@ -154,7 +276,8 @@ class simple_data_loader(PiStage):
         # now that will be cut later anyway (use EventsPi.keep_inbounds)
 
     def apply_cuts_to_events(self):
-        '''Just apply any cuts that the user defined'''
+        '''Just apply any cuts that the user defined (no-op if these were
+        already applied while streaming the events)'''
         if self.mc_cuts:
             self.evts = self.evts.apply_cut(self.mc_cuts)
 
@@ -181,8 +304,11 @@ class simple_data_loader(PiStage):
                     % (name, event_groups)
                 )
 
-            # add the events data to the container
+            # add the events data to the container (without copying shared
+            # events, which are read-only)
             for key, val in self.evts[name].items():
+                if self.share_events:
+                    val = SmartArray(val, copy=False)
                 container.add_array_data(key, val)
 
             # create weights arrays:
@@ -254,3 +380,121 @@ class simple_data_loader(PiStage):
         # reset weights to initial weights prior to downstream stages running
         for container in self.data:
             vectorizer.assign(container['initial_weights'], out=container['weights'])
+
+
+def _example_loader(**kwargs):
+    """Set up the data loader of the example pipeline, with `kwargs`
+    overriding its settings"""
+    from pisa.core.container import ContainerSet
+    from pisa.utils.config_parser import parse_pipeline_config
+
+    config = parse_pipeline_config('settings/pipeline/example.cfg')
+    settings = config[('data', 'simple_data_loader')]
+    settings.update(kwargs)
+    loader = simple_data_loader(**settings)
+    loader.data = ContainerSet('events')
+    loader.setup()
+    return loader
+
+
+def test_events_cache():
+    """Unit test for loading events from (and storing them in) the events
+    cache"""
+    import shutil
+    import tempfile
+    from pisa.core.events_pi import _is_memory_mapped
+
+    testdir = tempfile.mkdtemp()
+    try:
+        # The first loader writes the cache, the second one maps it
+        loader = _example_loader(events_cache=testdir)
+        cache_path, cache_key = loader.get_events_cache_path()
+        assert os.path.dirname(cache_path) == testdir
+        assert os.path.isdir(cache_path)
+        cached_loader = _example_loader(events_cache=testdir)
+        assert cached_loader.get_events_cache_path() == (cache_path, cache_key)
+        assert os.listdir(testdir) == [os.path.basename(cache_path)]
+        assert cached_loader.evts.metadata == loader.evts.metadata
+        for key, cat_dict in loader.evts.items():
+            for var, array_data in cat_dict.items():
+                cached = cached_loader.evts[key][var]
+                assert _is_memory_mapped(cached)
+                assert np.array_equal(cached, array_data)
+        for name in loader.output_names:
+            assert np.array_equal(
+                cached_loader.data[name]['true_energy'].get('host'),
+                loader.data[name]['true_energy'].get('host'),
+            )
+
+        # Other cuts use another cache
+        cut_loader = _example_loader(events_cache=testdir, mc_cuts='(pid >= 0)')
+        assert cut_loader.get_events_cache_path()[0] != cache_path
+        assert len(os.listdir(testdir)) == 2
+    finally:
+        shutil.rmtree(testdir, ignore_errors=True)
+
+    logging.info('<< PASS : test_events_cache >>')
+
+
+def test_share_events():
+    """Unit test for sharing events between loaders in this process"""
+    import gc
+
+    loader = _example_loader(share_events=True)
+    other_loader = _example_loader(share_events=True)
+    key = loader.events_key
+
+    # Loaders with identical settings use the same, read-only arrays
+    assert get_shared_events(key) is loader.evts
+    assert other_loader.evts is loader.evts
+    for name in loader.output_names:
+        array_data = loader.data[name]['true_energy'].get('host')
+        other_array_data = other_loader.data[name]['true_energy'].get('host')
+        assert np.shares_memory(array_data, other_array_data)
+        assert not array_data.flags.writeable
+        try:
+            array_data[0] = -1
+        except ValueError:
+            pass
+        else:
+            raise Exception('shared events should be read-only')
+
+    # ...but each loader's weights are its own
+    name = loader.output_names[0]
+    weights = loader.data[name]['weights'].get('host')
+    other_weights = other_loader.data[name]['weights'].get('host')
+    assert not np.shares_memory(weights, other_weights)
+    weights[:] = 2
+    loader.data[name]['weights'].mark_changed('host')
+    assert np.all(other_loader.data[name]['weights'].get('host') == 1)
+
+    # Other cuts or subsampling are other events
+    cut_loader = _example_loader(share_events=True, mc_cuts='(pid >= 0)')
+    chunk_loader = _example_loader(share_events=True, chunk_size=50)
+    sub_loader = _example_loader(
+        share_events=True, chunk_size=50, fraction_events_to_keep=0.5
+    )
+    keys = [key] + [l.events_key for l in (cut_loader, chunk_loader, sub_loader)]
+    assert len(set(keys)) == 4
+    for evts in (cut_loader.evts, chunk_loader.evts, sub_loader.evts):
+        assert evts is not loader.evts
+    assert sub_loader.evts is not chunk_loader.evts
+
+    # Loaders not sharing events have their own, writable copy
+    own_loader = _example_loader(share_events=False)
+    assert own_loader.evts is not loader.evts
+    assert own_loader.data[name]['true_energy'].get('host').flags.writeable
+
+    # Events are dropped once no loader holds them anymore
+    del loader, other_loader
+    gc.collect()
+    assert get_shared_events(key) is None
+    assert get_shared_events(cut_loader.events_key) is cut_loader.evts
+
+    logging.info('<< PASS : test_share_events >>')
+
+
+if __name__ == '__main__':
+    set_verbosity(1)
+    test_events_cache()
+    test_share_events()
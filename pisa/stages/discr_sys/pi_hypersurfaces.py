@@ -17,7 +17,7 @@ import numpy as np
 from pisa import FTYPE, TARGET
 from pisa.core.pi_stage import PiStage
 from pisa.utils.log import logging
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 from pisa.utils import vectorizer
 import pisa.utils.hypersurface as hs
 from pisa.utils.log import set_verbosity, Levels
@@ -52,7 +52,9 @@ class pi_hypersurfaces(PiStage): # pylint: disable=invalid-name
     ----------
     fit_results_file : str
         Path to hypersurface fit results file, i.e. the JSON file produced by the
-        `pisa.scripts.fit_discrete_sys_nd.py` script
+        `pisa.scripts.fit_discrete_sys_nd.py` script. If a binary version of the file
+        (or of the files referenced for interpolation) was created with
+        `pisa.scripts.convert_hypersurfaces`, it is loaded instead.
 
     propagate_uncertainty : bool, optional
         Propagate the uncertainties from the hypersurface to the uncertainty of
@@ -61,6 +63,10 @@ class pi_hypersurfaces(PiStage): # pylint: disable=invalid-name
     params : ParamSet
         Note that the params required to be in `params` are determined from
         those listed in the `fit_results_file`.
+
+    lookup_method : str, optional
+        How the binned scale factors are translated to events if
+        `output_specs` is 'events'; see `pisa.core.pi_stage.PiStage`
     """
     def __init__(
         self,
@@ -77,6 +83,7 @@ class pi_hypersurfaces(PiStage): # pylint: disable=invalid-name
         calc_specs=None,
         output_specs=None,
         links=None,
+        lookup_method="nearest",
     ):
         # pylint: disable=line-too-long
         # -- Expected input / output names -- #
@@ -132,6 +139,7 @@ class pi_hypersurfaces(PiStage): # pylint: disable=invalid-name
             output_calc_keys=output_calc_keys,
             input_apply_keys=input_apply_keys,
             output_apply_keys=output_apply_keys,
+            lookup_method=lookup_method,
         )
 
         # -- Only allowed/implemented modes -- #
@@ -143,6 +151,7 @@ class pi_hypersurfaces(PiStage): # pylint: disable=invalid-name
         self.links = ast.literal_eval(links)
         self.warning_issued = False # don't warn more than once about empty bins
         self.hypersurfaces = None
+        self.empty_bins_masks = None
     # pylint: disable=line-too-long
     def setup_function(self):
         """Load the fit results from the file and make some check compatibility"""
@@ -158,10 +167,14 @@ class pi_hypersurfaces(PiStage): # pylint: disable=invalid-name
                 self.data.link_containers(key, val)
 
         # create containers for scale factors
+        self.empty_bins_masks = {}
         for container in self.data:
             container["hs_scales"] = np.empty(container.size, dtype=FTYPE)
             if self.propagate_uncertainty:
                 container["hs_scales_uncertainty"] = np.empty(container.size, dtype=FTYPE)
+            # buffer for flagging bins without scales, such that `compute_function`
+            # does not need to allocate anything
+            self.empty_bins_masks[container.name] = np.empty(container.size, dtype=bool)
 
 
         # Check map names match between data container and hypersurfaces
@@ -195,29 +208,30 @@ class pi_hypersurfaces(PiStage): # pylint: disable=invalid-name
                 container_hs = self.hypersurfaces[container.name].get_hypersurface(**osc_params)
             else:
                 container_hs = self.hypersurfaces[container.name]
-            # Get the hypersurface scale factors (reshape to 1D array)
+            # Get the hypersurface scale factors, written directly to the container
+            scales = container["hs_scales"].get('host')
             if self.propagate_uncertainty:
-                scales, uncertainties = container_hs.evaluate(param_values, return_uncertainty=True)
-                scales = scales.reshape(container.size)
-                uncertainties = uncertainties.reshape(container.size)
+                uncertainties = container["hs_scales_uncertainty"].get('host')
+                container_hs.evaluate(param_values, return_uncertainty=True,
+                                      out=scales, out_uncertainty=uncertainties)
             else:
-                scales = container_hs.evaluate(param_values).reshape(container.size)
+                container_hs.evaluate(param_values, out=scales)
 
             # Where there are no scales (e.g. empty bins), set scale factor to 1
-            empty_bins_mask = ~np.isfinite(scales)
-            num_empty_bins = np.sum(empty_bins_mask)
-            if num_empty_bins > 0. and not self.warning_issued:
-                logging.warn("%i empty bins found in hypersurface" % num_empty_bins)
-                self.warning_issued = True
-            scales[empty_bins_mask] = 1.
-            if self.propagate_uncertainty:
-                uncertainties[empty_bins_mask] = 0.
+            empty_bins_mask = self.empty_bins_masks[container.name]
+            np.isfinite(scales, out=empty_bins_mask)
+            np.logical_not(empty_bins_mask, out=empty_bins_mask)
+            num_empty_bins = np.count_nonzero(empty_bins_mask)
+            if num_empty_bins > 0:
+                if not self.warning_issued:
+                    logging.warn("%i empty bins found in hypersurface" % num_empty_bins)
+                    self.warning_issued = True
+                np.copyto(scales, 1., where=empty_bins_mask)
+                if self.propagate_uncertainty:
+                    np.copyto(uncertainties, 0., where=empty_bins_mask)
 
-            # Add to container
-            np.copyto(src=scales, dst=container["hs_scales"].get('host'))
             container["hs_scales"].mark_changed()
             if self.propagate_uncertainty:
-                np.copyto(src=uncertainties, dst=container["hs_scales_uncertainty"].get('host'))
                 container["hs_scales_uncertainty"].mark_changed()
 
         # Unlink the containers again
@@ -258,7 +272,7 @@ if FTYPE == np.float32:
     _SIGNATURE = ['(f4[:], f4[:], f4[:])']
 else:
     _SIGNATURE = ['(f8[:], f8[:], f8[:])']
-@guvectorize(_SIGNATURE, '(),()->()', target=TARGET)
+@guvectorize(_SIGNATURE, '(),()->()', target=TARGET, cache=CACHE)
 def calc_uncertainty(weight, scale_uncertainty, out):
     '''vectorized error propagation'''
     out[0] = weight[0]*scale_uncertainty[0]
@@ -268,7 +282,7 @@ if FTYPE == np.float32:
     _SIGNATURE = ['(f4[:], f4[:], f4[:])']
 else:
     _SIGNATURE = ['(f8[:], f8[:], f8[:])']
-@guvectorize(_SIGNATURE, '(),()->()', target=TARGET)
+@guvectorize(_SIGNATURE, '(),()->()', target=TARGET, cache=CACHE)
 def propagate_hs_scales(weight, hs_scales, out):
     '''vectorized error propagation'''
     out[0] = max(0., weight[0]*hs_scales[0])
\ No newline at end of file
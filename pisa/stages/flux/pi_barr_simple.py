@@ -16,7 +16,7 @@ from numba import guvectorize, cuda
 from pisa import FTYPE, TARGET
 from pisa.core.pi_stage import PiStage
 from pisa.utils.profiler import profile
-from pisa.utils.numba_tools import WHERE, myjit, ftype
+from pisa.utils.numba_tools import CACHE, WHERE, myjit, ftype
 from pisa.utils.resources import find_resource
 from pisa.utils.barr_parameterization import modRatioNuBar, modRatioUpHor
 
@@ -226,7 +226,7 @@ else:
     SIGNATURE = "(f4, f4, f4[:], f4[:], i4, f4, f4, f4, f4, f4, f4[:])"
 
 
-@guvectorize([SIGNATURE], "(),(),(d),(d),(),(),(),(),(),()->(d)", target=TARGET)
+@guvectorize([SIGNATURE], "(),(),(d),(d),(),(),(),(),(),()->(d)", target=TARGET, cache=CACHE)
 def apply_sys_vectorized(
     true_energy,
     true_coszen,
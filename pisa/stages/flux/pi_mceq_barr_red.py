@@ -21,7 +21,7 @@ from pisa import FTYPE, TARGET
 from pisa.core.pi_stage import PiStage
 from pisa.utils.log import logging
 from pisa.utils.profiler import profile
-from pisa.utils.numba_tools import WHERE, myjit
+from pisa.utils.numba_tools import CACHE, WHERE, myjit
 from pisa.utils.resources import find_resource
 
 
@@ -495,7 +495,7 @@ if FTYPE == np.float64:
     SIGNATURE = SIGNATURE.replace("f4", "f8")
 
 
-@guvectorize([SIGNATURE], "(),(),(),(),(b),(b,c),(c)->(b)", target=TARGET)
+@guvectorize([SIGNATURE], "(),(),(),(),(b),(b,c),(c)->(b)", target=TARGET, cache=CACHE)
 def apply_sys_vectorized(
     true_energy,
     true_coszen,
@@ -20,7 +20,7 @@ from pisa.utils.profiler import profile
 from pisa.stages.osc.pi_osc_params import OscParams
 from pisa.stages.osc.layers import Layers
 from pisa.stages.osc.prob3numba.numba_osc_hostfuncs import fill_probs
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 from pisa.utils.resources import find_resource
 from pisa import ureg
 
@@ -500,6 +500,6 @@ if FTYPE == np.float64:
     signature = '(f8[:], f8, f8, f8[:])'
 else:
     signature = '(f4[:], f4, f4, f4[:])'
-@guvectorize([signature], '(d),(),()->()', target=TARGET)
+@guvectorize([signature], '(d),(),()->()', target=TARGET, cache=CACHE)
 def apply_probs(flux, prob_e, prob_mu, out):
     out[0] *= (flux[0] * prob_e) + (flux[1] * prob_mu)
@@ -12,7 +12,7 @@ from pisa.core.pi_stage import PiStage
 from pisa.utils.log import logging
 from pisa.utils.profiler import profile
 
-from pisa.utils.numba_tools import WHERE, myjit
+from pisa.utils.numba_tools import CACHE, WHERE, myjit
 from pisa.utils.resources import find_resource
 
 
@@ -135,7 +135,7 @@ else:
     FX = 'f4'
     IX = 'i4'
 signature = f'({FX}[:], {FX}, {FX}, {FX}, {FX}, {IX}, {FX}[:])'
-@guvectorize([signature], '(d),(),(),(),(),()->()', target=TARGET)
+@guvectorize([signature], '(d),(),(),(),(),()->()', target=TARGET, cache=CACHE)
 def apply_probs_vectorized(flux, t23, dm31, true_energy, true_coszen, nuflav, out):
     if nuflav==1: # numu receive weights dependent on numu survival prob
         out[0] *= flux[1] * (1.0-calc_probs(t23, dm31, true_energy, true_coszen))
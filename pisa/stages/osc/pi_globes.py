@@ -23,7 +23,7 @@ from pisa import FTYPE, TARGET, ureg
 from pisa.core.pi_stage import PiStage
 from pisa.stages.osc.layers import Layers
 from pisa.stages.osc.pi_osc_params import OscParams
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 from pisa.utils.profiler import profile
 from pisa.utils.resources import find_resource
 
@@ -302,6 +302,6 @@ if FTYPE == np.float64:
     signature = '(f8[:], f8, f8, f8, f8[:])'
 else:
     signature = '(f4[:], f4, f4, f4, f4[:])'
-@guvectorize([signature], '(d),(),(),()->()', target=TARGET)
+@guvectorize([signature], '(d),(),(),()->()', target=TARGET, cache=CACHE)
 def apply_probs(flux, prob_e, prob_mu, prob_nonsterile, out):
     out[0] *= ((flux[0] * prob_e) + (flux[1] * prob_mu))*prob_nonsterile
@@ -9,7 +9,7 @@ and an osc. stage....todo
 from __future__ import absolute_import, print_function, division
 
 import numpy as np
-from numba import guvectorize
+from numba import guvectorize, SmartArray
 
 from pisa import FTYPE, TARGET, ureg
 from pisa.core.pi_stage import PiStage
@@ -18,8 +18,12 @@ from pisa.utils.profiler import profile
 from pisa.stages.osc.nsi_params import StdNSIParams, VacuumLikeNSIParams
 from pisa.stages.osc.pi_osc_params import OscParams
 from pisa.stages.osc.layers import Layers
-from pisa.stages.osc.prob3numba.numba_osc_hostfuncs import propagate_array, fill_probs
-from pisa.utils.numba_tools import WHERE
+from pisa.stages.osc.prob3numba.numba_osc_hostfuncs import (
+    propagate_array,
+    propagate_array_reduced,
+    fill_probs,
+)
+from pisa.utils.numba_tools import CACHE, WHERE
 from pisa.utils.resources import find_resource
 
 
@@ -80,6 +84,7 @@ class pi_prob3(PiStage):
       input_specs=None,
       calc_specs=None,
       output_specs=None,
+      lookup_method='nearest',
     ):
 
         expected_params = (
@@ -166,6 +171,7 @@ class pi_prob3(PiStage):
             input_apply_keys=input_apply_keys,
             output_calc_keys=output_calc_keys,
             output_apply_keys=output_apply_keys,
+            lookup_method=lookup_method,
         )
 
         assert self.input_mode is not None
@@ -235,17 +241,8 @@ class pi_prob3(PiStage):
         # don't forget to un-link everything again
         self.data.unlink_containers()
 
-        # --- setup empty arrays ---
-        if self.calc_mode == 'binned':
-            self.data.link_containers('nu', ['nue_cc', 'numu_cc', 'nutau_cc',
-                                             'nue_nc', 'numu_nc', 'nutau_nc'])
-            self.data.link_containers('nubar', ['nuebar_cc', 'numubar_cc', 'nutaubar_cc',
-                                                'nuebar_nc', 'numubar_nc', 'nutaubar_nc'])
-        for container in self.data:
-            container['probability'] = np.empty((container.size, 3, 3), dtype=FTYPE)
-        self.data.unlink_containers()
-
-        # setup more empty arrays
+        # setup empty arrays; note that only the two probabilities used in
+        # `apply_probs` are stored, not the full 3x3 probability matrices
         for container in self.data:
             container['prob_e'] = np.empty((container.size), dtype=FTYPE)
             container['prob_mu'] = np.empty((container.size), dtype=FTYPE)
@@ -267,6 +264,28 @@ class pi_prob3(PiStage):
                        )
         out.mark_changed(WHERE)
 
+    def calc_probs_reduced(self, nubar, flav, e_array, rho_array, len_array,
+                           out_e, out_mu):
+        ''' wrapper to execute osc. calc, only returning the probabilities
+        from electron and muon flavour to `flav` '''
+        if self.reparam_mix_matrix:
+            mix_matrix = self.osc_params.mix_matrix_reparam_complex
+        else:
+            mix_matrix = self.osc_params.mix_matrix_complex
+        propagate_array_reduced(self.osc_params.dm_matrix, # pylint: disable = unexpected-keyword-arg, no-value-for-parameter
+                                mix_matrix,
+                                self.gen_mat_pot_matrix_complex,
+                                nubar,
+                                flav,
+                                e_array.get(WHERE),
+                                rho_array.get(WHERE),
+                                len_array.get(WHERE),
+                                out_e.get(WHERE),
+                                out_mu.get(WHERE),
+                               )
+        out_e.mark_changed(WHERE)
+        out_mu.mark_changed(WHERE)
+
     @profile
     def compute_function(self):
 
@@ -337,44 +356,57 @@ class pi_prob3(PiStage):
 
         # add effective nsi coupling matrix
         if self.nsi_type is not None:
-            logging.debug('NSI matrix:\n%s' % self.nsi_params.eps_matrix)
-            self.gen_mat_pot_matrix_complex = (
-                std_mat_pot_matrix + self.nsi_params.eps_matrix
-            )
-            logging.debug('Using generalised matter potential:\n%s'
-                          % self.gen_mat_pot_matrix_complex)
+            eps_matrix = self.nsi_params.eps_matrix
+            logging.debug('NSI matrix:\n%s', eps_matrix)
+            self.gen_mat_pot_matrix_complex = std_mat_pot_matrix + eps_matrix
+            logging.debug('Using generalised matter potential:\n%s',
+                          self.gen_mat_pot_matrix_complex)
         else:
             self.gen_mat_pot_matrix_complex = std_mat_pot_matrix
-            logging.debug('Using standard matter potential:\n%s'
-                          % self.gen_mat_pot_matrix_complex)
+            logging.debug('Using standard matter potential:\n%s',
+                          self.gen_mat_pot_matrix_complex)
 
-        for container in self.data:
-            self.calc_probs(container['nubar'],
-                            container['true_energy'],
-                            container['densities'],
-                            container['distances'],
-                            out=container['probability'],
-                           )
-
-        # the following is flavour specific, hence unlink
-        self.data.unlink_containers()
+        if self.calc_mode == 'binned':
+            # probabilities per bin are identical for all linked containers, so
+            # the full 3x3 matrices are calculated only once per linked nu/nubar
+            # container (and not stored), then distributed by flavour
+            for container in self.data:
+                probability = SmartArray(
+                    np.empty((container.size, 3, 3), dtype=FTYPE)
+                )
+                self.calc_probs(container['nubar'],
+                                container['true_energy'],
+                                container['densities'],
+                                container['distances'],
+                                out=probability,
+                               )
+                for flav_container in container:
+                    # initial electrons (0)
+                    fill_probs(probability.get(WHERE),
+                               0,
+                               flav_container['flav'],
+                               out=flav_container['prob_e'].get(WHERE),
+                              )
+                    # initial muons (1)
+                    fill_probs(probability.get(WHERE),
+                               1,
+                               flav_container['flav'],
+                               out=flav_container['prob_mu'].get(WHERE),
+                              )
+                    flav_container['prob_e'].mark_changed(WHERE)
+                    flav_container['prob_mu'].mark_changed(WHERE)
+        else:
+            for container in self.data:
+                self.calc_probs_reduced(container['nubar'],
+                                        container['flav'],
+                                        container['true_energy'],
+                                        container['densities'],
+                                        container['distances'],
+                                        out_e=container['prob_e'],
+                                        out_mu=container['prob_mu'],
+                                       )
 
-        for container in self.data:
-            # initial electrons (0)
-            fill_probs(container['probability'].get(WHERE),
-                       0,
-                       container['flav'],
-                       out=container['prob_e'].get(WHERE),
-                      )
-            # initial muons (1)
-            fill_probs(container['probability'].get(WHERE),
-                       1,
-                       container['flav'],
-                       out=container['prob_mu'].get(WHERE),
-                      )
-
-            container['prob_e'].mark_changed(WHERE)
-            container['prob_mu'].mark_changed(WHERE)
+        self.data.unlink_containers()
 
     @profile
     def apply_function(self):
@@ -394,7 +426,7 @@ if FTYPE == np.float64:
     signature = '(f8[:], f8, f8, f8[:])'
 else:
     signature = '(f4[:], f4, f4, f4[:])'
-@guvectorize([signature], '(d),(),()->()', target=TARGET)
+@guvectorize([signature], '(d),(),()->()', target=TARGET, cache=CACHE)
 def apply_probs(flux, prob_e, prob_mu, out):
     out[0] *= (flux[0] * prob_e) + (flux[1] * prob_mu)
 
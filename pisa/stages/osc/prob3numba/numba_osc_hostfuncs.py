@@ -12,7 +12,16 @@ types as defined in signatures here) from a host, whether TARGET is "host" or
 
 from __future__ import absolute_import, print_function, division
 
-__all__ = ["FX", "CX", "IX", "propagate_array", "fill_probs"]
+__all__ = [
+    "FX",
+    "CX",
+    "IX",
+    "propagate_array",
+    "propagate_array_reduced",
+    "propagate_array_multi",
+    "propagate_array_multi_reduced",
+    "fill_probs",
+]
 
 import numpy as np
 from numba import guvectorize, njit
@@ -21,6 +30,9 @@ from pisa import FTYPE, ITYPE, TARGET
 from pisa.stages.osc.prob3numba.numba_osc_kernels import (
     # osc_probs_vacuum_kernel,
     osc_probs_layers_kernel,
+    osc_probs_layers_kernel_reduced,
+    osc_probs_layers_kernel_multi,
+    osc_probs_layers_kernel_multi_reduced,
     get_transition_matrix,
     get_transition_matrix_massbasis,
     get_H_vac,
@@ -29,6 +41,7 @@ from pisa.stages.osc.prob3numba.numba_osc_kernels import (
     get_product,
     convert_from_mass_eigenstate,
 )
+from pisa.utils.numba_tools import CACHE
 
 
 assert FTYPE in [np.float32, np.float64], str(FTYPE)
@@ -65,6 +78,7 @@ IX = "i4" if ITYPE == np.int32 else "i8"
     [f"({FX}[:,:], {CX}[:,:], {CX}[:,:], {IX}, {FX}, {FX}[:], {FX}[:], {FX}[:,:])"],
     "(a,a), (a,a), (b,c), (), (), (i), (i) -> (a,a)",
     target=TARGET,
+    cache=CACHE,
 )
 def propagate_array(dm, mix, mat_pot, nubar, energy, densities, distances, probability):
     """wrapper to run `osc_probs_layers_kernel` from host (whether TARGET
@@ -74,9 +88,89 @@ def propagate_array(dm, mix, mat_pot, nubar, energy, densities, distances, proba
     )
 
 
+@guvectorize(
+    [
+        f"({FX}[:,:], {CX}[:,:], {CX}[:,:], {IX}, {IX}, {FX}, {FX}[:], {FX}[:], "
+        f"{FX}[:], {FX}[:])"
+    ],
+    "(a,a), (a,a), (b,c), (), (), (), (i), (i) -> (), ()",
+    target=TARGET,
+    cache=CACHE,
+)
+def propagate_array_reduced(
+    dm, mix, mat_pot, nubar, flav, energy, densities, distances, prob_e, prob_mu
+):
+    """wrapper to run `osc_probs_layers_kernel_reduced` from host (whether
+    TARGET is "cuda" or "host"); only the probabilities to go from electron and
+    muon flavour to `flav` are returned (as two separate outputs)"""
+    osc_probs_layers_kernel_reduced(
+        dm, mix, mat_pot, nubar, flav, energy, densities, distances, prob_e, prob_mu
+    )
+
+
+@guvectorize(
+    [
+        f"({FX}[:,:,:], {CX}[:,:,:], {CX}[:,:,:], {IX}, {FX}, {FX}[:], {FX}[:], "
+        f"{FX}[:,:,:])"
+    ],
+    "(k,a,a), (k,a,a), (k,b,c), (), (), (i), (i) -> (k,a,a)",
+    target=TARGET,
+    cache=CACHE,
+)
+def propagate_array_multi(
+    dms, mixs, mat_pots, nubar, energy, densities, distances, probability
+):
+    """wrapper to run `osc_probs_layers_kernel_multi` from host (whether TARGET
+    is "cuda" or "host"), evaluating K stacked oscillation parameter sets
+    (`dms`, `mixs`, `mat_pots`) per event in one pass"""
+    osc_probs_layers_kernel_multi(
+        dms, mixs, mat_pots, nubar, energy, densities, distances, probability
+    )
+
+
+@guvectorize(
+    [
+        f"({FX}[:,:,:], {CX}[:,:,:], {CX}[:,:,:], {IX}, {IX}[:], {IX}, {FX}, "
+        f"{FX}[:], {FX}[:], {FX}[:,:])"
+    ],
+    "(k,a,a), (k,a,a), (k,b,c), (), (f), (), (), (i), (i) -> (k,f)",
+    target=TARGET,
+    cache=CACHE,
+)
+def propagate_array_multi_reduced(
+    dms,
+    mixs,
+    mat_pots,
+    nubar,
+    initial_flavs,
+    flav,
+    energy,
+    densities,
+    distances,
+    probability,
+):
+    """wrapper to run `osc_probs_layers_kernel_multi_reduced` from host
+    (whether TARGET is "cuda" or "host"); only the probabilities to go from
+    each of `initial_flavs` (e.g. ``[0, 1]`` for electron and muon) to `flav`
+    are returned for each of the K oscillation parameter sets"""
+    osc_probs_layers_kernel_multi_reduced(
+        dms,
+        mixs,
+        mat_pots,
+        nubar,
+        initial_flavs,
+        flav,
+        energy,
+        densities,
+        distances,
+        probability,
+    )
+
+
 @njit(
     [f"({FX}[:,:], {CX}[:,:], {CX}[:,:], {IX}, {FX}, {FX}[:], {FX}[:], {FX}[:,:])"],
     target=TARGET,
+    cache=CACHE,
 )
 def propagate_scalar(
     dm, mix, mat_pot, nubar, energy, densities, distances, probability
@@ -104,6 +198,7 @@ def propagate_scalar(
         ")"
     ],
     target=TARGET,
+    cache=CACHE,
 )
 def get_transition_matrix_hostfunc(
     nubar,
@@ -133,7 +228,9 @@ def get_transition_matrix_hostfunc(
     )
 
 
-@njit([f"({FX}, {FX}, {CX}[:,:], {CX}[:,:], {CX}[:,:], {CX}[:,:])"], target=TARGET)
+@njit(
+    [f"({FX}, {FX}, {CX}[:,:], {CX}[:,:], {CX}[:,:], {CX}[:,:])"], target=TARGET, cache=CACHE
+)
 def get_transition_matrix_massbasis_hostfunc(
     baseline,
     energy,
@@ -154,7 +251,7 @@ def get_transition_matrix_massbasis_hostfunc(
     )
 
 
-@njit([f"({CX}[:,:], {CX}[:,:], {FX}[:,:], {CX}[:,:])"], target=TARGET)
+@njit([f"({CX}[:,:], {CX}[:,:], {FX}[:,:], {CX}[:,:])"], target=TARGET, cache=CACHE)
 def get_H_vac_hostfunc(mix_nubar, mix_nubar_conj_transp, dm_vac_vac, H_vac):
     """wrapper to run `get_H_vac` from host (whether TARGET is "cuda" or "host")"""
     get_H_vac(mix_nubar, mix_nubar_conj_transp, dm_vac_vac, H_vac)
@@ -163,19 +260,23 @@ def get_H_vac_hostfunc(mix_nubar, mix_nubar_conj_transp, dm_vac_vac, H_vac):
 # @guvectorize(
 #     [f"({FX}, {CX}[:,:], {IX}, {CX}[:,:])"], "(), (m, m), () -> (m, m)", target=TARGET
 # )
-@njit([f"({FX}, {CX}[:,:], {IX}, {CX}[:,:])"], target=TARGET)
+@njit([f"({FX}, {CX}[:,:], {IX}, {CX}[:,:])"], target=TARGET, cache=CACHE)
 def get_H_mat_hostfunc(rho, mat_pot, nubar, H_mat):
     """wrapper to run `get_H_mat` from host (whether TARGET is "cuda" or "host")"""
     get_H_mat(rho, mat_pot, nubar, H_mat)
 
 
-@njit([f"({FX}, {CX}[:,:], {FX}[:,:], {CX}[:,:], {CX}[:,:])"], target=TARGET)
+@njit(
+    [f"({FX}, {CX}[:,:], {FX}[:,:], {CX}[:,:], {CX}[:,:])"], target=TARGET, cache=CACHE
+)
 def get_dms_hostfunc(energy, H_mat, dm_vac_vac, dm_mat_mat, dm_mat_vac):
     """wrapper to run `get_dms` from host (whether TARGET is "cuda" or "host")"""
     get_dms(energy, H_mat, dm_vac_vac, dm_mat_mat, dm_mat_vac)
 
 
-@njit([f"({FX}, {CX}[:,:], {CX}[:,:], {CX}[:,:], {CX}[:,:,:])"], target=TARGET)
+@njit(
+    [f"({FX}, {CX}[:,:], {CX}[:,:], {CX}[:,:], {CX}[:,:,:])"], target=TARGET, cache=CACHE
+)
 def get_product_hostfunc(
     energy, dm_mat_vac, dm_mat_mat, H_mat_mass_eigenstate_basis, product
 ):
@@ -183,7 +284,7 @@ def get_product_hostfunc(
     get_product(energy, dm_mat_vac, dm_mat_mat, H_mat_mass_eigenstate_basis, product)
 
 
-@njit([f"({IX}, {CX}[:,:], {CX}[:])"], target=TARGET)
+@njit([f"({IX}, {CX}[:,:], {CX}[:])"], target=TARGET, cache=CACHE)
 def convert_from_mass_eigenstate_hostfunc(state, mix_nubar, psi):
     """wrapper to run `convert_from_mass_eigenstate` from host (whether TARGET
     is "cuda" or "host")"""
@@ -191,7 +292,10 @@ def convert_from_mass_eigenstate_hostfunc(state, mix_nubar, psi):
 
 
 @guvectorize(
-    [f"({FX}[:,:], {IX}, {IX}, {FX}[:])"], "(a,b), (), () -> ()", target=TARGET
+    [f"({FX}[:,:], {IX}, {IX}, {FX}[:])"],
+    "(a,b), (), () -> ()",
+    target=TARGET,
+    cache=CACHE,
 )
 def fill_probs(probability, initial_flav, flav, out):
     """Fill `out` with transition probabilities to go from `initial_flav` to
@@ -15,6 +15,11 @@ from __future__ import absolute_import, print_function, division
 __all__ = [
     # "osc_probs_vacuum_kernel",
     "osc_probs_layers_kernel",
+    "osc_probs_layers_kernel_reduced",
+    "osc_probs_layers_kernel_multi",
+    "osc_probs_layers_kernel_multi_reduced",
+    "get_layer_matches",
+    "osc_probs_matched_layers_kernel",
     "get_transition_matrix",
 ]
 
@@ -23,6 +28,8 @@ __version__ = "0.2"
 import cmath
 import math
 
+from numba import int64
+
 from pisa.utils.numba_tools import (
     myjit,
     conjugate_transpose,
@@ -166,6 +173,220 @@ def osc_probs_layers_kernel(
 
     """
 
+    layer_matches = cuda.local.array(shape=(120), dtype=int64)
+    get_layer_matches(density_in_layer, distance_in_layer, layer_matches)
+
+    osc_probs_matched_layers_kernel(
+        dm,
+        mix,
+        mat_pot,
+        nubar,
+        energy,
+        density_in_layer,
+        distance_in_layer,
+        layer_matches,
+        osc_probs,
+    )
+
+
+@myjit
+def osc_probs_layers_kernel_reduced(
+    dm,
+    mix,
+    mat_pot,
+    nubar,
+    flav,
+    energy,
+    density_in_layer,
+    distance_in_layer,
+    prob_e,
+    prob_mu,
+):
+    """ Calculate only the oscillation probabilities from electron and muon
+    flavour into `flav`, without the need for a full 3x3 output matrix
+
+    Parameters
+    ----------
+    flav : int
+        Final flavour (0 = electron, 1 = muon, 2 = tau)
+
+    prob_e : real 1d array of length 1 (empty)
+        Returned probability to oscillate from electron flavour into `flav`
+
+    prob_mu : real 1d array of length 1 (empty)
+        Returned probability to oscillate from muon flavour into `flav`
+
+    See `osc_probs_layers_kernel` for the other parameters
+
+    """
+    probs = cuda.local.array(shape=(3, 3), dtype=ftype)
+
+    osc_probs_layers_kernel(
+        dm, mix, mat_pot, nubar, energy, density_in_layer, distance_in_layer, probs
+    )
+
+    prob_e[0] = probs[0, flav]
+    prob_mu[0] = probs[1, flav]
+
+
+@myjit
+def osc_probs_layers_kernel_multi(
+    dms, mixs, mat_pots, nubar, energy, density_in_layer, distance_in_layer, osc_probs
+):
+    """ Calculate oscillation probabilities for a stack of `K` oscillation
+    parameter sets (hypotheses) at once, given layers of length and density
+
+    The search for identical layers is done only once and is shared by all
+    hypotheses.
+
+    Parameters
+    ----------
+    dms : real 3d array of shape (K, 3, 3)
+        Mass splitting matrices, eV^2
+
+    mixs : complex 3d array of shape (K, 3, 3)
+        PMNS mixing matrices
+
+    mat_pots : complex 3d array of shape (K, 3, 3)
+        Generalised matter potential matrices without "a" factor
+
+    nubar : real int
+        1 for neutrinos, -1 for antineutrinos
+
+    energy : real float
+        Neutrino energy, GeV
+
+    density_in_layer : real 1d array
+        Density of each layer, moles of electrons / cm^2
+
+    distance_in_layer : real 1d array
+        Distance of each layer traversed, km
+
+    osc_probs : real 3d array of shape (K, 3, 3) (empty)
+        Returned oscillation probabilities, one matrix per hypothesis (see
+        `osc_probs_layers_kernel`)
+
+    """
+    layer_matches = cuda.local.array(shape=(120), dtype=int64)
+    get_layer_matches(density_in_layer, distance_in_layer, layer_matches)
+
+    for k in range(dms.shape[0]):
+        osc_probs_matched_layers_kernel(
+            dms[k],
+            mixs[k],
+            mat_pots[k],
+            nubar,
+            energy,
+            density_in_layer,
+            distance_in_layer,
+            layer_matches,
+            osc_probs[k],
+        )
+
+
+@myjit
+def osc_probs_layers_kernel_multi_reduced(
+    dms,
+    mixs,
+    mat_pots,
+    nubar,
+    initial_flavs,
+    flav,
+    energy,
+    density_in_layer,
+    distance_in_layer,
+    osc_probs,
+):
+    """ Same as `osc_probs_layers_kernel_multi`, but only returning the
+    probabilities to oscillate from each of `initial_flavs` into `flav`
+
+    Parameters
+    ----------
+    initial_flavs : int 1d array of shape (F,)
+        Initial flavours of interest (0 = electron, 1 = muon, 2 = tau)
+
+    flav : int
+        Final flavour
+
+    osc_probs : real 2d array of shape (K, F) (empty)
+        ``osc_probs[k, f]`` is the probability of flavour ``initial_flavs[f]``
+        to oscillate into `flav` for the k-th hypothesis
+
+    See `osc_probs_layers_kernel_multi` for the other parameters
+
+    """
+    layer_matches = cuda.local.array(shape=(120), dtype=int64)
+    probs = cuda.local.array(shape=(3, 3), dtype=ftype)
+    get_layer_matches(density_in_layer, distance_in_layer, layer_matches)
+
+    for k in range(dms.shape[0]):
+        osc_probs_matched_layers_kernel(
+            dms[k],
+            mixs[k],
+            mat_pots[k],
+            nubar,
+            energy,
+            density_in_layer,
+            distance_in_layer,
+            layer_matches,
+            probs,
+        )
+        for f in range(initial_flavs.shape[0]):
+            osc_probs[k, f] = probs[initial_flavs[f], flav]
+
+
+@myjit
+def get_layer_matches(density_in_layer, distance_in_layer, layer_matches):
+    """ Find layers that are identical (within numerical precision) to a
+    previously traversed one, e.g. since the Earth is symmetric, such that
+    their transition matrices need not be recalculated
+
+    Parameters
+    ----------
+    density_in_layer : real 1d array
+        Density of each layer, moles of electrons / cm^2
+
+    distance_in_layer : real 1d array
+        Distance of each layer traversed, km
+
+    layer_matches : int 1d array (empty)
+        Index of the (last) previous identical layer, or -1 if there is none
+        (or the layer is not traversed)
+
+    """
+    for i in range(distance_in_layer.shape[0]):
+        density = density_in_layer[i]
+        distance = distance_in_layer[i]
+        layer_matches[i] = -1
+        if distance > 0.0:
+            for j in range(i):
+                if (abs(density_in_layer[j] - density) < 1e-5) and (
+                    abs(distance_in_layer[j] - distance) < 1e-5
+                ):
+                    layer_matches[i] = j
+
+
+@myjit
+def osc_probs_matched_layers_kernel(
+    dm,
+    mix,
+    mat_pot,
+    nubar,
+    energy,
+    density_in_layer,
+    distance_in_layer,
+    layer_matches,
+    osc_probs,
+):
+    """ Calculate oscillation probabilities given layers of length and density,
+    re-using the transition matrices of identical layers found via
+    `get_layer_matches`
+
+    See `osc_probs_layers_kernel` for the parameters; `layer_matches` is the
+    output of `get_layer_matches`.
+
+    """
+
     # 3x3 complex
     H_vac = cuda.local.array(shape=(3, 3), dtype=ctype)
     mix_nubar = cuda.local.array(shape=(3, 3), dtype=ctype)
@@ -183,9 +404,6 @@ def osc_probs_layers_kernel(
 
     use_mass_eigenstates = False
 
-    cache = True
-    # cache = False
-
     # TODO:
     # * ensure convention below is respected in MC reweighting
     #   (nubar > 0 for nu, < 0 for anti-nu)
@@ -204,83 +422,27 @@ def osc_probs_layers_kernel(
 
     get_H_vac(mix_nubar, mix_nubar_conj_transp, dm, H_vac)
 
-    if cache:
-        # allocate array to store all the transition matrices
-        # doesn't work in cuda...needs fixed shape
-        transition_matrices = cuda.local.array(shape=(120, 3, 3), dtype=ctype)
-
-        # loop over layers
-        for i in range(distance_in_layer.shape[0]):
-            density = density_in_layer[i]
-            distance = distance_in_layer[i]
-            if distance > 0.0:
-                layer_matrix_index = -1
-                # chaeck if exists
-                for j in range(i):
-                    # if density_in_layer[j] == density and distance_in_layer[j] == distance:
-                    if (abs(density_in_layer[j] - density) < 1e-5) and (
-                        abs(distance_in_layer[j] - distance) < 1e-5
-                    ):
-                        layer_matrix_index = j
-
-                # use from cached
-                if layer_matrix_index >= 0:
-                    for j in range(3):
-                        for k in range(3):
-                            transition_matrices[i, j, k] = transition_matrices[
-                                layer_matrix_index, j, k
-                            ]
-
-                # only calculate if necessary
-                else:
-                    get_transition_matrix(
-                        nubar,
-                        energy,
-                        density,
-                        distance,
-                        mix_nubar,
-                        mix_nubar_conj_transp,
-                        mat_pot,
-                        H_vac,
-                        dm,
-                        transition_matrix,
-                    )
-                    # copy
-                    for j in range(3):
-                        for k in range(3):
-                            transition_matrices[i, j, k] = transition_matrix[j, k]
-            else:
-                # identity matrix
-                for j in range(3):
-                    for k in range(3):
-                        if j == k:
-                            transition_matrix[j, k] = 0.0
-                        else:
-                            transition_matrix[j, k] = 1.0
-
-        # now multiply them all
-        first_layer = True
-        for i in range(distance_in_layer.shape[0]):
-            distance = distance_in_layer[i]
-            if distance > 0.0:
+    # allocate array to store all the transition matrices
+    # doesn't work in cuda...needs fixed shape
+    transition_matrices = cuda.local.array(shape=(120, 3, 3), dtype=ctype)
+
+    # loop over layers
+    for i in range(distance_in_layer.shape[0]):
+        density = density_in_layer[i]
+        distance = distance_in_layer[i]
+        if distance > 0.0:
+            layer_matrix_index = layer_matches[i]
+
+            # use from cached
+            if layer_matrix_index >= 0:
                 for j in range(3):
                     for k in range(3):
-                        transition_matrix[j, k] = transition_matrices[i, j, k]
-                if first_layer:
-                    copy_matrix(transition_matrix, transition_product)
-                    first_layer = False
-                else:
-                    matrix_dot_matrix(transition_matrix, transition_product, tmp)
-                    copy_matrix(tmp, transition_product)
+                        transition_matrices[i, j, k] = transition_matrices[
+                            layer_matrix_index, j, k
+                        ]
 
-    else:
-        # non-cache loop
-        first_layer = True
-        for i in range(distance_in_layer.shape[0]):
-            density = density_in_layer[i]
-            distance = distance_in_layer[i]
-            # only do something if distance > 0.
-            if distance > 0.0:
+            # only calculate if necessary
+            else:
                 get_transition_matrix(
                     nubar,
                     energy,
@@ -293,12 +455,25 @@ def osc_probs_layers_kernel(
                     dm,
                     transition_matrix,
                 )
-                if first_layer:
-                    copy_matrix(transition_matrix, transition_product)
-                    first_layer = False
-                else:
-                    matrix_dot_matrix(transition_matrix, transition_product, tmp)
-                    copy_matrix(tmp, transition_product)
+                # copy
+                for j in range(3):
+                    for k in range(3):
+                        transition_matrices[i, j, k] = transition_matrix[j, k]
+
+    # now multiply them all
+    first_layer = True
+    for i in range(distance_in_layer.shape[0]):
+        distance = distance_in_layer[i]
+        if distance > 0.0:
+            for j in range(3):
+                for k in range(3):
+                    transition_matrix[j, k] = transition_matrices[i, j, k]
+            if first_layer:
+                copy_matrix(transition_matrix, transition_product)
+                first_layer = False
+            else:
+                matrix_dot_matrix(transition_matrix, transition_product, tmp)
+                copy_matrix(tmp, transition_product)
 
     # convrt to flavour eigenstate basis
     matrix_dot_matrix(transition_product, mix_nubar_conj_transp, tmp)
@@ -21,6 +21,8 @@ __all__ = [
     "TEST_CASES",
     "auto_populate_test_case",
     "test_prob3numba",
+    "test_propagate_array_reduced",
+    "test_propagate_array_multi",
     "run_test_case",
     "stability_test",
     "execute_func",
@@ -54,6 +56,9 @@ from pisa.stages.osc.prob3numba.numba_osc_hostfuncs import (
     # propagate_scalar_vacuum,
     propagate_scalar,
     propagate_array,
+    propagate_array_reduced,
+    propagate_array_multi,
+    propagate_array_multi_reduced,
     get_transition_matrix_hostfunc,
     get_transition_matrix_massbasis_hostfunc,
     get_H_vac_hostfunc,
@@ -261,6 +266,136 @@ def test_prob3numba(ignore_fails=False, define_as_ref=False):
         )
 
 
+def test_propagate_array_reduced():
+    """Check that `propagate_array_reduced` reproduces the probabilities to go
+    from electron and muon flavour to each final flavour computed by
+    `propagate_array`, for neutrinos and antineutrinos"""
+    nubars = np.array([1, 1, 1, -1, -1, -1], dtype=IX)
+    energies = np.array([1, 10, 100, 1, 10, 100], dtype=FX)
+    flavs = np.array([0, 1, 2, 2, 1, 0], dtype=IX)
+
+    for tc_name in ["nufit32_no", "nufit32_io", "nufit32_std_nsi_no"]:
+        tc = TEST_CASES[tc_name]
+        args = [
+            SmartArray(tc["dm"].astype(FX)).get(WHERE),
+            SmartArray(tc["pmns"].astype(CX)).get(WHERE),
+            SmartArray(tc["mat_pot"].astype(CX)).get(WHERE),
+            SmartArray(nubars).get(WHERE),
+        ]
+        layer_args = [
+            SmartArray(energies).get(WHERE),
+            SmartArray(tc["layer_densities"].astype(FX)).get(WHERE),
+            SmartArray(tc["layer_distances"].astype(FX)).get(WHERE),
+        ]
+
+        probs = SmartArray(np.full((len(nubars), 3, 3), np.nan, dtype=FX))
+        propagate_array(*args, *layer_args, probs.get(WHERE))
+        probs.mark_changed(WHERE)
+        probs = probs.get("host")
+
+        prob_e = SmartArray(np.full(len(nubars), np.nan, dtype=FX))
+        prob_mu = SmartArray(np.full(len(nubars), np.nan, dtype=FX))
+        propagate_array_reduced(
+            *args,
+            SmartArray(flavs).get(WHERE),
+            *layer_args,
+            prob_e.get(WHERE),
+            prob_mu.get(WHERE),
+        )
+        prob_e.mark_changed(WHERE)
+        prob_mu.mark_changed(WHERE)
+
+        check(
+            test=prob_e.get("host"),
+            ref=probs[np.arange(len(flavs)), 0, flavs],
+            label=f"{tc_name} reduced prob_e",
+        )
+        check(
+            test=prob_mu.get("host"),
+            ref=probs[np.arange(len(flavs)), 1, flavs],
+            label=f"{tc_name} reduced prob_mu",
+        )
+
+    logging.info("<< PASS : test_propagate_array_reduced >>")
+
+
+def test_propagate_array_multi():
+    """Check that `propagate_array_multi` and `propagate_array_multi_reduced`
+    reproduce `propagate_array` evaluated separately for each hypothesis"""
+    hypos = [TEST_CASES[name] for name in
+             ["nufit32_no", "nufit32_io", "nufit32_std_nsi_no"]]
+    dms = np.stack([tc["dm"] for tc in hypos]).astype(FX)
+    mixs = np.stack([tc["pmns"] for tc in hypos]).astype(CX)
+    mat_pots = np.stack([tc["mat_pot"] for tc in hypos]).astype(CX)
+
+    tc = hypos[0]
+    # symmetric layers, such that identical layers are re-used
+    densities = np.concatenate(
+        [tc["layer_densities"], tc["layer_densities"][::-1]]
+    ).astype(FX)
+    distances = np.concatenate(
+        [tc["layer_distances"], tc["layer_distances"][::-1]]
+    ).astype(FX)
+    nubars = np.array([1, -1, 1, -1], dtype=IX)
+    energies = np.array([1, 1, 10, 100], dtype=FX)
+    flavs = np.array([0, 1, 2, 1], dtype=IX)
+    initial_flavs = np.array([0, 1], dtype=IX)
+
+    probs_multi = SmartArray(np.full((4, len(hypos), 3, 3), np.nan, dtype=FX))
+    propagate_array_multi(
+        SmartArray(dms).get(WHERE),
+        SmartArray(mixs).get(WHERE),
+        SmartArray(mat_pots).get(WHERE),
+        SmartArray(nubars).get(WHERE),
+        SmartArray(energies).get(WHERE),
+        SmartArray(densities).get(WHERE),
+        SmartArray(distances).get(WHERE),
+        probs_multi.get(WHERE),
+    )
+    probs_multi.mark_changed(WHERE)
+    probs_multi = probs_multi.get("host")
+
+    probs_reduced = SmartArray(np.full((4, len(hypos), 2), np.nan, dtype=FX))
+    propagate_array_multi_reduced(
+        SmartArray(dms).get(WHERE),
+        SmartArray(mixs).get(WHERE),
+        SmartArray(mat_pots).get(WHERE),
+        SmartArray(nubars).get(WHERE),
+        SmartArray(initial_flavs).get(WHERE),
+        SmartArray(flavs).get(WHERE),
+        SmartArray(energies).get(WHERE),
+        SmartArray(densities).get(WHERE),
+        SmartArray(distances).get(WHERE),
+        probs_reduced.get(WHERE),
+    )
+    probs_reduced.mark_changed(WHERE)
+    probs_reduced = probs_reduced.get("host")
+
+    for k in range(len(hypos)):
+        probs = SmartArray(np.full((4, 3, 3), np.nan, dtype=FX))
+        propagate_array(
+            SmartArray(dms[k]).get(WHERE),
+            SmartArray(mixs[k]).get(WHERE),
+            SmartArray(mat_pots[k]).get(WHERE),
+            SmartArray(nubars).get(WHERE),
+            SmartArray(energies).get(WHERE),
+            SmartArray(densities).get(WHERE),
+            SmartArray(distances).get(WHERE),
+            probs.get(WHERE),
+        )
+        probs.mark_changed(WHERE)
+        probs = probs.get("host")
+        check(test=probs_multi[:, k], ref=probs, label=f"multi, hypo {k}")
+        for i, flav in enumerate(flavs):
+            check(
+                test=probs_reduced[i, k],
+                ref=probs[i, initial_flavs, flav],
+                label=f"multi reduced, hypo {k}, event {i}",
+            )
+
+    logging.info("<< PASS : test_propagate_array_multi >>")
+
+
 def run_test_case(tc_name, tc, ignore_fails=False, define_as_ref=False):
     """Run one test case"""
     logging.info("== TEST CASE : %s ==", tc_name)
@@ -728,6 +863,8 @@ def main(description=__doc__):
     kwargs = vars(parser.parse_args())
     set_verbosity(kwargs.pop("v"))
     test_prob3numba(**kwargs)
+    test_propagate_array_reduced()
+    test_propagate_array_multi()
 
 
 if __name__ == "__main__":
@@ -11,6 +11,7 @@ from numba import guvectorize, SmartArray
 
 from pisa import TARGET
 from pisa.utils.numba_tools import (
+    CACHE,
     WHERE,
     cuda,
     myjit,
@@ -39,6 +40,7 @@ def sum_row_kernel(mix, bla, inp, out):
     ["void(float64[:,:], complex128, int32[:], int32[:])"],
     "(a,b),(),(f)->()",
     target=TARGET,
+    cache=CACHE,
 )
 def sum_row(mix, bla, inp, out):
     sum_row_kernel(mix, bla, inp, out)
@@ -10,7 +10,7 @@ import numpy as np
 from pisa import FTYPE, TARGET
 from pisa.core.pi_stage import PiStage
 from pisa.utils import vectorizer
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 
 __all__ = ['pi_shift_scale_pid']
 
@@ -90,6 +90,9 @@ class pi_shift_scale_pid(PiStage):
             container['calculated_pid'] = np.empty((container.size), dtype=FTYPE)
             container['original_pid'] = np.empty((container.size), dtype=FTYPE)
             vectorizer.assign(vals=container['pid'], out=container['original_pid'])
+            # `pid` may be read-only event data shared between loaders, so
+            # write the shifted values into a copy of our own
+            container['pid'] = np.copy(container['pid'].get('host'))
 
     def compute_function(self):
         """Perform computation"""
@@ -118,7 +121,7 @@ signatures = [
 layout = '(),(),()->()'
 
 
-@guvectorize(signatures, layout, target=TARGET)
+@guvectorize(signatures, layout, target=TARGET, cache=CACHE)
 def calculate_pid_function(bias_value, scale_factor, pid, out):
     """This function selects a pid cut by shifting the pid variable so
     the default cut at 1.0 is at the desired cut position.
@@ -7,6 +7,8 @@ Stage for resolution improvement studies
 
 from __future__ import absolute_import, print_function, division
 
+import numpy as np
+
 from pisa.core.pi_stage import PiStage
 from pisa.utils.log import logging
 
@@ -84,18 +86,23 @@ class resolutions(PiStage):
         self.data.data_specs = self.output_specs
 
         for container in self.data:
+            # the event variables may be read-only events shared between
+            # loaders, so modify copies of our own
             logging.info('Changing energy resolutions')
+            container['reco_energy'] = np.copy(container['reco_energy'].get('host'))
             tmp = container['reco_energy'].get('host')
             tmp += (container['true_energy'].get('host') - container['reco_energy'].get('host')) * self.params.energy_improvement.m_as('dimensionless')
             container['reco_energy'].mark_changed('host')
 
             logging.info('Changing coszen resolutions')
+            container['reco_coszen'] = np.copy(container['reco_coszen'].get('host'))
             tmp = container['reco_coszen'].get('host')
             tmp += (container['true_coszen'].get('host') - container['reco_coszen'].get('host')) * self.params.coszen_improvement.m_as('dimensionless')
             container['reco_coszen'].mark_changed('host')
             # make sure coszen is within -1/1 ?
 
             logging.info('Changing PID resolutions')
+            container['pid'] = np.copy(container['pid'].get('host'))
             tmp = container['pid'].get('host')
             if container.name in ['numu_cc', 'numubar_cc']:
                 tmp += self.params.pid_improvement.m_as('dimensionless')
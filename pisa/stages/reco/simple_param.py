@@ -492,10 +492,6 @@ class simple_param(PiStage):
             # Get reco energy
             #
 
-            # Create container if not already present
-            if "reco_energy" not in container :
-                container.add_array_data( "reco_energy", np.full_like(true_energy,np.NaN,dtype=FTYPE) )
-
             # Create the reco energy variable
             if perfect_reco :
                 reco_energy = true_energy
@@ -507,19 +503,15 @@ class simple_param(PiStage):
                     random_state=random_state,
                 )
 
-            # Write to the container
-            np.copyto( src=reco_energy, dst=container["reco_energy"].get("host") )
-            container["reco_energy"].mark_changed()
+            # Write to the container (replacing rather than overwriting any
+            # existing variable, which may be read-only shared event data)
+            container.add_array_data( "reco_energy", np.array(reco_energy,dtype=FTYPE) )
 
 
             #
             # Get reco coszen
             #
 
-            # Create container if not already present
-            if "reco_coszen" not in container :
-                container.add_array_data( "reco_coszen", np.full_like(true_coszen,np.NaN,dtype=FTYPE) )
-
             # Create the reco coszen variable
             if perfect_reco :
                 reco_coszen = true_coszen
@@ -532,19 +524,15 @@ class simple_param(PiStage):
                     random_state=random_state,
                 )
 
-            # Write to the container
-            np.copyto( src=reco_coszen, dst=container["reco_coszen"].get("host") )
-            container["reco_coszen"].mark_changed()
+            # Write to the container (replacing rather than overwriting any
+            # existing variable, which may be read-only shared event data)
+            container.add_array_data( "reco_coszen", np.array(reco_coszen,dtype=FTYPE) )
 
 
             #
             # Create a PID variable
             #
 
-            # Create container if not already present
-            if "pid" not in container :
-                container.add_array_data( "pid", np.full_like(true_energy,np.NaN,dtype=FTYPE) )
-
             # Create the PID variable
             if perfect_reco :
                 pid_value = track_pid if has_muon(particle_key) else cascade_pid
@@ -559,9 +547,9 @@ class simple_param(PiStage):
                     random_state=random_state,
                 )
 
-            # Write to the container
-            np.copyto( src=pid, dst=container["pid"].get("host") )
-            container["pid"].mark_changed()
+            # Write to the container (replacing rather than overwriting any
+            # existing variable, which may be read-only shared event data)
+            container.add_array_data( "pid", np.array(pid,dtype=FTYPE) )
 
 
 
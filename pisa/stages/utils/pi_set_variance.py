@@ -10,7 +10,7 @@ from pisa.core.pi_stage import PiStage
 from pisa.utils.profiler import profile
 from pisa.utils.log import logging
 from pisa.utils import vectorizer
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 
 
 class pi_set_variance(PiStage):  # pylint: disable=invalid-name
@@ -114,7 +114,7 @@ def apply_floor(val, out):
     apply_floor_gufunc(FTYPE(val), out=out.get(WHERE))
     out.mark_changed(WHERE)
 
-@guvectorize([f"({FX}, {FX}[:])"], "() -> ()", target=TARGET)
+@guvectorize([f"({FX}, {FX}[:])"], "() -> ()", target=TARGET, cache=CACHE)
 def apply_floor_gufunc(val, out):
     out[0] = val if out[0] < val else out[0]
 
@@ -122,6 +122,6 @@ def set_constant(val, out):
     set_constant_gufunc(FTYPE(val), out=out.get(WHERE))
     out.mark_changed(WHERE)
 
-@guvectorize([f"({FX}, {FX}[:])"], "() -> ()", target=TARGET)
+@guvectorize([f"({FX}, {FX}[:])"], "() -> ()", target=TARGET, cache=CACHE)
 def set_constant_gufunc(val, out):
     out[0] = val
@@ -16,7 +16,7 @@ from pisa import FTYPE, TARGET
 from pisa.core.pi_stage import PiStage
 from pisa.utils.profiler import profile
 from pisa.utils.fileio import from_file
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 
 
 class dis_sys(PiStage): # pylint: disable=invalid-name
@@ -208,7 +208,7 @@ class dis_sys(PiStage): # pylint: disable=invalid-name
 
 FX = 'f8' if FTYPE == np.float64 else 'f4'
 
-@guvectorize([f'({FX}, {FX}, {FX}, {FX}[:])'], '(),(),()->()', target=TARGET)
+@guvectorize([f'({FX}, {FX}, {FX}, {FX}[:])'], '(),(),()->()', target=TARGET, cache=CACHE)
 def apply_dis_sys(
     dis_correction_total,
     dis_correction_diff,
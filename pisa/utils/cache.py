@@ -6,19 +6,28 @@ MemoryCache and DiskCache classes to store long-to-compute results.
 from __future__ import absolute_import
 
 from collections import OrderedDict
+from collections.abc import Mapping
 import copy
+import io
+import multiprocessing
+import numbers
 import os
 import pickle
 import re
 import sqlite3
 import shutil
+import sys
 import tempfile
 import time
+import types
+import uuid
+
+import numpy as np
 
 from pisa.utils.log import logging, set_verbosity
 
 
-__all__ = ['MemoryCache', 'DiskCache',
+__all__ = ['get_nbytes', 'freeze', 'thaw', 'MemoryCache', 'DiskCache',
            'test_MemoryCache', 'test_DiskCache']
 
 __author__ = 'J.L. Lanfranchi'
@@ -38,6 +47,69 @@ __license__ = '''Copyright (c) 2014-2017, The IceCube Collaboration
  limitations under the License.'''
 
 
+def _visit(obj, memo, readonly):
+    """Recursively visit numpy arrays within `obj`, making them read-only if
+    `readonly`, and return the approximate size of `obj` in bytes"""
+    if id(obj) in memo:
+        return 0
+    memo[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        if readonly:
+            obj.setflags(write=False)
+        nbytes = sys.getsizeof(obj) if obj.base is None else obj.nbytes
+        if obj.dtype.hasobject:
+            nbytes += sum(sys.getsizeof(x) for x in obj.flat)
+        return nbytes
+
+    nbytes = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, numbers.Number, type,
+                        types.ModuleType, types.FunctionType,
+                        types.MethodType)):
+        return nbytes
+    if isinstance(obj, Mapping):
+        for key, val in obj.items():
+            nbytes += _visit(key, memo, readonly) + _visit(val, memo, readonly)
+        return nbytes
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        for val in obj:
+            nbytes += _visit(val, memo, readonly)
+        return nbytes
+    if hasattr(obj, '__dict__'):
+        nbytes += _visit(vars(obj), memo, readonly)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            nbytes += _visit(getattr(obj, slot), memo, readonly)
+    return nbytes
+
+
+def get_nbytes(obj):
+    """Approximate number of bytes occupied by `obj`, including the contents
+    of containers (mappings, sequences, sets) and the attributes of arbitrary
+    objects, recursively"""
+    return _visit(obj, {}, readonly=False)
+
+
+def freeze(obj):
+    """Make all numpy arrays found within `obj` read-only (see `get_nbytes`
+    for how `obj` is searched) and return the approximate number of bytes
+    occupied by `obj`.
+
+    Consumers of a frozen object that need to modify one of its arrays must do
+    so on a copy (see `thaw`).
+
+    """
+    return _visit(obj, {}, readonly=True)
+
+
+def thaw(array):
+    """Return `array` if it is writeable, or else a writeable copy of it (for
+    modifying arrays retrieved from a frozen cache)"""
+    if array.flags.writeable:
+        return array
+    return np.array(array, copy=True)
+
+
 class MemoryCache(object):
     """Simple implementation of a first-in-first-out (FIFO) or least-recently-
     used (LRU) in-memory cache, with a subset of the dict interface.
@@ -58,29 +130,59 @@ class MemoryCache(object):
         returned from the cache. This can guard aganst an object in the cache
         being modifed after it has been stored to the cache.
 
+    max_bytes : None or int >= 0
+        Limit on the (approximate) total size of the entries in the cache, in
+        bytes. Entries are pruned by FIFO or LRU logic until both this and
+        `max_depth` are satisfied (an entry that is larger than `max_bytes` by
+        itself is hence not kept). None imposes no limit.
+
+    freeze : bool
+        Whether to make numpy arrays within objects stored to the cache
+        read-only (see `freeze`). This guards against modification of cached
+        objects at no cost (unlike `deepcopy`); a consumer wishing to modify an
+        array must work on a copy of it.
+
     Attributes
     ----------
     GLOBAL_MEMCACHE_DEPTH_OVERRIDE : None or int >= 0
         Set to an integer to override the cache depth for *all* memory caches.
         E.g., set this to 0 to disable caching everywhere.
 
+    hits, misses, evictions : int
+        Number of successful and unsuccessful lookups (via `in`, `get`, or
+        item access) and number of entries pruned to satisfy the limits
+
+    nbytes : int
+        Total (approximate) size of the entries in the cache, in bytes; only
+        computed if `max_bytes` is set or `freeze` is True
+
     Notes
     -----
     Based off of code at www.kunxi.org/blog/2014/05/lru-cache-in-python
 
     """
     GLOBAL_MEMCACHE_DEPTH_OVERRIDE = None
-    def __init__(self, max_depth, is_lru=True, deepcopy=False):
+    def __init__(self, max_depth, is_lru=True, deepcopy=False, max_bytes=None,
+                 freeze=False):
         self.__cache = OrderedDict()
+        self.__nbytes = OrderedDict()
         self.__max_depth = max_depth
         self.__is_lru = is_lru
         self.__deepcopy = deepcopy
+        self.__max_bytes = max_bytes
+        self.__freeze = freeze
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
         if self.GLOBAL_MEMCACHE_DEPTH_OVERRIDE is not None:
             self.__max_depth = self.GLOBAL_MEMCACHE_DEPTH_OVERRIDE
         assert isinstance(self.__max_depth, int), \
                 '`max_depth` must be int; got %s' % type(self.__max_depth)
         assert self.__max_depth >= 0, \
                 '`max_depth` must be >= 0; got %s' % self.__max_depth
+        assert max_bytes is None or max_bytes >= 0, \
+                '`max_bytes` must be None or >= 0; got %s' % max_bytes
 
     def __str__(self):
         return 'MemoryCache(max_depth=%d, is_lru=%s)' % (self.__max_depth,
@@ -95,10 +197,14 @@ class MemoryCache(object):
             raise KeyError(
                 '`None` is not a valid cache key, so nothing can live there.'
             )
-        value = self.__cache[key]
+        try:
+            value = self.__cache[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
         if self.__is_lru:
-            del self.__cache[key]
-            self.__cache[key] = value
+            self.__cache.move_to_end(key)
         if self.__deepcopy:
             value = copy.deepcopy(value)
         return value
@@ -111,20 +217,39 @@ class MemoryCache(object):
         if self.__max_depth == 0:
             return
         # Same logic here for LRU and FIFO
-        try:
-            del self.__cache[key]
-        except KeyError:
-            if len(self) >= self.__max_depth:
-                self.__cache.popitem(last=False)
+        if key in self.__cache:
+            self.__remove(key)
         if self.__deepcopy:
             value = copy.deepcopy(value)
+        nbytes = 0
+        if self.__freeze:
+            nbytes = freeze(value)
+        elif self.__max_bytes is not None:
+            nbytes = get_nbytes(value)
+        if self.__max_bytes is not None and nbytes > self.__max_bytes:
+            self.evictions += 1
+            return
         self.__cache[key] = value
+        self.__nbytes[key] = nbytes
+        self.nbytes += nbytes
+        while (len(self.__cache) > self.__max_depth
+               or (self.__max_bytes is not None
+                   and self.nbytes > self.__max_bytes)):
+            self.__remove(next(iter(self.__cache)))
+            self.evictions += 1
+
+    def __remove(self, key):
+        self.nbytes -= self.__nbytes.pop(key)
+        return self.__cache.pop(key)
 
     def __contains__(self, key):
-        return key in self.__cache
+        if key in self.__cache:
+            return True
+        self.misses += 1
+        return False
 
     def __delitem__(self, key):
-        return self.__cache.__delitem__(self, key)
+        self.__remove(key)
 
     def __iter__(self):
         return iter(self.__cache)
@@ -135,11 +260,24 @@ class MemoryCache(object):
     def __reversed__(self):
         return reversed(self.__cache)
 
+    @property
+    def stats(self):
+        """OrderedDict with cache statistics"""
+        return OrderedDict([
+            ('entries', len(self)),
+            ('nbytes', self.nbytes),
+            ('hits', self.hits),
+            ('misses', self.misses),
+            ('evictions', self.evictions),
+        ])
+
     def clear(self):
+        self.__nbytes.clear()
+        self.nbytes = 0
         return self.__cache.clear()
 
     def get(self, key, dflt=None):
-        if key in self.__cache:
+        if key in self:
             return self[key]
         return dflt
 
@@ -147,13 +285,14 @@ class MemoryCache(object):
         return self.__cache.keys()
 
     def pop(self, k):
-        value = self.__cache.pop(k)
+        value = self.__remove(k)
         if self.__deepcopy:
             value = copy.deepcopy(value)
         return value
 
     def popitem(self, last=True):
-        return self.pop(last)
+        key = next(reversed(self.__cache)) if last else next(iter(self.__cache))
+        return key, self.pop(key)
 
     def setdefault(self, key, default=None):
         if not key in self:
@@ -167,6 +306,35 @@ class MemoryCache(object):
         return vals
 
 
+class _ArrayFilePickler(pickle.Pickler):
+    """Pickler storing large numpy arrays in separate `.npy` files (via
+    `save_array`) rather than in the pickle itself"""
+    def __init__(self, fobj, min_bytes, save_array):
+        super().__init__(fobj, pickle.HIGHEST_PROTOCOL)
+        self.min_bytes = min_bytes
+        self.save_array = save_array
+
+    def persistent_id(self, obj):  # pylint: disable=method-hidden
+        if (type(obj) is np.ndarray and not obj.dtype.hasobject
+                and obj.nbytes >= self.min_bytes):
+            return ('npy', self.save_array(obj))
+        return None
+
+
+class _ArrayFileUnpickler(pickle.Unpickler):
+    """Unpickler memory-mapping the arrays stored by `_ArrayFilePickler`
+    (copy-on-write, so they behave like ordinary arrays)"""
+    def __init__(self, fobj, load_array):
+        super().__init__(fobj)
+        self.load_array = load_array
+
+    def persistent_load(self, pid):
+        kind, fname = pid
+        if kind != 'npy':
+            raise pickle.UnpicklingError('Unknown persistent id "%s"' % kind)
+        return self.load_array(fname)
+
+
 class DiskCache(object):
     """
     Implements a subset of dict methods but with persistent storage to an on-
@@ -184,16 +352,26 @@ class DiskCache(object):
 
     is_lru : bool
         If True, implement least-recently-used (LRU) logic for removing items
-        beyond `max_depth`. This adds an additional ~400 ms to item retrieval
-        time. Otherwise, behaves as a first-in-first-out (FIFO) cache.
+        beyond `max_depth`. This requires an update of the entry's access time
+        on each retrieval. Otherwise, behaves as a first-in-first-out (FIFO)
+        cache.
+
+    array_file_threshold : int or None
+        Numpy arrays (within the stored objects) of at least this many bytes
+        are stored in separate `.npy` files next to the database (in the
+        directory `db_fpath + ".arrays"`) rather than being pickled into the
+        database, and are memory-mapped when retrieved. Set to None to store
+        everything in the database.
 
     Notes
     -----
-    This is not (as of now) thread-safe, but it is multi-process safe. The
-    Python sqlite3 api requires a single Python process to have just a single
-    connection to a database at a time. Several processes can be safely
-    connected to the database simultaneously, however, due to sqlite's locking
-    mechanisms that resolve resource contention.
+    This is not (as of now) thread-safe, but it is multi-process safe. Each
+    process keeps a single connection to the database (re-connecting after a
+    fork). The database is put into write-ahead-logging (WAL) mode, such that
+    several processes can read from the database while another one writes to
+    it; sqlite's locking mechanisms resolve any other resource contention.
+    Note that WAL mode requires a filesystem supporting shared memory (i.e.,
+    not a network filesystem).
 
     Large databases are slower to work with than small. Therefore it is
     recommended to use separate databases for each stage's cache rather than
@@ -237,12 +415,37 @@ class DiskCache(object):
         '''CREATE TABLE cache (hash INTEGER PRIMARY KEY,
                                accesstime INTEGER,
                                data BLOB)'''
-    def __init__(self, db_fpath, max_depth=100, is_lru=False):
+
+    # Number of rows in `cache`, kept up to date by triggers such that the
+    # length of the cache need not be counted
+    COUNT_SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS cache_count (count INTEGER)",
+        ("CREATE TRIGGER IF NOT EXISTS cache_count_insert AFTER INSERT ON cache"
+         " BEGIN UPDATE cache_count SET count = count + 1; END"),
+        ("CREATE TRIGGER IF NOT EXISTS cache_count_delete AFTER DELETE ON cache"
+         " BEGIN UPDATE cache_count SET count = count - 1; END"),
+    ]
+
+    # Token of the array files of each row (see `array_file_threshold`), such
+    # that a writer removes exactly the files of the row it replaces
+    TOKEN_SCHEMA = [
+        ("CREATE TABLE IF NOT EXISTS cache_token (hash INTEGER PRIMARY KEY,"
+         " token TEXT)"),
+        ("CREATE TRIGGER IF NOT EXISTS cache_token_delete AFTER DELETE ON cache"
+         " BEGIN DELETE FROM cache_token WHERE hash = old.hash; END"),
+    ]
+
+    def __init__(self, db_fpath, max_depth=100, is_lru=False,
+                 array_file_threshold=2**20):
         self.__db_fpath = os.path.expandvars(os.path.expanduser(db_fpath))
+        self.__arrays_dir = self.__db_fpath + '.arrays'
+        self.__conn = None
+        self.__conn_pid = None
         self.__instantiate_db()
         assert 0 < max_depth < 1e6, 'Invalid `max_depth`:' + str(max_depth)
         self.__max_depth = max_depth
         self.__is_lru = is_lru
+        self.__array_file_threshold = array_file_threshold
 
     @property
     def path(self):
@@ -258,13 +461,14 @@ class DiskCache(object):
                 os.makedirs(dirpath)
 
         conn = self.__connect()
+        conn.execute('BEGIN IMMEDIATE')
         try:
-            if exists:
+            sql = ("SELECT sql FROM sqlite_master WHERE type='table' AND"
+                   " NAME='cache'")
+            row = conn.execute(sql).fetchone()
+            if row is not None:
                 # Check that the table format is valid
-                sql = ("SELECT sql FROM sqlite_master WHERE type='table' AND"
-                       " NAME='cache'")
-                cursor = conn.execute(sql)
-                schema, = cursor.fetchone()
+                schema, = row
                 # Ignore formatting
                 schema = re.sub(r'\s', '', schema).lower()
                 ref_schema = re.sub(r'\s', '', self.TABLE_SCHEMA).lower()
@@ -279,12 +483,24 @@ class DiskCache(object):
                 conn.execute(sql)
                 sql = "CREATE INDEX idx1 ON cache(accesstime)"
                 conn.execute(sql)
-                conn.commit()
+
+            # Set up the row count (also for databases created before it was
+            # introduced)
+            sql = ("SELECT name FROM sqlite_master WHERE type='table' AND"
+                   " NAME='cache_count'")
+            if conn.execute(sql).fetchone() is None:
+                for sql in self.COUNT_SCHEMA:
+                    conn.execute(sql)
+                conn.execute(
+                    "INSERT INTO cache_count (count) SELECT COUNT (*) FROM cache"
+                )
+            for sql in self.TOKEN_SCHEMA:
+                conn.execute(sql)
         except:
-            conn.rollback()
+            conn.execute('ROLLBACK')
             raise
-        finally:
-            conn.close()
+        else:
+            conn.execute('COMMIT')
 
     def __str__(self):
         s = 'DiskCache(db_fpath=%s, max_depth=%d, is_lru=%s)' % \
@@ -304,34 +520,34 @@ class DiskCache(object):
             raise KeyError('`key` must be int, got "%s"' % type(key))
         conn = self.__connect()
         t1 = time.time()
-        logging.trace('conn: %0.4f' % (t1 - t0))
-        try:
-            if self.__is_lru:
-                # Update accesstime
-                sql = "UPDATE cache SET accesstime = ? WHERE hash = ?"
-                conn.execute(sql, (self.now, key))
-                t2 = time.time()
-                logging.trace('update: % 0.4f' % (t2 - t1))
+        logging.trace('conn: %0.4f', t1 - t0)
+        if self.__is_lru:
+            # Update accesstime
+            sql = "UPDATE cache SET accesstime = ? WHERE hash = ?"
+            conn.execute(sql, (self.now, key))
             t2 = time.time()
+            logging.trace('update: %0.4f', t2 - t1)
+        t2 = time.time()
 
-            # Retrieve contents
-            sql = "SELECT data FROM cache WHERE hash = ?"
-            cursor = conn.execute(sql, (key,))
-            t3 = time.time()
-            logging.trace('select: % 0.4f' % (t3 - t2))
-            tmp = cursor.fetchone()
-            if tmp is None:
-                raise KeyError(str(key))
-            data = tmp[0]
-            t4 = time.time()
-            logging.trace('fetch: % 0.4f' % (t4 - t3))
-            data = pickle.loads(bytes(data))
-            t5 = time.time()
-            logging.trace('loads: % 0.4f' % (t5 - t4))
-        finally:
-            conn.commit()
-            conn.close()
-            logging.trace('')
+        # Retrieve contents
+        sql = "SELECT data FROM cache WHERE hash = ?"
+        cursor = conn.execute(sql, (key,))
+        t3 = time.time()
+        logging.trace('select: %0.4f', t3 - t2)
+        tmp = cursor.fetchone()
+        if tmp is None:
+            raise KeyError(str(key))
+        data = tmp[0]
+        t4 = time.time()
+        logging.trace('fetch: %0.4f', t4 - t3)
+        try:
+            data = self.__loads(data)
+        except FileNotFoundError:
+            # Entry was removed by another process while reading it
+            raise KeyError(str(key))
+        t5 = time.time()
+        logging.trace('loads: %0.4f', t5 - t4)
+        logging.trace('')
         return data
 
     def __setitem__(self, key, obj):
@@ -341,81 +557,96 @@ class DiskCache(object):
             )
         t0 = time.time()
         assert isinstance(key, int)
-        data = sqlite3.Binary(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+        # Arrays are written to files under a name unique to this entry, such
+        # that readers of a previous entry for `key` are not affected
+        token = uuid.uuid4().hex
+        data = sqlite3.Binary(self.__dumps(obj, key, token))
         t1 = time.time()
-        logging.trace('dumps: % 0.4f' % (t1 - t0))
+        logging.trace('dumps: %0.4f', t1 - t0)
 
         conn = self.__connect()
         t2 = time.time()
-        logging.trace('conn: % 0.4f' % (t2 - t1))
+        logging.trace('conn: %0.4f', t2 - t1)
+        evicted = []
+        conn.execute('BEGIN IMMEDIATE')
         try:
             t = time.time()
-            sql = "INSERT INTO cache (hash, accesstime, data) VALUES (?, ?, ?)"
-            conn.execute(sql, (key, self.now, data))
+            # Token of the entry being replaced, read within the transaction
+            # such that concurrent writers of `key` each remove only the files
+            # of the entry they replaced
+            replaced_token = self.__token(conn, key)
+            sql = "UPDATE cache SET accesstime = ?, data = ? WHERE hash = ?"
+            cursor = conn.execute(sql, (self.now, data, key))
+            if cursor.rowcount == 0:
+                replaced_token = None
+                sql = "INSERT INTO cache (hash, accesstime, data) VALUES (?, ?, ?)"
+                conn.execute(sql, (key, self.now, data))
+            sql = "INSERT OR REPLACE INTO cache_token (hash, token) VALUES (?, ?)"
+            conn.execute(sql, (key, token))
             t1 = time.time()
-            logging.trace('insert: % 0.4f' % (t1 - t))
-            conn.commit()
+            logging.trace('insert: %0.4f', t1 - t)
+
+            # Remove oldest-accessed rows in excess of limit, all at once
+            n_to_remove = self.__count(conn) - self.__max_depth
+            if n_to_remove > 0:
+                sql = ("SELECT hash FROM cache WHERE hash != ? ORDER BY"
+                       " accesstime ASC LIMIT ?")
+                evicted = [
+                    (k, self.__token(conn, k))
+                    for k, in conn.execute(sql, (key, n_to_remove)).fetchall()
+                ]
+                sql = "DELETE FROM cache WHERE hash IN (%s)" % (
+                    ', '.join('?' * len(evicted))
+                )
+                conn.execute(sql, [k for k, _ in evicted])
             t2 = time.time()
-            logging.trace('commit: % 0.4f' % (t2 - t1))
-
-            # Remove oldest-accessed rows in excess of limit
-            n_to_remove = len(self) - self.__max_depth
-            t3 = time.time()
-            logging.trace('len: % 0.4f' % (t3 - t2))
-            if n_to_remove <= 0:
-                return
-
-            # Find the access time of the n-th element (sorted ascending by
-            # access time)
-            sql = ("SELECT accesstime FROM cache ORDER BY accesstime ASC LIMIT"
-                   " 1 OFFSET ?")
-            cursor = conn.execute(sql, (n_to_remove,))
-            t4 = time.time()
-            logging.trace('select old: % 0.4f' % (t4 - t3))
-            nth_access_time, = cursor.fetchone()
-            t5 = time.time()
-            logging.trace('fetch: % 0.4f' % (t5 - t4))
-
-            # Remove all elements that old or older
-            sql = "DELETE FROM cache WHERE accesstime < ?"
-            conn.execute(sql, (nth_access_time,))
-            t6 = time.time()
-            logging.trace('delete: % 0.4f' % (t6 - t5))
+            logging.trace('evict: %0.4f', t2 - t1)
         except:
             t = time.time()
-            conn.rollback()
-            logging.trace('rollback: % 0.4f' % (time.time() - t))
+            conn.execute('ROLLBACK')
+            self.__remove_arrays(key, only_token=token)
+            logging.trace('rollback: %0.4f', time.time() - t)
             raise
         else:
             t = time.time()
-            conn.commit()
-            logging.trace('commit: % 0.4f' % (time.time() - t))
-        finally:
-            t = time.time()
-            conn.close()
-            logging.trace('close: % 0.4f' % (time.time() - t))
-            logging.trace('')
+            conn.execute('COMMIT')
+            logging.trace('commit: %0.4f', time.time() - t)
+
+        # Remove the array files no longer referenced
+        if replaced_token is not None and replaced_token != token:
+            self.__remove_arrays(key, only_token=replaced_token)
+        for evicted_key, evicted_token in evicted:
+            self.__remove_arrays(evicted_key, only_token=evicted_token)
+        logging.trace('')
 
     def __delitem__(self, key):
         conn = self.__connect()
+        conn.execute('BEGIN IMMEDIATE')
         try:
+            token = self.__token(conn, key)
             sql = "DELETE FROM cache WHERE hash = ?"
             conn.execute(sql, (key,))
         except:
-            conn.rollback()
+            conn.execute('ROLLBACK')
             raise
         else:
-            conn.commit()
-        finally:
-            conn.close()
+            conn.execute('COMMIT')
+        self.__remove_arrays(key, only_token=token)
 
     def __len__(self):
-        conn = self.__connect()
-        try:
-            cursor = conn.execute('SELECT COUNT (*) FROM cache')
-            count, = cursor.fetchone()
-        finally:
-            conn.close()
+        return self.__count(self.__connect())
+
+    @staticmethod
+    def __token(conn, key):
+        """Token of the array files of the entry `key`, or None if unknown"""
+        sql = "SELECT token FROM cache_token WHERE hash = ?"
+        row = conn.execute(sql, (key,)).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def __count(conn):
+        cursor = conn.execute('SELECT count FROM cache_count')
+        count, = cursor.fetchone()
         return count
 
     def get(self, key, dflt=None):
@@ -428,34 +659,36 @@ class DiskCache(object):
 
     def clear(self):
         conn = self.__connect()
+        conn.execute('BEGIN IMMEDIATE')
         try:
             conn.execute('DELETE FROM cache')
         except:
-            conn.rollback()
+            conn.execute('ROLLBACK')
             raise
         else:
-            conn.commit()
-        finally:
-            conn.close()
+            conn.execute('COMMIT')
+        shutil.rmtree(self.__arrays_dir, ignore_errors=True)
 
     def keys(self):
         conn = self.__connect()
-        try:
-            sql = "SELECT hash FROM cache ORDER BY accesstime ASC"
-            cursor = conn.execute(sql)
-            k = [k[0] for k in cursor.fetchall()]
-        finally:
-            conn.close()
+        sql = "SELECT hash FROM cache ORDER BY accesstime ASC"
+        cursor = conn.execute(sql)
+        k = [k[0] for k in cursor.fetchall()]
         return k
 
     def __connect(self):
+        """Return this process's connection to the database, creating it if
+        necessary (connections must not be shared with forked processes)"""
+        if self.__conn is not None and self.__conn_pid == os.getpid():
+            return self.__conn
+
         conn = sqlite3.connect(
             self.__db_fpath,
             isolation_level=None, check_same_thread=False, timeout=10,
         )
 
-        # Trust journaling to memory
-        sql = "PRAGMA journal_mode=MEMORY"
+        # Allow readers concurrent to a writer
+        sql = "PRAGMA journal_mode=WAL"
         conn.execute(sql)
 
         # Trust OS to complete transaction
@@ -466,14 +699,73 @@ class DiskCache(object):
         sql = "PRAGMA auto_vacuum=FULL"
         conn.execute(sql)
 
+        self.__conn = conn
+        self.__conn_pid = os.getpid()
         return conn
 
+    def close(self):
+        """Close the connection to the database (it is re-opened when
+        needed)"""
+        if self.__conn is not None and self.__conn_pid == os.getpid():
+            self.__conn.close()
+        self.__conn = None
+        self.__conn_pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_DiskCache__conn'] = None
+        state['_DiskCache__conn_pid'] = None
+        return state
+
+    def __dumps(self, obj, key, token):
+        """Pickle `obj`, writing large arrays to files specific to `key` and
+        `token`"""
+        if self.__array_file_threshold is None:
+            return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+        key_dir = os.path.join(self.__arrays_dir, str(key))
+        n_arrays = [0]
+        def save_array(array):
+            if n_arrays[0] == 0:
+                os.makedirs(key_dir, exist_ok=True)
+            fname = os.path.join(str(key), '%s.%d.npy' % (token, n_arrays[0]))
+            np.save(os.path.join(self.__arrays_dir, fname), array)
+            n_arrays[0] += 1
+            return fname
+
+        fobj = io.BytesIO()
+        _ArrayFilePickler(fobj, self.__array_file_threshold, save_array).dump(obj)
+        return fobj.getvalue()
+
+    def __loads(self, data):
+        """Unpickle `data`, memory-mapping arrays stored in files"""
+        def load_array(fname):
+            return np.asarray(
+                np.load(os.path.join(self.__arrays_dir, fname), mmap_mode='c')
+            )
+        return _ArrayFileUnpickler(io.BytesIO(data), load_array).load()
+
+    def __remove_arrays(self, key, only_token=None):
+        """Remove the array files of `key` written with `only_token`, or all
+        of them if `only_token` is None"""
+        key_dir = os.path.join(self.__arrays_dir, str(key))
+        if not os.path.isdir(key_dir):
+            return
+        if only_token is None:
+            shutil.rmtree(key_dir, ignore_errors=True)
+            return
+        for fname in os.listdir(key_dir):
+            if fname.split('.')[0] != only_token:
+                continue
+            try:
+                os.remove(os.path.join(key_dir, fname))
+            except OSError:
+                pass
+
     def __contains__(self, key):
-        try:
-            _ = self[key]
-            return True 
-        except KeyError:
-            return False
+        conn = self.__connect()
+        sql = "SELECT 1 FROM cache WHERE hash = ?"
+        return conn.execute(sql, (key,)).fetchone() is not None
 
     @property
     def now(self):
@@ -504,10 +796,53 @@ def test_MemoryCache():
         y = mc[4]
         assert (y == x_ref) == deepcopy
 
+    # Frozen arrays cannot be modified in place, but copies of them can
+    mc = MemoryCache(max_depth=3, is_lru=True, freeze=True)
+    x = {'a': np.zeros(100), 'b': [np.ones(10)]}
+    mc[0] = x
+    y = mc[0]
+    assert y is x
+    for arr in (y['a'], y['b'][0]):
+        try:
+            arr[0] = 1
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('Array in cache was modified')
+    z = thaw(y['a'])
+    z[0] = 1
+    assert mc[0]['a'][0] == 0
+    assert mc.nbytes >= 110 * 8
+
+    # Byte budget: pruning evicts least-recently-used entries until the size
+    # is within budget
+    mc = MemoryCache(max_depth=100, is_lru=True, max_bytes=3500)
+    for key in range(3):
+        mc[key] = np.zeros(100)
+    assert len(mc) == 3 and mc.nbytes <= 3500
+    mc[0] # pylint: disable=pointless-statement
+    mc[3] = np.zeros(200)
+    assert list(mc.keys()) == [0, 3] and mc.nbytes <= 3500
+    mc[4] = np.zeros(1000) # too large by itself
+    assert 4 not in mc and len(mc) == 2
+    assert mc.evictions == 3
+    assert mc.hits == 1 and mc.misses == 1
+    del mc[0]
+    assert mc.nbytes == get_nbytes(np.zeros(200))
+    mc.clear()
+    assert mc.nbytes == 0
+
     logging.info('<< PASS : test_MemoryCache >>')
 
 
 # TODO: augment test
+def _set_repeatedly(db_fpath, key, value, n):
+    """Store `value` under `key` in the DiskCache at `db_fpath` `n` times"""
+    disk_cache = DiskCache(db_fpath=db_fpath, max_depth=3, is_lru=False)
+    for _ in range(n):
+        disk_cache[key] = value
+
+
 def test_DiskCache():
     """Unit tests for DiskCache class"""
     testdir = tempfile.mkdtemp()
@@ -525,6 +860,64 @@ def test_DiskCache():
         dc[3] = 'three'
         assert 0 not in dc
         assert dc[3] == 'three'
+        assert len(dc) == 3
+
+        # Large arrays go to files next to the database and are memory-mapped
+        big = np.arange(2**18, dtype=np.float64)
+        dc[4] = {'big': big, 'small': big[:10].copy()}
+        arrays_dir = tmp_fname + '.arrays'
+        def n_array_files(key):
+            key_dir = os.path.join(arrays_dir, str(key))
+            return len(os.listdir(key_dir)) if os.path.isdir(key_dir) else 0
+        assert n_array_files(4) == 1
+        val = dc[4]
+        assert isinstance(val['big'], np.ndarray)
+        assert np.all(val['big'] == big) and np.all(val['small'] == big[:10])
+        val['big'][0] = -1 # copy-on-write, must not alter the cached value
+        assert dc[4]['big'][0] == 0
+
+        # Replacing an entry removes its previous array files
+        dc[4] = {'big': 2*big}
+        assert n_array_files(4) == 1
+        assert np.all(dc[4]['big'] == 2*big)
+        assert len(dc) == 3
+
+        # Evicting an entry removes its array files, too
+        for key in range(5, 8):
+            dc[key] = key
+        assert 4 not in dc
+        assert n_array_files(4) == 0
+        assert len(dc) == 3 and dc.keys() == [5, 6, 7]
+
+        # Another instance (e.g. in another process) sees the same entries
+        dc2 = DiskCache(db_fpath=tmp_fname, max_depth=3, is_lru=False)
+        assert len(dc2) == 3 and dc2[7] == 7
+        dc2[8] = big
+        assert np.all(dc[8] == big) and 5 not in dc
+        del dc[8]
+        assert len(dc2) == 2 and n_array_files(8) == 0
+
+        # Instances in separate processes replacing the same entry only remove
+        # the array files of the entries they replaced
+        dc2[9] = big
+        dc.close()
+        dc2.close()
+        procs = [
+            multiprocessing.Process(
+                target=_set_repeatedly, args=(tmp_fname, 9, factor*big, 50)
+            ) for factor in (2, 3)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            assert proc.exitcode == 0
+        val = dc[9]
+        assert np.all(val == 2*big) or np.all(val == 3*big)
+        assert n_array_files(9) == 1
+
+        dc.clear()
+        assert len(dc2) == 0 and not os.path.exists(arrays_dir)
     finally:
         shutil.rmtree(testdir, ignore_errors=True)
 
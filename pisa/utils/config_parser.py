@@ -233,7 +233,8 @@ from configparser import (
 import numpy as np
 from uncertainties import ufloat, ufloat_fromstr
 
-from pisa import ureg
+from pisa import CACHE_DIR, FTYPE, __version__, ureg
+from pisa.utils.cache import DiskCache
 from pisa.utils.fileio import from_file
 from pisa.utils.format import split
 from pisa.utils.hash import hash_obj
@@ -243,8 +244,10 @@ from pisa.utils.resources import find_resource
 
 __all__ = ['PARAM_RE', 'PARAM_ATTRS', 'STAGE_SEP',
            'parse_quantity', 'parse_string_literal',
-           'interpret_param_subfields', 'parse_param', 'parse_pipeline_config',
-           'MutableMultiFileIterator', 'PISAConfigParser']
+           'interpret_param_subfields', 'parse_param', 'get_include_closure',
+           'get_pipeline_config_key', 'get_pipeline_config_cache',
+           'parse_pipeline_config', 'MutableMultiFileIterator',
+           'PISAConfigParser']
 
 __author__ = 'P. Eller, J. Lanfranchi'
 
@@ -278,6 +281,10 @@ numpy = np # pylint: disable=invalid-name
 inf = np.inf # pylint: disable=invalid-name
 units = ureg # pylint: disable=invalid-name
 
+_PIPELINE_CONFIG_CACHES = {}
+"""Caches of parsed pipeline configs, keyed by database path (see
+`get_pipeline_config_cache`)"""
+
 
 def parse_quantity(string):
     """Parse a string into a pint/uncertainty quantity.
@@ -533,13 +540,113 @@ def parse_param(config, section, selector, fullname, pname, value):
     return param
 
 
-def parse_pipeline_config(config):
+def get_include_closure(config):
+    """Locate the config file or resource `config` and, recursively, all files
+    it ``#include``s.
+
+    Parameters
+    ----------
+    config : string
+        Config file path or PISA resource location
+
+    Returns
+    -------
+    fpaths : list of strings
+        Absolute paths of the files, in the order they are first encountered
+
+    """
+    fpaths = []
+
+    def _visit(resource):
+        fpath = abspath(expanduser(expandvars(find_resource(resource))))
+        if fpath in fpaths:
+            # Circular reference; left for PISAConfigParser to complain about
+            return
+        fpaths.append(fpath)
+        with open(fpath, 'r') as f:
+            for line in f:
+                include_info = PISAConfigParser._get_include_info(line) # pylint: disable=protected-access
+                if include_info:
+                    _visit(include_info['file'])
+
+    _visit(config)
+    return fpaths
+
+
+def get_pipeline_config_key(config):
+    """Key identifying the parsed form of the pipeline config `config` in the
+    cache of parsed configs.
+
+    If `config` is a resource location, the key is derived from the contents
+    of the config file and of all files it includes (see
+    `get_include_closure`), such that the config need not be parsed in order
+    to look it up. If `config` is a PISAConfigParser, the key is derived from
+    its parsed contents (see `PISAConfigParser.hash`). Either way, the PISA
+    version and FTYPE are hashed on as well.
+
+    Parameters
+    ----------
+    config : string or PISAConfigParser
+
+    Returns
+    -------
+    key : int or None
+        None if the files making up `config` could not all be read
+
+    """
+    if isinstance(config, PISAConfigParser):
+        contents = config.hash
+    else:
+        try:
+            contents = []
+            for fpath in get_include_closure(config):
+                with open(fpath, 'rb') as f:
+                    contents.append((fpath, f.read()))
+        except (IOError, ValueError) as err:
+            logging.debug('Not caching config "%s": %s', config, err)
+            return None
+    return hash_obj((__version__, FTYPE.__name__, contents))
+
+
+def get_pipeline_config_cache(cache=True):
+    """Retrieve the on-disk cache of parsed pipeline configs.
+
+    Parameters
+    ----------
+    cache : bool or string
+        If True, use the default location `CACHE_DIR/pipeline_configs.sqlite`;
+        if string, path of the database file
+
+    Returns
+    -------
+    disk_cache : pisa.utils.cache.DiskCache
+
+    """
+    if cache is True:
+        cache = join(CACHE_DIR, 'pipeline_configs.sqlite')
+    cache = abspath(expanduser(expandvars(cache)))
+    if cache not in _PIPELINE_CONFIG_CACHES:
+        _PIPELINE_CONFIG_CACHES[cache] = DiskCache(
+            cache, max_depth=100, is_lru=True, array_file_threshold=None
+        )
+    return _PIPELINE_CONFIG_CACHES[cache]
+
+
+def parse_pipeline_config(config, cache=True):
     """Parse pipeline config.
 
     Parameters
     ----------
     config : string or ConfigParser
 
+    cache : bool or string
+        Whether to look up (and store) the parsed config in an on-disk cache,
+        keyed on the contents of the config and all files it includes (see
+        `get_pipeline_config_key`), such that the config is only parsed once
+        per version of its files. If string, path of the cache's database file
+        (see `get_pipeline_config_cache`). Configs defining spline priors are
+        never cached, since the prior's data file is not hashed on.
+
     Returns
     -------
     stage_dicts : OrderedDict
@@ -549,20 +656,60 @@ def parse_pipeline_config(config):
         as strings that must be used or parsed elsewhere.
 
     """
-    # Note: imports placed here to avoid circular imports
-    from pisa.core.binning import MultiDimBinning, OneDimBinning
-    from pisa.core.param import ParamSelector
-
-    if isinstance(config, str):
-        config = from_file(config)
-    elif isinstance(config, PISAConfigParser):
-        pass
-    else:
+    if not isinstance(config, (str, PISAConfigParser)):
         raise TypeError(
             '`config` must either be a string or PISAConfigParser. Got %s '
             'instead.' % type(config)
         )
 
+    # Any failure of the cache (locked or read-only database, stale entries
+    # that cannot be unpickled, ...) is treated as a miss
+    disk_cache = None
+    key = None
+    if cache:
+        key = get_pipeline_config_key(config)
+    if key is not None:
+        try:
+            disk_cache = get_pipeline_config_cache(cache)
+        except Exception as err: # pylint: disable=broad-except
+            logging.warning('Cannot use cache of parsed configs: %s', err)
+    if disk_cache is not None:
+        try:
+            stage_dicts = disk_cache[key]
+        except KeyError:
+            pass
+        except Exception as err: # pylint: disable=broad-except
+            logging.warning('Cannot load parsed config from cache: %s', err)
+        else:
+            logging.debug('Loaded parsed config "%s" from cache', config)
+            return stage_dicts
+
+    if isinstance(config, str):
+        config = from_file(config)
+    stage_dicts = _parse_pipeline_config(config)
+
+    if disk_cache is not None:
+        has_spline_prior = any(
+            option.endswith('.prior')
+            and config.get(section, option).strip().lower() == 'spline'
+            for section in config.sections() for option in config[section]
+        )
+        if not has_spline_prior:
+            try:
+                disk_cache[key] = stage_dicts
+            except Exception as err: # pylint: disable=broad-except
+                logging.warning('Cannot store parsed config in cache: %s', err)
+
+    return stage_dicts
+
+
+def _parse_pipeline_config(config):
+    """Parse pipeline config, a PISAConfigParser (see
+    `parse_pipeline_config`)"""
+    # Note: imports placed here to avoid circular imports
+    from pisa.core.binning import MultiDimBinning, OneDimBinning
+    from pisa.core.param import ParamSelector
+
     if not config.has_section('binning'):
         raise NoSectionError(
             "Could not find 'binning'. Only found sections: %s"
@@ -1304,6 +1451,77 @@ def test_parse_pipeline_config(config='settings/pipeline/example.cfg'):
         assert vals == config0[key]
 
 
+def test_pipeline_config_cache():
+    """Unit test for the cache of parsed configs in `parse_pipeline_config`"""
+    import shutil
+    import sqlite3
+    import tempfile
+
+    config = """
+#include {binning_fpath}
+
+[pipeline]
+order = stageA.serviceA
+
+[stageA.serviceA]
+calc_specs = binning1
+param.p1 = 0.0 +/- 0.5 units.deg
+param.p1.fixed = False
+param.p1.range = nominal + [-2.0, +2.0] * sigma
+param.p2 = 1.0
+"""
+    binning = """
+[binning]
+binning1.order = axis1
+binning1.axis1 = {{'num_bins': {num_bins}, 'is_lin': True, 'domain': [1, 5]}}
+"""
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        config_fpath = join(tempdir, 'pipeline.cfg')
+        binning_fpath = join(tempdir, 'binning.cfg')
+        cache_fpath = join(tempdir, 'pipeline_configs.sqlite')
+        with open(config_fpath, 'w') as f:
+            f.write(config.format(binning_fpath=binning_fpath))
+        with open(binning_fpath, 'w') as f:
+            f.write(binning.format(num_bins=10))
+
+        assert get_include_closure(config_fpath) == [config_fpath,
+                                                     binning_fpath]
+        disk_cache = get_pipeline_config_cache(cache_fpath)
+
+        # Parse & store, then retrieve a (new) object equal to the parsed one
+        parsed = parse_pipeline_config(config_fpath, cache=cache_fpath)
+        assert len(disk_cache) == 1
+        cached = parse_pipeline_config(config_fpath, cache=cache_fpath)
+        assert len(disk_cache) == 1
+        assert cached == parsed
+        assert cached == parse_pipeline_config(config_fpath, cache=False)
+        stage_dict = cached[('stageA', 'serviceA')]
+        assert stage_dict is not parsed[('stageA', 'serviceA')]
+        assert stage_dict['params'].params.p1.prior.kind == 'gaussian'
+
+        # Modifying an included file must invalidate the cached config
+        with open(binning_fpath, 'w') as f:
+            f.write(binning.format(num_bins=20))
+        modified = parse_pipeline_config(config_fpath, cache=cache_fpath)
+        assert len(disk_cache) == 2
+        assert modified[('stageA', 'serviceA')]['calc_specs'].num_bins == [20]
+
+        # Unreadable entries and unusable caches are treated as misses
+        conn = sqlite3.connect(cache_fpath)
+        with conn:
+            conn.execute('UPDATE cache SET data = ?', (b'not a pickle',))
+        conn.close()
+        assert parse_pipeline_config(config_fpath, cache=cache_fpath) == modified
+        assert parse_pipeline_config(config_fpath, cache=cache_fpath) == modified
+        assert parse_pipeline_config(config_fpath, cache=tempdir) == modified
+    finally:
+        shutil.rmtree(tempdir)
+
+    logging.info('<< PASS : test_pipeline_config_cache >>')
+
+
 def test_MutableMultiFileIterator():
     """Unit test for class `MutableMultiFileIterator`"""
     import shutil
@@ -1386,3 +1604,4 @@ def parse_args():
 
 if __name__ == '__main__':
     test_parse_pipeline_config(**parse_args())
+    test_pipeline_config_cache()
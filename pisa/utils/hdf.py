@@ -42,7 +42,7 @@ HDF5_EXTS = ['hdf', 'h5', 'hdf5']
 # TODO: convert to allow reading of icetray-produced HDF5 files
 
 
-def from_hdf(val, return_node=None, choose=None):
+def from_hdf(val, return_node=None, choose=None, select=None, chunk_size=None):
     """Return the contents of an HDF5 file or node as a nested dict; optionally
     return a second dict containing any HDF5 attributes attached to the
     entry-level HDF5 entity.
@@ -62,6 +62,21 @@ def from_hdf(val, return_node=None, choose=None):
         Optionally can provide a list of variables names to parse (items not in 
         this list will be skipped, saving time & memory)
 
+    select : None or callable
+        Optionally select rows of the datasets in each group while reading
+        (rows not selected are never held in memory as a whole). The (chosen)
+        datasets of a group sharing the length of its first dataset are read
+        in chunks of rows, and for each chunk
+        `select(path, rows, num_rows, chunk)` is called with the group's path,
+        the `slice` of rows read, the group's total number of rows and an
+        OrderedDict of the chunk's arrays. It must return a boolean mask of
+        the rows to keep, or None to keep all of them. Other datasets are read
+        in full.
+
+    chunk_size : None or int
+        Number of rows read at a time if `select` is specified; if None, each
+        group is read in one go.
+
     Returns
     -------
     data : OrderedDict with additional attr of type OrderedDict named `attrs`
@@ -74,6 +89,49 @@ def from_hdf(val, return_node=None, choose=None):
     if return_node is not None:
         raise NotImplementedError('`return_node` is not yet implemented.')
 
+    if chunk_size is not None:
+        assert chunk_size > 0, '`chunk_size` must be positive'
+
+    def select_rows(group, choose=None):
+        """Read the row-aligned datasets of `group` in chunks, keeping only
+        the rows that pass `select`"""
+        dsets = OrderedDict()
+        for sobj in group.values():
+            name = sobj.name.split('/')[-1]
+            if not isinstance(sobj, h5py.Dataset) or sobj.ndim == 0:
+                continue
+            if (choose is None) or (name in choose):
+                dsets[name] = sobj
+        if not dsets:
+            return OrderedDict()
+
+        num_rows = next(iter(dsets.values())).shape[0]
+        dsets = OrderedDict(
+            (name, dset) for name, dset in dsets.items()
+            if dset.shape[0] == num_rows
+        )
+        step = num_rows if chunk_size is None else chunk_size
+
+        kept = OrderedDict((name, []) for name in dsets)
+        for start in range(0, num_rows, max(step, 1)):
+            rows = slice(start, min(start + step, num_rows))
+            chunk = OrderedDict(
+                (name, dset[rows]) for name, dset in dsets.items()
+            )
+            mask = select(group.name, rows, num_rows, chunk)
+            for name, array in chunk.items():
+                kept[name].append(array if mask is None else array[mask])
+
+        rows_data = OrderedDict()
+        for name, arrays in kept.items():
+            if not arrays:
+                rows_data[name] = dsets[name][()]
+            elif len(arrays) == 1:
+                rows_data[name] = arrays[0]
+            else:
+                rows_data[name] = np.concatenate(arrays)
+        return rows_data
+
     def visit_group(obj, sdict, choose=None):
         """Iteratively parse `obj` to create the dictionary `sdict`"""
         name = obj.name.split('/')[-1]
@@ -83,8 +141,15 @@ def from_hdf(val, return_node=None, choose=None):
                 sdict[name] = obj[()]
         if isinstance(obj, (h5py.Group, h5py.File)):
             sdict[name] = OrderedDict()
+            rows_data = OrderedDict()
+            if select is not None:
+                rows_data = select_rows(obj, choose)
             for sobj in obj.values():
-                visit_group(sobj, sdict[name], choose)
+                sname = sobj.name.split('/')[-1]
+                if sname in rows_data:
+                    sdict[name][sname] = rows_data[sname]
+                else:
+                    visit_group(sobj, sdict[name], choose)
 
     myfile = False
     if isinstance(val, str):
@@ -105,8 +170,15 @@ def from_hdf(val, return_node=None, choose=None):
         if hasattr(root, 'attrs'):
             attrs = OrderedDict(root.attrs)
         # Run over the whole dataset
+        rows_data = OrderedDict()
+        if select is not None:
+            rows_data = select_rows(root, choose)
         for obj in root.values():
-            visit_group(obj, data, choose)
+            name = obj.name.split('/')[-1]
+            if name in rows_data:
+                data[name] = rows_data[name]
+            else:
+                visit_group(obj, data, choose)
     finally:
         if myfile:
             root.close()
@@ -420,6 +492,20 @@ def test_hdf():
             assert tgt_type_checker(val), \
                     "key '%s': val '%s' is type '%s'" % \
                     (key, val, type(loaded_attrs[key]))
+
+        # Select rows while reading in chunks
+        def select(path, rows, num_rows, chunk):
+            assert num_rows in (1000, 10000) and rows.stop - rows.start <= 333
+            if path != '/top/secondlvl6':
+                return None
+            return chunk['thirdlvl61'] > 500
+        loaded_data3 = from_hdf(fpath, select=select, chunk_size=333)
+        sel = data['top']['secondlvl6']['thirdlvl61'] > 500
+        assert np.array_equal(loaded_data3['top']['secondlvl6']['thirdlvl61'],
+                              data['top']['secondlvl6']['thirdlvl61'][sel])
+        assert loaded_data3['top']['secondlvl6']['thirdlvl62'] == b"this is a string"
+        assert recursiveEquality(data['top']['secondlvl5'],
+                                 loaded_data3['top']['secondlvl5'])
     finally:
         rmtree(temp_dir)
 
@@ -8,8 +8,9 @@ simulation datasets, for example for detedctor uncertainties.
 
 __all__ = ['HypersurfaceInterpolator', 'Hypersurface', 'HypersurfaceParam',
            'fit_hypersurfaces', 'load_hypersurfaces', 'load_interpolated_hypersurfaces',
-           'extract_interpolated_hypersurface_params', 'plot_bin_fits',
-           'plot_bin_fits_2d']
+           'extract_interpolated_hypersurface_params', 'save_hypersurfaces_binary',
+           'load_hypersurfaces_binary', 'convert_hypersurfaces_to_binary',
+           'get_binary_hypersurfaces_path', 'plot_bin_fits', 'plot_bin_fits_2d']
 
 __author__ = 'T. Stuttard, A. Trettin'
 
@@ -30,20 +31,23 @@ __license__ = '''Copyright (c) 2014-2017, The IceCube Collaboration
 
 import os
 import collections
+from concurrent.futures import ProcessPoolExecutor
 import copy
 
 import numpy as np
+from numba import prange
 from scipy import interpolate
 from iminuit import Minuit
 from iminuit.iminuit_warnings import HesseFailedWarning
 
-from pisa import FTYPE, ureg
+from pisa import FTYPE, OMP_NUM_THREADS, TARGET, numba_jit, ureg
 from pisa.utils import matrix
 from pisa.utils.jsons import from_json, to_json
 from pisa.core.pipeline import Pipeline
 from pisa.core.binning import OneDimBinning, MultiDimBinning, is_binning
 from pisa.core.map import Map
 from pisa.utils.fileio import mkdir
+from pisa.utils.resources import find_resource
 from pisa.utils.log import logging, set_verbosity
 from pisa.utils.comparisons import ALLCLOSE_KW
 from uncertainties import ufloat, correlated_values
@@ -71,6 +75,13 @@ Hypersurface functional forms
        - Params are then: `p` is scalar (current value of systematic parameter,
          coefficients and `out` are arrays representing the hypersurfaces of all bins
          per bin.
+
+   In addition, each functional form provides its coefficient names, its value and
+   the gradient w.r.t. each coefficient as expressions of scalars (`p` and the
+   coefficient names) via the class attributes `coeff_names`, `expr` and
+   `grad_exprs`. These are used to build the compiled kernel evaluating a full
+   hypersurface (see `get_evaluation_kernel`) and must be kept consistent with
+   `__call__` and `grad`.
 '''
 
 
@@ -80,6 +91,9 @@ class linear_hypersurface_func(object):
 
     f(p) = m * p
     '''
+    coeff_names = ('m',)
+    expr = 'm * p'
+    grad_exprs = ('p',)
 
     def __init__(self):
         self.nargs = 1
@@ -102,6 +116,9 @@ class quadratic_hypersurface_func(object):
 
     f(p) = m1*p + m2*p**2
     '''
+    coeff_names = ('m1', 'm2')
+    expr = 'm1*p + m2*p**2'
+    grad_exprs = ('p', 'p**2')
 
     def __init__(self):
         self.nargs = 2
@@ -130,6 +147,9 @@ class exponential_hypersurface_func(object):
 
     The functional form ensures that it is zero at the nominal point.
     '''
+    coeff_names = ('b',)
+    expr = 'np.exp(b*p) - 1.'
+    grad_exprs = ('p*np.exp(b*p)',)
 
     def __init__(self):
         self.nargs = 1
@@ -154,6 +174,9 @@ class scaled_exponential_hypersurface_func(object):
     If a strong prior is imposed on a, it becomes equivalent to the un-scaled
     exponential hypersurface function.
     '''
+    coeff_names = ('a', 'b')
+    expr = '(a + 1.) * (np.exp(b*p) - 1.)'
+    grad_exprs = ('np.exp(b*p) - 1.', '(a + 1.)*p*np.exp(b*p)')
 
     def __init__(self):
         self.nargs = 2
@@ -178,6 +201,9 @@ class logarithmic_hypersurface_func(object):
     function while in logmode, since:
     exp(log(1 + mp) + h) = (1 + mp) exp(h)
     '''
+    coeff_names = ('m',)
+    expr = 'np.log(1. + m*p)'
+    grad_exprs = ('p/(1. + m*p)',)
 
     def __init__(self):
         self.nargs = 1
@@ -201,6 +227,92 @@ HYPERSURFACE_PARAM_FUNCTIONS["exponential"] = exponential_hypersurface_func
 HYPERSURFACE_PARAM_FUNCTIONS["exponential_scaled"] = scaled_exponential_hypersurface_func
 HYPERSURFACE_PARAM_FUNCTIONS["logarithmic"] = logarithmic_hypersurface_func
 
+# Functional forms that are linear in their coefficients, for which the fit has a
+# closed-form solution
+LINEAR_HYPERSURFACE_FUNCTIONS = ("linear", "quadratic")
+
+# Compiled evaluation kernels, keyed by the functional forms of the params, log mode
+# and whether the uncertainty is computed
+_EVALUATION_KERNELS = {}
+
+
+def get_evaluation_kernel(func_names, log, uncertainty):
+    '''
+    Get a compiled kernel evaluating a hypersurface in all bins in a single pass.
+
+    The kernel is generated from the expressions of the functional forms, such that
+    values and gradients (if `uncertainty`) are computed per bin without any
+    temporary arrays. Kernels are compiled once per combination of arguments.
+
+    Parameters
+    ----------
+    func_names : sequence of str
+        Names of the functional forms of the hypersurface params, in order
+
+    log : bool
+        Whether the hypersurface is in log mode
+
+    uncertainty : bool
+        Whether to also compute the uncertainty on the output
+
+    Returns
+    -------
+    kernel : callable
+        Signature is `kernel(p_0, ..., p_N, intercept, coeffts_0, ..., coeffts_N,
+        [cov_mat,] out[, out_sigma])` where `p_i` is the (scalar) value of param `i`
+        relative to the nominal, `intercept` has shape (n_bins,), `coeffts_i` has
+        shape (n_bins, n_coeffts_i), `cov_mat` has shape (n_bins, n_coeffts,
+        n_coeffts) and `out` and `out_sigma` have shape (n_bins,). The arguments
+        `cov_mat` and `out_sigma` are only present when computing the uncertainty.
+        Returns the number of bins with a negative variance.
+    '''
+    key = (tuple(func_names), bool(log), bool(uncertainty))
+    if key in _EVALUATION_KERNELS:
+        return _EVALUATION_KERNELS[key]
+
+    funcs = [HYPERSURFACE_PARAM_FUNCTIONS[name] for name in func_names]
+    n_params = len(funcs)
+    args = ["p_%d" % i for i in range(n_params)]
+    args += ["intercept"] + ["coeffts_%d" % i for i in range(n_params)]
+    args += ["cov_mat", "out", "out_sigma"] if uncertainty else ["out"]
+    lines = ["def kernel(%s):" % ", ".join(args)]
+    lines.append("    n_invalid = 0")
+    lines.append("    for i in prange(out.size):")
+    lines.append("        val = intercept[i]")
+    # gradient w.r.t. the intercept is always 1
+    grads = ["1."]
+    for i_param, func in enumerate(funcs):
+        lines.append("        p = p_%d" % i_param)
+        for i_cft, cft_name in enumerate(func.coeff_names):
+            lines.append("        %s = coeffts_%d[i, %d]" % (cft_name, i_param, i_cft))
+        lines.append("        val += %s" % func.expr)
+        if uncertainty:
+            for grad_expr in func.grad_exprs:
+                lines.append("        g_%d = %s" % (len(grads), grad_expr))
+                grads.append("g_%d" % len(grads))
+    lines.append("        scale = np.exp(val)" if log else "        scale = val")
+    lines.append("        out[i] = scale")
+    if uncertainty:
+        lines.append("        var = 0.")
+        for j, g_j in enumerate(grads):
+            for k, g_k in enumerate(grads):
+                lines.append("        var += %s * cov_mat[i, %d, %d] * %s" % (g_j, j, k, g_k))
+        # In log mode, the output is exponentiated. For the gradient this simply
+        # means multiplying with the output itself.
+        if log:
+            lines.append("        var *= scale * scale")
+        lines.append("        if var < 0.:")
+        lines.append("            n_invalid += 1")
+        lines.append("        out_sigma[i] = np.sqrt(var)")
+    lines.append("    return n_invalid")
+
+    namespace = {"np": np, "prange": prange}
+    exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+    kernel = numba_jit(nopython=True, nogil=True, parallel=TARGET == "parallel")(
+        namespace["kernel"])
+    _EVALUATION_KERNELS[key] = kernel
+    return kernel
+
 
 class HypersurfaceInterpolator(object):
     """Factory for interpolated hypersurfaces.
@@ -240,6 +352,10 @@ class HypersurfaceInterpolator(object):
         or ``interpolate.interp2d`` depending on dimensionality.
         Default is 'linear'. Note that kinds supported by ``interp1d`` differ
         from those supported by ``interp2d``.
+    cache_size : int, optional
+        Number of most recently requested points in parameter space for which the
+        interpolated coefficients and covariance matrices are kept in memory.
+        Default is 10, set to 0 to disable caching.
 
     Notes
     -----
@@ -256,7 +372,7 @@ class HypersurfaceInterpolator(object):
         class used for interpolation with two parameters
     """
 
-    def __init__(self, interp_params, hs_fits, kind='linear'):
+    def __init__(self, interp_params, hs_fits, kind='linear', cache_size=10):
         self.ndim = len(interp_params)
         assert self.ndim in [
             1, 2], "can only work in either one or two dimensions"
@@ -280,14 +396,6 @@ class HypersurfaceInterpolator(object):
         for param in self._reference_state['params'].values():
             param['fit_coeffts_sigma'] = np.full_like(
                 param['fit_coeffts_sigma'], np.nan)
-        # Instead of holding numbers, these coefficients and covariance
-        # matrices are going to hold spline objects that can be called to interpolate
-        # at the requested point.
-        # The shape of fit_coeffts is [binning ..., fit coeffts]
-        self.coefficients = np.empty(
-            reference_hs.fit_coeffts.shape, dtype=object)
-        # The shape of fit_cov_mat is [binning ..., fit coeffts, fit coeffts]
-        self.covars = np.empty(reference_hs.fit_cov_mat.shape, dtype=object)
         names = [p['name'] for p in self.interp_params]
         units = [p['unit'] for p in self.interp_params]
         # We store the original points that went into the interpolation.
@@ -302,49 +410,116 @@ class HypersurfaceInterpolator(object):
             if self.ndim == 2:
                 self._y.append(f['param_values'][names[1]].m_as(units[1]))
         # dimension is [binning..., fit coeffts, number of fits]
-        self._coeff_z = np.zeros(self.coefficients.shape + (len(hs_fits),))
-        for idx in np.ndindex(self.coefficients.shape):
-            for i, f in enumerate(hs_fits):
-                self._coeff_z[idx][i] = f['hypersurface'].fit_coeffts[idx]
-            if self.ndim == 1:
-                # TODO: Use numpy if kind is 'linear'
-                self.coefficients[idx] = interpolate.interp1d(self._x, self._coeff_z[idx],
-                                                              copy=False,
-                                                              fill_value='extrapolate',
-                                                              kind=kind,
-                                                              )
-            elif self.ndim == 2:
+        self._coeff_z = np.stack(
+            [f['hypersurface'].fit_coeffts for f in hs_fits], axis=-1)
+        # dimension is [binning..., fit coeffts, fit coeffts, number of fits]
+        self._covar_z = np.stack(
+            [f['hypersurface'].fit_cov_mat for f in hs_fits], axis=-1)
+        # Instead of holding numbers, these coefficients and covariance
+        # matrices are going to hold spline objects that can be called to interpolate
+        # at the requested point.
+        if self.ndim == 1:
+            # In 1D, all coefficients and covariance matrix elements are
+            # interpolated along the last axis by a single spline object each, such
+            # that one call returns the values for all bins at once.
+            self.coefficients = interpolate.interp1d(self._x, self._coeff_z,
+                                                     axis=-1,
+                                                     copy=False,
+                                                     fill_value='extrapolate',
+                                                     kind=kind,
+                                                     )
+            self.covars = interpolate.interp1d(self._x, self._covar_z,
+                                               axis=-1,
+                                               copy=False,
+                                               fill_value='extrapolate',
+                                               kind=kind,
+                                               )
+        elif self.ndim == 2:
+            # `interp2d` cannot interpolate vector valued data, so we keep one
+            # spline per element. The shape of the arrays holding the splines is
+            # [binning ..., fit coeffts] and [binning ..., fit coeffts, fit coeffts].
+            self.coefficients = np.empty(self._coeff_z.shape[:-1], dtype=object)
+            for idx in np.ndindex(self.coefficients.shape):
                 self.coefficients[idx] = interpolate.interp2d(self._x, self._y,
                                                               self._coeff_z[idx],
                                                               copy=False,
                                                               kind=kind
                                                               )
-        # dimension is [binning..., fit coeffts, fit coeffts, number of fits]
-        self._covar_z = np.zeros(self.covars.shape + (len(hs_fits),))
-        for idx in np.ndindex(self.covars.shape):
-            for i, f in enumerate(hs_fits):
-                self._covar_z[idx][i] = f['hypersurface'].fit_cov_mat[idx]
-            if self.ndim == 1:
-                self.covars[idx] = interpolate.interp1d(self._x, self._covar_z[idx],
-                                                        copy=False,
-                                                        fill_value='extrapolate',
-                                                        kind=kind,
-                                                        )
-            elif self.ndim == 2:
+            self.covars = np.empty(self._covar_z.shape[:-1], dtype=object)
+            for idx in np.ndindex(self.covars.shape):
                 self.covars[idx] = interpolate.interp2d(self._x, self._y,
                                                         self._covar_z[idx],
                                                         copy=False,
                                                         kind=kind,
                                                         )
+        # The hypersurface handed out by `get_hypersurface` is created only once
+        # and then updated in place with the interpolated coefficients and
+        # covariance matrices.
+        self._hypersurface = Hypersurface.from_state(
+            copy.deepcopy(self._reference_state))
+        # Interpolated (and PSD corrected) results for the most recently
+        # requested points in parameter space, such that the minimizer returning
+        # to a point it has already visited does not trigger the interpolation
+        # again.
+        assert cache_size >= 0, "cache size must not be negative"
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
         # In order not to spam warnings, we only want to warn about non positive
         # semi definite covariance matrices once for each bin. We store the bin
         # indeces for which the warning has already been issued.
         self.covar_bins_warning_issued = []
 
+    def _interpolate(self, x):
+        """Evaluate all coefficient and covariance splines at the point `x`.
+
+        Returns arrays of shape [binning ..., fit coeffts] and
+        [binning ..., fit coeffts, fit coeffts].
+        """
+        if self.ndim == 1:
+            return self.coefficients(x[0]), self.covars(x[0])
+        coeffts = np.empty(self.coefficients.shape)
+        for idx in np.ndindex(self.coefficients.shape):
+            coeffts[idx] = self.coefficients[idx](*x)
+        covars = np.empty(self.covars.shape)
+        for idx in np.ndindex(self.covars.shape):
+            covars[idx] = self.covars[idx](*x)
+        return coeffts, covars
+
+    def _fix_covars(self, covars):
+        """Ensure that all covariance matrices are positive semi-definite.
+
+        Non-PSD matrices are replaced (in place) by the closest PSD matrix.
+        """
+        try:
+            # fast path: a single (batched) Cholesky decomposition succeeds if
+            # every matrix is positive definite
+            np.linalg.cholesky(covars)
+            return
+        except np.linalg.LinAlgError:
+            pass
+        # Only matrices with (numerically) non-positive eigenvalues can fail the
+        # Cholesky decomposition, so run the exact per-matrix test only on those.
+        eigvals = np.linalg.eigvalsh(covars)
+        tol = covars.shape[-1] * 100. * np.finfo(covars.dtype).eps * \
+            np.max(np.abs(eigvals), axis=-1)
+        candidates = np.argwhere(np.min(eigvals, axis=-1) <= tol)
+        for bin_idx in map(tuple, candidates):
+            m = covars[bin_idx]
+            if not matrix.is_psd(m):
+                covars[bin_idx] = matrix.fronebius_nearest_psd(m)
+                if not bin_idx in self.covar_bins_warning_issued:
+                    logging.warn(
+                        f'Invalid covariance matrix fixed in bin: {bin_idx}')
+                    self.covar_bins_warning_issued.append(bin_idx)
+
     def get_hypersurface(self, **param_kw):
         """
         Get a Hypersurface object with interpolated coefficients.
 
+        Note that the same Hypersurface object is returned on every call, only its
+        coefficients and covariance matrices are updated in place. Make a copy if
+        the hypersurface at a previous point has to be retained.
+
         Parameters
         ----------
         **param_kw
@@ -357,35 +532,39 @@ class HypersurfaceInterpolator(object):
             [i['name'] for i in self.interp_params]), "invalid parameters"
         names = [p['name'] for p in self.interp_params]
         units = [p['unit'] for p in self.interp_params]
-        x = [param_kw[n].m_as(u) for n, u in zip(names, units)]
-        state = copy.deepcopy(self._reference_state)
+        x = tuple(float(param_kw[n].m_as(u)) for n, u in zip(names, units))
+        if x in self._cache:
+            self._cache.move_to_end(x)
+            coeffts, covars = self._cache[x]
+        else:
+            coeffts, covars = self._interpolate(x)
+            if not np.all(np.isfinite(covars)):
+                idx = tuple(np.argwhere(~np.isfinite(covars))[0])
+                raise AssertionError(
+                    f"invalid cov matrix element encountered at {param_kw} in loc {idx}")
+            if not np.all(np.isfinite(coeffts)):
+                idx = tuple(np.argwhere(~np.isfinite(coeffts))[0])
+                raise AssertionError(
+                    f"invalid coeff encountered at {param_kw} in loc {idx}")
+            # check covariance matrices for symmetry, positive semi-definiteness
+            sym = np.all(np.isclose(covars, np.swapaxes(covars, -1, -2),
+                                    rtol=ALLCLOSE_KW['rtol']*10.), axis=(-2, -1))
+            if not np.all(sym):
+                bin_idx = tuple(np.argwhere(~sym)[0])
+                raise AssertionError(f'cov matrix not symmetric in bin {bin_idx}')
+            self._fix_covars(covars)
+            if self.cache_size > 0:
+                self._cache[x] = (coeffts, covars)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        hypersurface = self._hypersurface
         # fit covariance matrices are stored directly
-        for idx in np.ndindex(state['fit_cov_mat'].shape):
-            state['fit_cov_mat'][idx] = self.covars[idx](
-                *x)  # calls the spline
-            assert np.isfinite(
-                state['fit_cov_mat'][idx]), f"invalid cov matrix element encountered at {param_kw} in loc {idx}"
-        # check covariance matrices for symmetry, positive semi-definiteness
-        for bin_idx in np.ndindex(state['fit_cov_mat'].shape[:-2]):
-            m = state['fit_cov_mat'][bin_idx]
-            assert np.allclose(
-                m, m.T, rtol=ALLCLOSE_KW['rtol']*10.), f'cov matrix not symmetric in bin {bin_idx}'
-            if not matrix.is_psd(m):
-                state['fit_cov_mat'][bin_idx] = matrix.fronebius_nearest_psd(m)
-                if not bin_idx in self.covar_bins_warning_issued:
-                    logging.warn(
-                        f'Invalid covariance matrix fixed in bin: {bin_idx}')
-                    self.covar_bins_warning_issued.append(bin_idx)
-        hypersurface = Hypersurface.from_state(state)
-        coeffts = np.zeros(self.coefficients.shape)
-        for idx in np.ndindex(self.coefficients.shape):
-            coeffts[idx] = self.coefficients[idx](
-                *x)  # calls spline interpolation
-            assert np.isfinite(
-                coeffts[idx]), f"invalid coeff encountered at {param_kw} in loc {idx}"
+        hypersurface.fit_cov_mat = covars
         # the setter method defined in the Hypersurface class takes care of
         # putting the coefficients in the right place in their respective parameters
         hypersurface.fit_coeffts = coeffts
+        # any state serialized before is outdated now
+        hypersurface._serializable_state = None
         return hypersurface
 
     def make_slices(self, x_plot, name):
@@ -412,8 +591,8 @@ class HypersurfaceInterpolator(object):
             Size: (binning..., number of coeffs, number of coeffs, len(`x_plot`))
         """
         assert self.ndim == 1, "making slices is only supported for 1D at the moment"
-        coeff_slices = np.zeros(self.coefficients.shape+(len(x_plot),))
-        covar_slices = np.zeros(self.covars.shape+(len(x_plot),))
+        coeff_slices = np.zeros(self._coeff_z.shape[:-1]+(len(x_plot),))
+        covar_slices = np.zeros(self._covar_z.shape[:-1]+(len(x_plot),))
         for i, x in enumerate(x_plot):
             pars = {name: x}
             hs = self.get_hypersurface(**pars)
@@ -440,7 +619,7 @@ class HypersurfaceInterpolator(object):
         assert self.ndim == 1, "plotting currently only supported in 1D"
         # TODO Support 2D plotting
         import matplotlib.pyplot as plt
-        n_coeff = self.coefficients.shape[-1]
+        n_coeff = self._coeff_z.shape[-2]
         hs_param_names = list(self._reference_state['params'].keys())
         hs_param_labels = ["intercept"] + [f"{p} p{i}" for p in hs_param_names
                                            for i in range(self._reference_state['params'][p]['num_fit_coeffts'])]
@@ -454,10 +633,12 @@ class HypersurfaceInterpolator(object):
         unit = self.interp_params[0]['unit']
         x_plot = np.linspace(np.min(self._x), np.max(self._x), n_steps)
         coeff_slices, covar_slices = self.make_slices(x_plot*ureg[unit], name)
+        coeff_splines = self.coefficients(x_plot)
+        covar_splines = self.covars(x_plot)
 
         # first row plots fit coefficients
         for i in range(n_coeff):
-            z_plot = self.coefficients[bin_idx][i](x_plot)
+            z_plot = coeff_splines[bin_idx][i]
             ax[i, 0].plot(x_plot, z_plot, label='spline')
             z_slice = coeff_slices[bin_idx][i]
             # since there are no corrections on the fitted coefficients, there
@@ -473,7 +654,7 @@ class HypersurfaceInterpolator(object):
             # that it is positive semi definite. These plots should show the difference.
             for j in range(0, n_coeff):
                 coeff_idx = (i, j)
-                z_plot = self.covars[bin_idx][coeff_idx](x_plot)
+                z_plot = covar_splines[bin_idx][coeff_idx]
                 ax[i, j+1].plot(x_plot, z_plot, label='spline')
                 ax[i, j+1].scatter(self._x, self._covar_z[bin_idx][coeff_idx],
                                    color='k', marker='x', label='truth')
@@ -636,7 +817,8 @@ class Hypersurface(object):
         '''
         return list(self.params.keys())
 
-    def evaluate(self, param_values, bin_idx=None, return_uncertainty=False):
+    def evaluate(self, param_values, bin_idx=None, return_uncertainty=False,
+                 out=None, out_uncertainty=None):
         '''
         Evaluate the hypersurface, using the systematic parameter values provided.
         Uses the current internal values for all functional form coefficients.
@@ -656,6 +838,11 @@ class Hypersurface(object):
 
         return_uncertainty : bool, optional
             return the uncertainty on the output (default: False)
+
+        out, out_uncertainty : array, optional
+            C-contiguous arrays with one element per bin to write the output (and its
+            uncertainty) to instead of allocating new ones. Only supported when
+            evaluating all bins.
         '''
 
         assert self._initialized, "Cannot evaluate hypersurface, it haas not been initialized"
@@ -690,12 +877,14 @@ class Hypersurface(object):
             for v in list(param_values.values()):
                 assert np.isscalar(
                     v), "sys param values must be a scalar when evaluating all bins simultaneously"
-            out_shape = self.binning.shape
-            bin_idx = Ellipsis
+            # This is done in a single pass by a compiled kernel
+            return self._evaluate_all_bins(param_values, return_uncertainty,
+                                           out, out_uncertainty)
 
         else:
             # Case 2 : Calculating for multiple sys param values, but only a single bin
             #          Use case is fitting the hypersurfaces fucntional form fit params
+            assert out is None and out_uncertainty is None, "Cannot write to output arrays when evaluating a single bin"
             out_shape = (num_param_values,)
 
         # Create the output array
@@ -707,10 +896,7 @@ class Hypersurface(object):
 
         # Start with the intercept
         for i in range(num_param_values):
-            if single_bin_mode:
-                out[i] = self.intercept[bin_idx]
-            else:
-                np.copyto(src=self.intercept[bin_idx], dst=out[bin_idx])
+            out[i] = self.intercept[bin_idx]
 
         # Evaluate each individual parameter
         for k, p in list(self.params.items()):
@@ -757,9 +943,48 @@ class Hypersurface(object):
         else:
             return output_factors
 
+    def _evaluate_all_bins(self, param_values, return_uncertainty, out, out_uncertainty):
+        '''
+        Evaluate the hypersurface in all bins with the compiled kernel for the
+        functional forms of this hypersurface.
+
+        Internal function, not to be called by a user.
+        '''
+        params = list(self.params.values())
+        kernel = get_evaluation_kernel(
+            [param.func_name for param in params], self.log, return_uncertainty)
+
+        n_bins = self.intercept.size
+        if out is None:
+            out = np.empty(self.binning.shape, dtype=FTYPE)
+        assert out.size == n_bins and out.flags.c_contiguous, "invalid output array"
+        args = [param_values[param.name] if self.using_legacy_data
+                else param_values[param.name] - param.nominal_value for param in params]
+        args.append(self.intercept.reshape(n_bins))
+        args.extend([param.fit_coeffts.reshape(n_bins, param.num_fit_coeffts)
+                     for param in params])
+
+        if return_uncertainty:
+            assert self.fit_cov_mat is not None, "No covariance matrix available"
+            if out_uncertainty is None:
+                out_uncertainty = np.empty(self.binning.shape, dtype=FTYPE)
+            assert out_uncertainty.size == n_bins and out_uncertainty.flags.c_contiguous, "invalid output array"
+            args.append(self.fit_cov_mat.reshape(
+                n_bins, self.num_fit_coeffts, self.num_fit_coeffts))
+            args.extend([out.reshape(n_bins), out_uncertainty.reshape(n_bins)])
+        else:
+            args.append(out.reshape(n_bins))
+
+        n_invalid = kernel(*args)
+        assert n_invalid == 0, "invalid covariance"
+
+        if return_uncertainty:
+            return out, out_uncertainty
+        return out
+
     def fit(self, nominal_map, nominal_param_values, sys_maps, sys_param_values,
             norm=True, method="L-BFGS-B", fix_intercept=False, intercept_bounds=None,
-            intercept_sigma=None, include_empty=False):
+            intercept_sigma=None, include_empty=False, num_parallel=1):
         '''
         Fit the hypersurface coefficients (in every bin) to best match the provided
         nominal and systematic datasets.
@@ -802,6 +1027,17 @@ class Hypersurface(object):
             Include empty bins in the fit. If True, empty bins are included with value 0
             and sigma 1.
             Default: False
+
+        num_parallel : int or None
+            Number of processes across which the bins are distributed for fitting. If
+            None, `pisa.OMP_NUM_THREADS` is used. Default: 1
+
+        Notes
+        -----
+        If all functional forms are linear in their coefficients (see
+        `LINEAR_HYPERSURFACE_FUNCTIONS`), the coefficients are unbounded and neither
+        log mode nor a fixed intercept are used, the fit is solved in closed form as a
+        weighted least squares problem for all bins at once.
         '''
 
         #
@@ -906,211 +1142,70 @@ class Hypersurface(object):
                           >= 0.), "Found negative bin counts"
 
         #
-        # Loop over bins
+        # Stack the maps
         #
 
-        for bin_idx in np.ndindex(self.binning.shape):  # TODO grab from input map
-
-            #
-            # Format this bin's data for fitting
-            #
-
-            # Format the fit `y` values : [ bin value 0, bin_value 1, ... ]
-            # Also get the corresonding uncertainty
-            y = np.asarray([m.nominal_values[bin_idx]
-                            for m in self.fit_maps], dtype=FTYPE)
-            y_sigma = np.asarray([m.std_devs[bin_idx]
-                                  for m in self.fit_maps], dtype=FTYPE)
-
-            # Create a mask for keeping all these points
-            # May remove some points before fitting if find issues
-            scan_point_mask = np.ones(y.shape, dtype=bool)
-
-            # Cases where we have a y_sigma element = 0 (normally because the
-            # corresponding y element = 0) screw up the fits (least squares divides by
-            # sigma, so get infs) By default, we ignore empty bins. If the user wishes
-            # to include them, it can be done with a value of zero and standard
-            # deviation of 1.
-            bad_sigma_mask = y_sigma == 0.
-            if bad_sigma_mask.sum() > 0:
-                if include_empty:
-                    y_sigma[bad_sigma_mask] = 1.
-                else:
-                    scan_point_mask = scan_point_mask & ~bad_sigma_mask
-
-            # Apply the mask to get the values I will actually use
-            x_to_use = np.array([xx[scan_point_mask] for xx in x])
-            y_to_use = y[scan_point_mask]
-            y_sigma_to_use = y_sigma[scan_point_mask]
-
-            # Checks
-            assert x_to_use.shape[0] == len(self.params)
-            assert x_to_use.shape[1] == y_to_use.size
-
-            # Get flat list of the fit param guesses
-            # The param coefficients are ordered as [ param 0 cft 0, ..., param 0 cft N,
-            # ..., param M cft 0, ..., param M cft N ]
-            p0_intercept = self.intercept[bin_idx]
-            p0_param_coeffts = [param.get_fit_coefft(bin_idx=bin_idx, coefft_idx=i_cft)
-                                for param in list(self.params.values())
-                                for i_cft in range(param.num_fit_coeffts)]
-            if fix_intercept:
-                p0 = np.array(p0_param_coeffts, dtype=FTYPE)
-            else:
-                p0 = np.array([p0_intercept] + p0_param_coeffts, dtype=FTYPE)
-
-            #
-            # Check if have valid data in this bin
-            #
+        # Bin values and their uncertainties for all datasets, with shape
+        # (num datasets, num bins), extracted once rather than per bin
+        bin_indices = list(np.ndindex(self.binning.shape))  # TODO grab from input map
+        y_all = np.stack([m.nominal_values.ravel()
+                          for m in self.fit_maps]).astype(FTYPE)
+        y_sigma_all = np.stack([m.std_devs.ravel()
+                                for m in self.fit_maps]).astype(FTYPE)
 
-            # If have empty bins, cannot fit In particular, if the nominal map has an
-            # empty bin, it cannot be rescaled (x * 0 = 0) If this case, no need to try
-            # fitting
+        fit_kw = dict(fix_intercept=fix_intercept, intercept_bounds=intercept_bounds,
+                      intercept_sigma=intercept_sigma, include_empty=include_empty)
 
-            # Check if have NaNs/Infs
-            if np.any(~np.isfinite(y_to_use)):  # TODO also handle missing sigma
-
-                # Not fitting, add empty variables
-                popt = np.full_like(p0, np.NaN)
-                pcov = np.NaN
+        #
+        # Fit
+        #
 
-            # Otherwise, fit...
-            else:
+        results = [None] * len(bin_indices)
+
+        # Linear-in-coefficient functional forms have a closed-form solution,
+        # which is found for all bins at once
+        if self._supports_linear_least_squares(**fit_kw):
+            popts, pcovs, solved = self._fit_linear_least_squares(
+                x, y_all, y_sigma_all, **fit_kw)
+            for i_bin in np.flatnonzero(solved):
+                results[i_bin] = (popts[i_bin], pcovs[i_bin])
+
+        # All other bins are fitted numerically, bin by bin
+        to_fit = [i_bin for i_bin, res in enumerate(results) if res is None]
+        if num_parallel is None:
+            num_parallel = OMP_NUM_THREADS
+        if num_parallel > 1 and len(to_fit) > 1:
+            # Distribute the bins across a pool of processes. Each process gets a
+            # copy of this hypersurface without the (potentially large) fit maps.
+            worker_hypersurface = copy.copy(self)
+            worker_hypersurface.fit_maps_raw = None
+            worker_hypersurface.fit_maps_norm = None
+            worker_hypersurface.fit_cov_mat = None
+            worker_hypersurface._serializable_state = None
+            chunks = np.array_split(to_fit, min(len(to_fit), 4 * num_parallel))
+            with ProcessPoolExecutor(max_workers=num_parallel) as executor:
+                futures = [
+                    executor.submit(
+                        _fit_hypersurface_bins, worker_hypersurface,
+                        [bin_indices[i_bin] for i_bin in chunk], x,
+                        y_all[:, chunk], y_sigma_all[:, chunk], fit_kw
+                    )
+                    for chunk in chunks
+                ]
+                for chunk, future in zip(chunks, futures):
+                    for i_bin, res in zip(chunk, future.result()):
+                        results[i_bin] = res
+        else:
+            for i_bin in to_fit:
+                results[i_bin] = self._fit_bin(
+                    bin_indices[i_bin], x, y_all[:, i_bin], y_sigma_all[:, i_bin],
+                    **fit_kw)
 
-                #
-                # Fit
-                #
+        #
+        # Store results
+        #
 
-                # Must have at least as many sets as free params in fit or else curve_fit will fail
-                assert y.size >= p0.size, "Number of datasets used for fitting (%i) must be >= num free params (%i)" % (
-                    y.size, p0.size)
-
-                # Define a callback function for use with `curve_fit`
-                #   x : sys params
-                #   p : func/shape params
-                def callback(x, *p):
-
-                    # Note that this is using the dynamic variable `bin_idx`, which
-                    # cannot be passed as an arg as `curve_fit` cannot handle fixed
-                    # parameters.
-                    #
-                    # Unflatten list of the func/shape params, and write them to the
-                    # hypersurface structure
-                    self.intercept[bin_idx] = self.initial_intercept if fix_intercept else p[0]
-                    i = 0 if fix_intercept else 1
-                    for param in list(self.params.values()):
-                        for j in range(param.num_fit_coeffts):
-                            bin_fit_idx = tuple(list(bin_idx) + [j])
-                            param.fit_coeffts[bin_fit_idx] = p[i]
-                            i += 1
-
-                    # Unflatten sys param values
-                    params_unflattened = collections.OrderedDict()
-                    for i in range(len(self.params)):
-                        param_name = list(self.params.keys())[i]
-                        params_unflattened[param_name] = x[i]
-
-                    return self.evaluate(params_unflattened, bin_idx=bin_idx)
-
-                inv_param_sigma = []
-                if intercept_sigma is not None:
-                    inv_param_sigma.append(1./intercept_sigma)
-                else:
-                    inv_param_sigma.append(0.)
-                for param in list(self.params.values()):
-                    if param.coeff_prior_sigma is not None:
-                        for j in range(param.num_fit_coeffts):
-                            inv_param_sigma.append(
-                                1./param.coeff_prior_sigma[j])
-                    else:
-                        for j in range(param.num_fit_coeffts):
-                            inv_param_sigma.append(0.)
-                inv_param_sigma = np.array(inv_param_sigma)
-                assert np.all(np.isfinite(
-                    inv_param_sigma)), "invalid values found in prior sigma. They must not be zero."
-
-                # coefficient names to pass to Minuit. Not strictly necessary
-                coeff_names = [] if fix_intercept else ['intercept']
-                for name, param in self.params.items():
-                    for j in range(param.num_fit_coeffts):
-                        coeff_names.append(name + '_p{:d}'.format(j))
-
-                def loss(p):
-                    '''
-                    Loss to be minimized during the fit.
-                    '''
-                    fvals = callback(x_to_use, *p)
-                    return np.sum(((fvals - y_to_use)/y_sigma_to_use)**2) + np.sum((inv_param_sigma*p)**2)
-
-                # Define fit bounds for `minimize`. Bounds are pairs of (min, max)
-                # values for each parameter in the fit. Use 'None' in place of min/max
-                # if there is
-                # no bound in that direction.
-                fit_bounds = []
-                if intercept_bounds is None:
-                    fit_bounds.append(tuple([None, None]))
-                else:
-                    assert (len(intercept_bounds) == 2) and (
-                        np.ndim(intercept_bounds) == 1), "intercept bounds must be given as 2-tuple"
-                    fit_bounds.append(intercept_bounds)
-
-                for param in self.params.values():
-                    if param.bounds is None:
-                        fit_bounds.extend(
-                            ((None, None),)*param.num_fit_coeffts)
-                    else:
-                        if np.ndim(param.bounds) == 1:
-                            assert len(
-                                param.bounds) == 2, "bounds on single coefficients must be given as 2-tuples"
-                            fit_bounds.append(param.bounds)
-                        elif np.ndim(param.bounds) == 2:
-                            assert np.all([len(t) == 2 for t in param.bounds]
-                                          ), "bounds must be given as a tuple of 2-tuples"
-                            fit_bounds.extend(param.bounds)
-
-                # Define the EPS (step length) used by the fitter Need to take care with
-                # floating type precision, don't want to go smaller than the FTYPE being
-                # used by PISA can handle
-                eps = np.finfo(FTYPE).eps
-
-                # Debug logging
-                test_bin_idx = (0, 0, 0)
-                if bin_idx == test_bin_idx:
-                    msg = ">>>>>>>>>>>>>>>>>>>>>>>\n"
-                    msg += "Curve fit inputs to bin %s :\n" % (bin_idx,)
-                    msg += "  x           : \n%s\n" % x
-                    msg += "  y           : \n%s\n" % y
-                    msg += "  y sigma     : \n%s\n" % y_sigma
-                    msg += "  x used      : \n%s\n" % x_to_use
-                    msg += "  y used      : \n%s\n" % y_to_use
-                    msg += "  y sigma used: \n%s\n" % y_sigma_to_use
-                    msg += "  p0          : %s\n" % p0
-                    msg += "  bounds      : \n%s\n" % fit_bounds
-                    msg += "  inv sigma   : \n%s\n" % inv_param_sigma
-                    msg += "  fit method  : %s\n" % self.fit_method
-                    msg += "<<<<<<<<<<<<<<<<<<<<<<<"
-                    logging.debug(msg)
-
-                # Perform fit
-                # errordef =1 for least squares fit and 0.5 for nllh fit
-                m = Minuit.from_array_func(loss, p0,
-                                           # only initial step size, not very important
-                                           error=(0.1)*len(p0),
-                                           limit=fit_bounds,
-                                           name=coeff_names,
-                                           errordef=1)
-                m.migrad()
-                try:
-                    m.hesse()
-                except HesseFailedWarning as e:
-                    raise Exception(
-                        "Hesse failed for bin %s, cannot determine covariance matrix" % (bin_idx,))
-                popt = m.np_values()
-                pcov = m.np_matrix()
-                if bin_idx == test_bin_idx:
-                    logging.debug(m.get_fmin())
-                    logging.debug(m.get_param_states())
-                    logging.debug(m.covariance)
+        for bin_idx, (popt, pcov) in zip(bin_indices, results):
 
             #
             # Re-format fit results
@@ -1186,6 +1281,302 @@ class Hypersurface(object):
         # Record some provenance info about the fits
         self.fit_complete = True
 
+    def _get_inv_param_sigma(self, intercept_sigma):
+        '''
+        Get the inverse prior sigma of all coefficients (0 if there is no prior).
+
+        Internal function, not to be called by a user.
+        '''
+        inv_param_sigma = []
+        if intercept_sigma is not None:
+            inv_param_sigma.append(1./intercept_sigma)
+        else:
+            inv_param_sigma.append(0.)
+        for param in list(self.params.values()):
+            if param.coeff_prior_sigma is not None:
+                for j in range(param.num_fit_coeffts):
+                    inv_param_sigma.append(
+                        1./param.coeff_prior_sigma[j])
+            else:
+                for j in range(param.num_fit_coeffts):
+                    inv_param_sigma.append(0.)
+        inv_param_sigma = np.array(inv_param_sigma)
+        assert np.all(np.isfinite(
+            inv_param_sigma)), "invalid values found in prior sigma. They must not be zero."
+        return inv_param_sigma
+
+    def _supports_linear_least_squares(self, fix_intercept, intercept_bounds, **kwargs):
+        '''
+        Check whether the fit is a linear least squares problem, which is the case if
+        the hypersurface is linear in all (unbounded) coefficients.
+
+        Internal function, not to be called by a user.
+        '''
+        if self.log or fix_intercept or intercept_bounds is not None:
+            return False
+        return all(param.func_name in LINEAR_HYPERSURFACE_FUNCTIONS and param.bounds is None
+                   for param in self.params.values())
+
+    def _fit_linear_least_squares(self, x, y, y_sigma, intercept_sigma, include_empty,
+                                  **kwargs):
+        '''
+        Solve the fit in all bins at once as a weighted least squares problem.
+
+        The loss minimized is the same as in the numerical fit, including the priors
+        on the coefficients, such that the coefficients and covariance matrices agree
+        up to the precision of the minimizer.
+
+        Returns the coefficients with shape (num bins, num coeffts), the covariance
+        matrices with shape (num bins, num coeffts, num coeffts) and a mask of the
+        bins that were solved. The remaining bins must be fitted numerically.
+
+        Internal function, not to be called by a user.
+        '''
+        n_sets, n_bins = y.shape
+
+        # For functional forms that are linear in the coefficients, the gradient does
+        # not depend on the coefficients and is the design matrix of the problem
+        columns = [np.ones((n_sets, 1))]
+        for param, param_x in zip(self.params.values(), x):
+            param_val = param_x if self.using_legacy_data else param_x - param.nominal_value
+            column = np.full((n_sets, param.num_fit_coeffts), np.NaN)
+            param._hypersurface_func.grad(param_val, *([0.] * param.num_fit_coeffts), column)
+            columns.append(column)
+        design = np.concatenate(columns, axis=1)
+        n_coeffts = design.shape[1]
+
+        # Points with zero uncertainty are excluded (by giving them zero weight),
+        # unless empty bins are included with an uncertainty of 1
+        bad_sigma_mask = y_sigma == 0.
+        if include_empty:
+            y_sigma = np.where(bad_sigma_mask, 1., y_sigma)
+            used = np.ones_like(bad_sigma_mask)
+        else:
+            used = ~bad_sigma_mask
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = np.where(used, 1. / y_sigma**2, 0.)
+        y_used = np.where(used, y, 0.)
+
+        # Bins with NaNs/Infs cannot be fitted and are not passed on to the
+        # numerical fit either
+        invalid = np.any(used & ~np.isfinite(y), axis=0)
+        solvable = ~invalid & np.all(np.isfinite(weights), axis=0)
+
+        popt = np.full((n_bins, n_coeffts), np.NaN)
+        pcov = np.full((n_bins, n_coeffts, n_coeffts), np.NaN)
+        if np.any(solvable):
+            assert n_sets >= n_coeffts, "Number of datasets used for fitting (%i) must be >= num free params (%i)" % (
+                n_sets, n_coeffts)
+            # Normal equations (including the priors)
+            inv_param_sigma = self._get_inv_param_sigma(intercept_sigma)
+            normal = np.einsum('si,bs,sj->bij', design, weights[:, solvable].T, design)
+            normal += np.diag(inv_param_sigma**2)
+            rhs = np.einsum('si,bs->bi', design, (weights * y_used)[:, solvable].T)
+            # The covariance matrix of the coefficients is the inverse of the
+            # normal matrix (corresponds to `errordef=1` for the numerical fit)
+            try:
+                cov = np.linalg.inv(normal)
+            except np.linalg.LinAlgError:
+                cov = np.full_like(normal, np.NaN)
+                for i, m in enumerate(normal):
+                    try:
+                        cov[i] = np.linalg.inv(m)
+                    except np.linalg.LinAlgError:
+                        pass
+            pcov[solvable] = cov
+            popt[solvable] = np.einsum('bij,bj->bi', cov, rhs)
+            # bins with a singular normal matrix are left for the numerical fit
+            solvable[solvable] = np.all(np.isfinite(cov), axis=(1, 2))
+
+        return popt, pcov, solvable | invalid
+
+    def _fit_bin(self, bin_idx, x, y, y_sigma, fix_intercept, intercept_bounds,
+                 intercept_sigma, include_empty):
+        '''
+        Numerically fit the hypersurface coefficients in a single bin.
+
+        Returns the best fit coefficients and their covariance matrix (NaN if the
+        bin could not be fitted).
+
+        Internal function, not to be called by a user.
+        '''
+        # Create a mask for keeping all these points
+        # May remove some points before fitting if find issues
+        scan_point_mask = np.ones(y.shape, dtype=bool)
+
+        # Cases where we have a y_sigma element = 0 (normally because the
+        # corresponding y element = 0) screw up the fits (least squares divides by
+        # sigma, so get infs) By default, we ignore empty bins. If the user wishes
+        # to include them, it can be done with a value of zero and standard
+        # deviation of 1.
+        bad_sigma_mask = y_sigma == 0.
+        if bad_sigma_mask.sum() > 0:
+            if include_empty:
+                y_sigma[bad_sigma_mask] = 1.
+            else:
+                scan_point_mask = scan_point_mask & ~bad_sigma_mask
+
+        # Apply the mask to get the values I will actually use
+        x_to_use = np.array([xx[scan_point_mask] for xx in x])
+        y_to_use = y[scan_point_mask]
+        y_sigma_to_use = y_sigma[scan_point_mask]
+
+        # Checks
+        assert x_to_use.shape[0] == len(self.params)
+        assert x_to_use.shape[1] == y_to_use.size
+
+        # Get flat list of the fit param guesses
+        # The param coefficients are ordered as [ param 0 cft 0, ..., param 0 cft N,
+        # ..., param M cft 0, ..., param M cft N ]
+        p0_intercept = self.intercept[bin_idx]
+        p0_param_coeffts = [param.get_fit_coefft(bin_idx=bin_idx, coefft_idx=i_cft)
+                            for param in list(self.params.values())
+                            for i_cft in range(param.num_fit_coeffts)]
+        if fix_intercept:
+            p0 = np.array(p0_param_coeffts, dtype=FTYPE)
+        else:
+            p0 = np.array([p0_intercept] + p0_param_coeffts, dtype=FTYPE)
+
+        #
+        # Check if have valid data in this bin
+        #
+
+        # If have empty bins, cannot fit In particular, if the nominal map has an
+        # empty bin, it cannot be rescaled (x * 0 = 0) If this case, no need to try
+        # fitting
+
+        # Check if have NaNs/Infs
+        if np.any(~np.isfinite(y_to_use)):  # TODO also handle missing sigma
+
+            # Not fitting, add empty variables
+            popt = np.full_like(p0, np.NaN)
+            pcov = np.NaN
+
+        # Otherwise, fit...
+        else:
+
+            #
+            # Fit
+            #
+
+            # Must have at least as many sets as free params in fit or else curve_fit will fail
+            assert y.size >= p0.size, "Number of datasets used for fitting (%i) must be >= num free params (%i)" % (
+                y.size, p0.size)
+
+            # Define a callback function for use with `curve_fit`
+            #   x : sys params
+            #   p : func/shape params
+            def callback(x, *p):
+
+                # Note that this is using the dynamic variable `bin_idx`, which
+                # cannot be passed as an arg as `curve_fit` cannot handle fixed
+                # parameters.
+                #
+                # Unflatten list of the func/shape params, and write them to the
+                # hypersurface structure
+                self.intercept[bin_idx] = self.initial_intercept if fix_intercept else p[0]
+                i = 0 if fix_intercept else 1
+                for param in list(self.params.values()):
+                    for j in range(param.num_fit_coeffts):
+                        bin_fit_idx = tuple(list(bin_idx) + [j])
+                        param.fit_coeffts[bin_fit_idx] = p[i]
+                        i += 1
+
+                # Unflatten sys param values
+                params_unflattened = collections.OrderedDict()
+                for i in range(len(self.params)):
+                    param_name = list(self.params.keys())[i]
+                    params_unflattened[param_name] = x[i]
+
+                return self.evaluate(params_unflattened, bin_idx=bin_idx)
+
+            inv_param_sigma = self._get_inv_param_sigma(intercept_sigma)
+
+            # coefficient names to pass to Minuit. Not strictly necessary
+            coeff_names = [] if fix_intercept else ['intercept']
+            for name, param in self.params.items():
+                for j in range(param.num_fit_coeffts):
+                    coeff_names.append(name + '_p{:d}'.format(j))
+
+            def loss(p):
+                '''
+                Loss to be minimized during the fit.
+                '''
+                fvals = callback(x_to_use, *p)
+                return np.sum(((fvals - y_to_use)/y_sigma_to_use)**2) + np.sum((inv_param_sigma*p)**2)
+
+            # Define fit bounds for `minimize`. Bounds are pairs of (min, max)
+            # values for each parameter in the fit. Use 'None' in place of min/max
+            # if there is
+            # no bound in that direction.
+            fit_bounds = []
+            if intercept_bounds is None:
+                fit_bounds.append(tuple([None, None]))
+            else:
+                assert (len(intercept_bounds) == 2) and (
+                    np.ndim(intercept_bounds) == 1), "intercept bounds must be given as 2-tuple"
+                fit_bounds.append(intercept_bounds)
+
+            for param in self.params.values():
+                if param.bounds is None:
+                    fit_bounds.extend(
+                        ((None, None),)*param.num_fit_coeffts)
+                else:
+                    if np.ndim(param.bounds) == 1:
+                        assert len(
+                            param.bounds) == 2, "bounds on single coefficients must be given as 2-tuples"
+                        fit_bounds.append(param.bounds)
+                    elif np.ndim(param.bounds) == 2:
+                        assert np.all([len(t) == 2 for t in param.bounds]
+                                      ), "bounds must be given as a tuple of 2-tuples"
+                        fit_bounds.extend(param.bounds)
+
+            # Define the EPS (step length) used by the fitter Need to take care with
+            # floating type precision, don't want to go smaller than the FTYPE being
+            # used by PISA can handle
+            eps = np.finfo(FTYPE).eps
+
+            # Debug logging
+            test_bin_idx = (0, 0, 0)
+            if bin_idx == test_bin_idx:
+                msg = ">>>>>>>>>>>>>>>>>>>>>>>\n"
+                msg += "Curve fit inputs to bin %s :\n" % (bin_idx,)
+                msg += "  x           : \n%s\n" % x
+                msg += "  y           : \n%s\n" % y
+                msg += "  y sigma     : \n%s\n" % y_sigma
+                msg += "  x used      : \n%s\n" % x_to_use
+                msg += "  y used      : \n%s\n" % y_to_use
+                msg += "  y sigma used: \n%s\n" % y_sigma_to_use
+                msg += "  p0          : %s\n" % p0
+                msg += "  bounds      : \n%s\n" % fit_bounds
+                msg += "  inv sigma   : \n%s\n" % inv_param_sigma
+                msg += "  fit method  : %s\n" % self.fit_method
+                msg += "<<<<<<<<<<<<<<<<<<<<<<<"
+                logging.debug(msg)
+
+            # Perform fit
+            # errordef =1 for least squares fit and 0.5 for nllh fit
+            m = Minuit.from_array_func(loss, p0,
+                                       # only initial step size, not very important
+                                       error=(0.1)*len(p0),
+                                       limit=fit_bounds,
+                                       name=coeff_names,
+                                       errordef=1)
+            m.migrad()
+            try:
+                m.hesse()
+            except HesseFailedWarning as e:
+                raise Exception(
+                    "Hesse failed for bin %s, cannot determine covariance matrix" % (bin_idx,))
+            popt = m.np_values()
+            pcov = m.np_matrix()
+            if bin_idx == test_bin_idx:
+                logging.debug(m.get_fmin())
+                logging.debug(m.get_param_states())
+                logging.debug(m.covariance)
+
+        return popt, pcov
+
     @property
     def nominal_values(self):
         '''
@@ -1457,6 +1848,17 @@ class Hypersurface(object):
         return hypersurface
 
 
+def _fit_hypersurface_bins(hypersurface, bin_indices, x, y, y_sigma, fit_kw):
+    '''
+    Numerically fit a hypersurface in several bins, to be run in a worker process.
+
+    `y` and `y_sigma` have shape (num datasets, len(`bin_indices`)). Returns a list
+    of the best fit coefficients and covariance matrix in each bin.
+    '''
+    return [hypersurface._fit_bin(bin_idx, x, y[:, i], y_sigma[:, i], **fit_kw)
+            for i, bin_idx in enumerate(bin_indices)]
+
+
 class HypersurfaceParam(object):
     '''
     A class representing one of the parameters (and corresponding functional forms) in
@@ -2037,6 +2439,10 @@ def load_hypersurfaces(input_file, expected_binning=None):
         1) Load files produced using this code (recommended)
         2) Load files producing using older versions of PISA
         3) Load public data releases csv formatted files
+        4) Load directories in the binary format (see `save_hypersurfaces_binary`)
+
+    If an up-to-date binary version of a JSON file exists next to it (see
+    `convert_hypersurfaces_to_binary`), that is loaded instead.
 
     Parameters
     ----------
@@ -2064,7 +2470,17 @@ def load_hypersurfaces(input_file, expected_binning=None):
     # PISA hypersurface files
     #
 
-    if input_file.endswith("json"):
+    # Directory in the binary format
+    if os.path.isdir(os.path.expandvars(os.path.expanduser(input_file))):
+
+        hypersurfaces = load_hypersurfaces_binary(input_file)
+
+    elif _is_json_file(input_file) and _find_binary_hypersurfaces(input_file) is not None:
+
+        # Use the binary version of the file instead of parsing the JSON
+        hypersurfaces = load_hypersurfaces_binary(_find_binary_hypersurfaces(input_file))
+
+    elif _is_json_file(input_file):
 
         # Load file
         input_data = from_json(input_file)
@@ -2109,6 +2525,190 @@ def load_hypersurfaces(input_file, expected_binning=None):
     return hypersurfaces
 
 
+# Extension of directories holding hypersurfaces in the binary format
+BINARY_HYPERSURFACES_EXT = ".hsnpy"
+
+# Name of the JSON header in these directories
+BINARY_HYPERSURFACES_HEADER = "header.json"
+
+# State entries that are never written to separate array files
+_BINARY_HYPERSURFACES_SKIP_KEYS = ("binning",)
+
+
+def _is_json_file(input_file):
+    '''
+    Whether `input_file` is a (possibly compressed or scrambled) JSON file
+    '''
+    return input_file.endswith(("json", "json.bz2", "json.xor"))
+
+
+def get_binary_hypersurfaces_path(input_file):
+    '''
+    Get the path of the binary version of a hypersurface JSON file, which is the
+    file name with the JSON (and compression) extension replaced.
+    '''
+    base = input_file
+    for ext in [".bz2", ".xor", ".json"]:
+        if base.endswith(ext):
+            base = base[:-len(ext)]
+    return base + BINARY_HYPERSURFACES_EXT
+
+
+def _source_file_info(input_file):
+    '''
+    Information identifying the version of a source file
+    '''
+    stat = os.stat(input_file)
+    return collections.OrderedDict([("file", os.path.basename(input_file)),
+                                    ("size", stat.st_size),
+                                    ("mtime", stat.st_mtime)])
+
+
+def _find_binary_hypersurfaces(input_file):
+    '''
+    Return the path of an up-to-date binary version of `input_file`, if there is one
+    '''
+    input_file = find_resource(input_file, fail=False)
+    if input_file is None:
+        return None
+    binary_dir = get_binary_hypersurfaces_path(input_file)
+    header_file = os.path.join(binary_dir, BINARY_HYPERSURFACES_HEADER)
+    if not os.path.isfile(header_file):
+        return None
+    header = from_json(header_file)
+    if header.get("source") != _source_file_info(input_file):
+        logging.warn("Ignoring outdated binary hypersurfaces %s", binary_dir)
+        return None
+    return binary_dir
+
+
+def save_hypersurfaces_binary(hypersurfaces, output_dir, source_file=None):
+    '''
+    Store hypersurfaces in a binary format that can be memory-mapped when loading.
+
+    The output directory contains one `.npy` file for each array in the states of the
+    hypersurfaces, plus a JSON header holding the remaining state, in which the
+    arrays are replaced by references to their files.
+
+    Parameters
+    ----------
+    hypersurfaces : Mapping
+        Hypersurfaces as returned by `load_hypersurfaces`, i.e. of the form
+        { map_0_key : map_0_hypersurface, ..., map_N_key : map_N_hypersurface, }
+
+    output_dir : str
+        Directory to write to, by convention ending with `BINARY_HYPERSURFACES_EXT`
+
+    source_file : str, optional
+        File the hypersurfaces were loaded from. If provided, the binary version is
+        used in place of this file by `load_hypersurfaces` as long as the file is
+        not modified.
+    '''
+    assert isinstance(hypersurfaces, collections.Mapping)
+    mkdir(output_dir, warn=False)
+
+    def externalize(obj, path):
+        if isinstance(obj, collections.Mapping):
+            return collections.OrderedDict([
+                (k, v if k in _BINARY_HYPERSURFACES_SKIP_KEYS else externalize(v, path + [str(k)]))
+                for k, v in obj.items()
+            ])
+        if isinstance(obj, (list, tuple)):
+            return [externalize(v, path + [str(i)]) for i, v in enumerate(obj)]
+        if (isinstance(obj, np.ndarray) and not isinstance(obj, ureg.Quantity)
+                and obj.dtype.kind in "biuf"):
+            file_name = ".".join(path) + ".npy"
+            np.save(os.path.join(output_dir, file_name), np.ascontiguousarray(obj))
+            return collections.OrderedDict([("__npy__", file_name)])
+        return obj
+
+    header = collections.OrderedDict()
+    if source_file is not None:
+        header["source"] = _source_file_info(find_resource(source_file))
+    else:
+        header["source"] = None
+    header["hypersurfaces"] = collections.OrderedDict([
+        (map_name, externalize(hypersurface.serializable_state, [map_name]))
+        for map_name, hypersurface in hypersurfaces.items()
+    ])
+    to_json(header, os.path.join(output_dir, BINARY_HYPERSURFACES_HEADER), warn=False)
+    logging.info("Wrote binary hypersurfaces to %s", output_dir)
+
+
+def load_hypersurfaces_binary(input_dir):
+    '''
+    Load hypersurfaces stored by `save_hypersurfaces_binary`.
+
+    Arrays are memory-mapped (copy-on-write) rather than read and decoded.
+
+    Returns a dict with the format: { map_0_key : map_0_hypersurface, ..., map_N_key : map_N_hypersurface, }
+    '''
+    input_dir = find_resource(input_dir)
+    header = from_json(os.path.join(input_dir, BINARY_HYPERSURFACES_HEADER))
+
+    def internalize(obj):
+        if isinstance(obj, collections.Mapping):
+            if set(obj.keys()) == {"__npy__"}:
+                # plain ndarray view of the memory map
+                return np.asarray(np.load(os.path.join(input_dir, obj["__npy__"]),
+                                          mmap_mode="c"))
+            return collections.OrderedDict([(k, internalize(v)) for k, v in obj.items()])
+        if isinstance(obj, list):
+            return [internalize(v) for v in obj]
+        return obj
+
+    hypersurfaces = collections.OrderedDict()
+    for map_name, hypersurface_state in header["hypersurfaces"].items():
+        hypersurfaces[map_name] = Hypersurface.from_state(internalize(hypersurface_state))
+    return hypersurfaces
+
+
+def convert_hypersurfaces_to_binary(input_file, output_dir=None):
+    '''
+    Convert a hypersurface fit file into the binary format.
+
+    For files describing interpolated hypersurfaces (see
+    `load_interpolated_hypersurfaces`), each of the referenced fit files is
+    converted.
+
+    Parameters
+    ----------
+    input_file : str
+        Hypersurface file in any format supported by `load_hypersurfaces`
+
+    output_dir : str, optional
+        Output directory. By default, the binary version is placed next to the input
+        file (see `get_binary_hypersurfaces_path`), where it is picked up
+        automatically by `load_hypersurfaces`.
+
+    Returns
+    -------
+    output_dirs : list of str
+        The directories written to
+    '''
+    # `input_file` can also be a pattern matching several (data release) files
+    input_path = find_resource(input_file, fail=False)
+    if input_path is not None and _is_json_file(input_file):
+        input_data = from_json(input_path)
+        if "hs_fits" in input_data:
+            assert output_dir is None, "Cannot specify the output directory for interpolated hypersurfaces"
+            output_dirs = []
+            for hs_fit in input_data["hs_fits"]:
+                output_dirs.extend(convert_hypersurfaces_to_binary(hs_fit["file"]))
+            return output_dirs
+    if output_dir is None:
+        assert input_path is not None, "Must specify the output directory if the input is not a single file"
+        output_dir = get_binary_hypersurfaces_path(input_path)
+    # Remove the header of an existing binary version, such that the source file is
+    # read (and the array files are not overwritten while memory-mapped)
+    header_file = os.path.join(output_dir, BINARY_HYPERSURFACES_HEADER)
+    if os.path.isfile(header_file):
+        os.remove(header_file)
+    save_hypersurfaces_binary(load_hypersurfaces(input_file), output_dir,
+                              source_file=input_path)
+    return [output_dir]
+
+
 def _load_hypersurfaces_legacy(input_data):
     '''
     Load an old hyperpane (not surface) fit file from older PISA version.
@@ -2860,8 +3460,204 @@ def test_hypersurface_basics():
     logging.info('<< PASS : test_hypersurface_basics >>')
 
 
+def test_hypersurface_interpolator():
+    '''
+    Test that the interpolated hypersurface coefficients and covariance matrices
+    match a piecewise linear interpolation in every bin, also for cached points
+    '''
+    binning = MultiDimBinning([OneDimBinning(name="reco_energy",
+                                             domain=[0., 10.],
+                                             num_bins=4,
+                                             units=ureg.GeV,
+                                             is_lin=True,
+                                             )])
+    x_support = np.array([1., 2., 4.])
+    rng = np.random.RandomState(0)
+    hs_fits = []
+    for x in x_support:
+        params = [HypersurfaceParam(name="foo", func_name="linear",
+                                    initial_fit_coeffts=[1.]),
+                  HypersurfaceParam(name="bar", func_name="quadratic",
+                                    initial_fit_coeffts=[1., -1.]),
+                  ]
+        hypersurface = Hypersurface(params=params, initial_intercept=1.)
+        hypersurface._init(binning=binning,
+                           nominal_param_values={'foo': 0., 'bar': 0.})
+        hypersurface.fit_coeffts = rng.normal(size=hypersurface.fit_coeffts.shape)
+        a = rng.normal(size=binning.shape + (4, 4))
+        hypersurface.fit_cov_mat = np.einsum('...ij,...kj->...ik', a, a)
+        hs_fits.append({'param_values': {'x': x * ureg.m},
+                        'hypersurface': hypersurface})
+    interpolator = HypersurfaceInterpolator(
+        [{'name': 'x', 'unit': 'm'}], hs_fits, kind='linear', cache_size=2)
+
+    coeff_z = np.stack([f['hypersurface'].fit_coeffts for f in hs_fits], axis=-1)
+    covar_z = np.stack([f['hypersurface'].fit_cov_mat for f in hs_fits], axis=-1)
+    for x in [1.5, 3., 1.5, 0.5, 3.5, 1.5]:
+        hypersurface = interpolator.get_hypersurface(x=x * ureg.m)
+        expected_coeffts = np.apply_along_axis(
+            lambda z: np.interp(x, x_support, z), -1, coeff_z)
+        expected_covars = np.apply_along_axis(
+            lambda z: np.interp(x, x_support, z), -1, covar_z)
+        if x < x_support[0]:
+            # linear extrapolation from the first two points
+            slope = (coeff_z[..., 1] - coeff_z[..., 0]) / \
+                (x_support[1] - x_support[0])
+            expected_coeffts = coeff_z[..., 0] + slope * (x - x_support[0])
+        assert np.allclose(hypersurface.fit_coeffts, expected_coeffts,
+                           **ALLCLOSE_KW)
+        if x >= x_support[0]:
+            # convex combinations of PSD matrices need no correction
+            assert np.allclose(hypersurface.fit_cov_mat, expected_covars,
+                               **ALLCLOSE_KW)
+        for bin_idx in np.ndindex(binning.shape):
+            assert matrix.is_psd(hypersurface.fit_cov_mat[bin_idx])
+        assert len(interpolator._cache) <= 2
+    logging.info('<< PASS : test_hypersurface_interpolator >>')
+
+
+def test_hypersurface_compiled_evaluation():
+    '''
+    Test that evaluating all bins at once with the compiled kernel gives the same
+    values and uncertainties as evaluating each bin individually
+    '''
+    binning = MultiDimBinning([OneDimBinning(name="reco_energy",
+                                             domain=[0., 10.],
+                                             num_bins=3,
+                                             units=ureg.GeV,
+                                             is_lin=True,
+                                             ),
+                               OneDimBinning(name="reco_coszen",
+                                             domain=[-1., 1.],
+                                             num_bins=2,
+                                             is_lin=True,
+                                             )])
+    rng = np.random.RandomState(0)
+    for log in [False, True]:
+        params = [HypersurfaceParam(name=func_name, func_name=func_name)
+                  for func_name in HYPERSURFACE_PARAM_FUNCTIONS]
+        hypersurface = Hypersurface(params=params, log=log)
+        hypersurface._init(binning=binning,
+                           nominal_param_values={p.name: 0.5 for p in params})
+        hypersurface.fit_coeffts = rng.uniform(
+            0.1, 0.5, size=hypersurface.fit_coeffts.shape)
+        a = rng.normal(size=binning.shape + (hypersurface.num_fit_coeffts,)*2)
+        hypersurface.fit_cov_mat = np.einsum('...ij,...kj->...ik', a, a)
+        param_values = {p.name: rng.uniform(0.5, 1.5) for p in params}
+
+        scales, sigmas = hypersurface.evaluate(param_values, return_uncertainty=True)
+        out = np.empty(binning.size, dtype=FTYPE)
+        hypersurface.evaluate(param_values, out=out)
+        assert np.allclose(out.reshape(binning.shape), scales, **ALLCLOSE_KW)
+        for bin_idx in np.ndindex(binning.shape):
+            scale, sigma = hypersurface.evaluate(param_values, bin_idx=bin_idx,
+                                                 return_uncertainty=True)
+            assert np.allclose(scales[bin_idx], scale, **ALLCLOSE_KW)
+            assert np.allclose(sigmas[bin_idx], sigma, **ALLCLOSE_KW)
+    logging.info('<< PASS : test_hypersurface_compiled_evaluation >>')
+
+
+def test_hypersurface_linear_least_squares():
+    '''
+    Test that the closed-form fit of hypersurfaces that are linear in their
+    coefficients agrees with the numerical fit
+    '''
+    binning = MultiDimBinning([OneDimBinning(name="reco_energy",
+                                             domain=[0., 10.],
+                                             num_bins=4,
+                                             units=ureg.GeV,
+                                             is_lin=True,
+                                             )])
+    rng = np.random.RandomState(0)
+    nominal_param_values = {'foo': 0., 'bar': 0.}
+    sys_param_values = [{'foo': rng.uniform(-1., 1.), 'bar': rng.uniform(-1., 1.)}
+                        for _ in range(10)]
+
+    def make_map():
+        hist = rng.uniform(50., 100., size=binning.shape)
+        return Map(name="nue_cc", binning=binning, hist=hist, error_hist=np.sqrt(hist))
+    nominal_map = make_map()
+    sys_maps = [make_map() for _ in sys_param_values]
+
+    fitted = []
+    # (very wide) bounds on the coefficients enforce the numerical fit
+    for bounds in [None, (-1e3, 1e3)]:
+        params = [HypersurfaceParam(name="foo", func_name="linear",
+                                    initial_fit_coeffts=[0.], bounds=bounds),
+                  HypersurfaceParam(name="bar", func_name="quadratic",
+                                    initial_fit_coeffts=[0., 0.], bounds=bounds,
+                                    coeff_prior_sigma=[10., 10.]),
+                  ]
+        hypersurface = Hypersurface(params=params, initial_intercept=1.)
+        hypersurface.fit(nominal_map=nominal_map,
+                         nominal_param_values=nominal_param_values,
+                         sys_maps=sys_maps,
+                         sys_param_values=sys_param_values,
+                         norm=True,
+                         )
+        fitted.append(hypersurface)
+
+    assert fitted[0]._supports_linear_least_squares(fix_intercept=False,
+                                                    intercept_bounds=None)
+    assert not fitted[1]._supports_linear_least_squares(fix_intercept=False,
+                                                        intercept_bounds=None)
+    assert np.allclose(fitted[0].fit_coeffts, fitted[1].fit_coeffts,
+                       rtol=1e-3, atol=1e-5)
+    assert np.allclose(fitted[0].fit_cov_mat, fitted[1].fit_cov_mat,
+                       rtol=1e-2, atol=1e-8)
+    logging.info('<< PASS : test_hypersurface_linear_least_squares >>')
+
+
+def test_hypersurface_binary_io():
+    '''
+    Test converting hypersurface files to the binary format and loading them
+    '''
+    import tempfile
+
+    binning = MultiDimBinning([OneDimBinning(name="reco_energy",
+                                             domain=[0., 10.],
+                                             num_bins=3,
+                                             units=ureg.GeV,
+                                             is_lin=True,
+                                             )])
+    params = [HypersurfaceParam(name="foo", func_name="linear"),
+              HypersurfaceParam(name="bar", func_name="exponential")]
+    hypersurface = Hypersurface(params=params, initial_intercept=1.)
+    hypersurface._init(binning=binning, nominal_param_values={'foo': 0., 'bar': 1.})
+    rng = np.random.RandomState(0)
+    hypersurface.fit_coeffts = rng.normal(size=hypersurface.fit_coeffts.shape)
+    hypersurface.fit_cov_mat = np.ones(binning.shape + (3, 3))
+    param_values = {'foo': 0.3, 'bar': 1.2}
+    expected = hypersurface.evaluate(param_values, return_uncertainty=True)
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        file_path = os.path.join(tmpdirname, "hypersurface.json.bz2")
+        to_json({"nue_cc": hypersurface}, file_path)
+        binary_dir = convert_hypersurfaces_to_binary(file_path)[0]
+        assert binary_dir == os.path.join(tmpdirname, "hypersurface" + BINARY_HYPERSURFACES_EXT)
+        assert _find_binary_hypersurfaces(file_path) == binary_dir
+
+        for input_file in [file_path, binary_dir]:
+            reloaded = load_hypersurfaces(input_file, expected_binning=binning)["nue_cc"]
+            # arrays are memory-mapped, not decoded
+            assert isinstance(reloaded.intercept.base, np.memmap)
+            for result, expected_result in zip(
+                    reloaded.evaluate(param_values, return_uncertainty=True), expected):
+                assert np.allclose(result, expected_result, **ALLCLOSE_KW)
+
+        # the binary version is ignored once the source file is modified
+        to_json({"nue_cc": hypersurface}, file_path, warn=False)
+        os.utime(file_path, (0., 0.))
+        assert _find_binary_hypersurfaces(file_path) is None
+    logging.info('<< PASS : test_hypersurface_binary_io >>')
+
+
 # Run the examp'es/tests
 if __name__ == "__main__":
     set_verbosity(2)
     test_hypersurface_basics()
     test_hypersurface_uncertainty()
+    test_hypersurface_interpolator()
+    test_hypersurface_compiled_evaluation()
+    test_hypersurface_linear_least_squares()
+    test_hypersurface_binary_io()
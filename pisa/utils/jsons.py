@@ -12,6 +12,7 @@ from collections.abc import Iterable, Mapping, Sequence
 from numbers import Integral, Number, Real
 import os
 import tempfile
+import warnings
 
 import numpy as np
 import simplejson as json
@@ -32,6 +33,7 @@ __all__ = [
     'NumpyEncoder',
     'NumpyDecoder',
     'test_to_json_from_json',
+    'test_NumpyDecoder',
 ]
 
 __author__ = 'S. Boeser, J.L. Lanfranchi'
@@ -72,6 +74,12 @@ def loads(s):
     return json.loads(s, cls=NumpyDecoder)
 
 
+def _xor_bytes(data):
+    """Scramble / unscramble the bytes-like `data` by xor-ing every byte with
+    the key 42; returns a uint8 array"""
+    return np.bitwise_xor(np.frombuffer(data, dtype=np.uint8), np.uint8(42))
+
+
 def from_json(filename, cls=None):
     """Open a file in JSON format (optionally compressed with bz2 or
     xor-scrambled) and parse the content into Python objects.
@@ -144,13 +152,15 @@ def from_json(filename, cls=None):
     assert ext in JSON_EXTS or ext in ZIP_EXTS + XOR_EXTS
     try:
         if ext == 'bz2':
+            # Decompress and decode while reading, such that neither the
+            # compressed nor the decompressed bytes are held in memory as a
+            # whole alongside the decoded string
             fobj = open_resource(filename, 'rb')
             try:
-                bz2_content = fobj.read()
+                with bz2.open(fobj, 'rt', encoding='utf-8') as bz2_fobj:
+                    decompressed = bz2_fobj.read()
             finally:
                 fobj.close()
-            decompressed = bz2.decompress(bz2_content).decode()
-            del bz2_content
             content = json.loads(
                 decompressed,
                 cls=NumpyDecoder,
@@ -158,18 +168,16 @@ def from_json(filename, cls=None):
             )
             del decompressed
         elif ext == 'xor':
-
-            with open(filename, 'rb') as infile:
-                encrypted_bytes = infile.read()
-
-            # decrypt with key 42
-            decypted_bytes = bytearray()
-            for byte in encrypted_bytes:
-                decypted_bytes.append(byte ^ 42)
-
-            content = json.loads(decypted_bytes.decode(),
-                                cls=NumpyDecoder,
-                                object_pairs_hook=OrderedDict)
+            fobj = open_resource(filename, 'rb')
+            try:
+                decrypted = _xor_bytes(fobj.read())
+            finally:
+                fobj.close()
+            decrypted = str(decrypted.data, 'utf-8')
+            content = json.loads(decrypted,
+                                 cls=NumpyDecoder,
+                                 object_pairs_hook=OrderedDict)
+            del decrypted
         else:
             fobj = open_resource(filename)
             try:
@@ -263,12 +271,7 @@ def to_json(content, filename, indent=2, overwrite=True, warn=True,
                 sort_keys=sort_keys, allow_nan=True, ignore_nan=False
                 ).encode()
 
-            # encrypt with key 42
-            encrypted_bytes = bytearray()
-            for byte in json_bytes:
-                encrypted_bytes.append(byte ^ 42)
-
-            outfile.write(encrypted_bytes)
+            outfile.write(_xor_bytes(json_bytes))
         else:
             outfile.write(
                 json.dumps(
@@ -335,7 +338,13 @@ class NumpyEncoder(json.JSONEncoder):
 
 class NumpyDecoder(json.JSONDecoder):
     """Decode JSON array(s) as numpy.ndarray; also returns python strings
-    instead of unicode."""
+    instead of unicode.
+
+    The document is first parsed by the (C-accelerated, if available) default
+    scanner, and the resulting lists are then converted bottom-up, exactly as
+    `json_array_numpy` would have done while parsing. Lists of (nested,
+    regular) numbers are converted in a single call to `numpy.asarray`.
+    """
     def __init__(
         self,
         encoding=None,
@@ -355,23 +364,60 @@ class NumpyDecoder(json.JSONDecoder):
             strict=strict,
             object_pairs_hook=object_pairs_hook,
         )
-        # Only need to override the default array handler
-        self.parse_array = self.json_array_numpy
-        self.scan_once = json.scanner.py_make_scanner(self)
+
+    def decode(self, s, *args, **kwargs):  # pylint: disable=arguments-differ
+        """Return the Python representation of the JSON document `s`, with
+        arrays converted as described in `json_array_numpy`."""
+        return self.convert_arrays(super().decode(s, *args, **kwargs))
+
+    def convert_arrays(self, obj):
+        """Convert (in place where possible) the lists within `obj`, starting
+        from the innermost ones, as `json_array_numpy` does."""
+        if isinstance(obj, list):
+            if len(obj) > 0:
+                # Shortcut for nested numeric lists, which would end up as a
+                # numeric ndarray of the same shape and dtype anyway (unless
+                # they contain empty lists, which are left as lists)
+                try:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore')
+                        ndarray_values = np.asarray(obj)
+                except ValueError:
+                    pass
+                else:
+                    if ndarray_values.dtype.kind in 'biufc' and ndarray_values.size > 0:
+                        return ndarray_values
+                for idx, val in enumerate(obj):
+                    obj[idx] = self.convert_arrays(val)
+            return self.list_to_numpy(obj)
+
+        if isinstance(obj, dict):
+            for key, val in obj.items():
+                obj[key] = self.convert_arrays(val)
+
+        return obj
 
     def json_array_numpy(self, s_and_end, scan_once, **kwargs):
         """Interpret arrays (lists by default) as numpy arrays where this does
         not yield a string or object array; also handle conversion of
-        particularly-formatted input to pint Quantities."""
+        particularly-formatted input to pint Quantities. Usable as
+        `parse_array` with the pure-Python scanner (see `list_to_numpy`)."""
         # Use the default array parser to get list-ified version of the data
         values, end = json.decoder.JSONArray(s_and_end, scan_once, **kwargs)
-
+        return self.list_to_numpy(values), end
+
+    @staticmethod
+    def list_to_numpy(values):
+        """Interpret the list `values` (whose elements have been converted
+        already) as numpy array where this does not yield a string or object
+        array; also handle conversion of particularly-formatted input to pint
+        Quantities."""
         # Assumption for all below logic is the result is a Sequence (i.e., has
         # attribute `__len__`)
         assert isinstance(values, Sequence), str(type(values)) + "\n" + str(values)
 
         if len(values) == 0:
-            return values, end
+            return values
 
         # -- Check for pint quantity -- #
 
@@ -379,7 +425,7 @@ class NumpyDecoder(json.JSONDecoder):
             isinstance(values, ureg.Quantity)
             or any(isinstance(val, ureg.Quantity) for val in values)
         ):
-            return values, end
+            return values
 
         # Quantity tuple (`quantity.to_tuple()`) with a scalar produces from
         # the raw JSON, e.g.,
@@ -403,7 +449,7 @@ class NumpyDecoder(json.JSONDecoder):
             )
         ):
             values = ureg.Quantity.from_tuple(values)
-            return values, end
+            return values
 
         # Units part of quantity tuple (`quantity.to_tuple()[1]`)
         # e.g. m / s**2 is represented as .. ::
@@ -420,7 +466,7 @@ class NumpyDecoder(json.JSONDecoder):
                 for subval in values
             )
         ):
-            return values, end
+            return values
 
         # Individual unit (`quantity.to_tuple()[1][0]`)
         # e.g. s^-2 is represented as .. ::
@@ -433,12 +479,12 @@ class NumpyDecoder(json.JSONDecoder):
             and isinstance(values[0], string_types)
             and isinstance(values[1], Number)
         ):
-            return values, end
+            return values
 
         try:
             ndarray_values = np.asarray(values)
         except ValueError:
-            return values, end
+            return values
 
         # Things like lists of dicts, or mixed types, will result in an
         # object array; these are handled in PISA as lists, not numpy
@@ -447,9 +493,9 @@ class NumpyDecoder(json.JSONDecoder):
         # Similarly, sequences of strings should stay lists of strings, not
         # become numpy arrays.
         if issubclass(ndarray_values.dtype.type, (np.object0, np.str0, str)):
-            return values, end
+            return values
 
-        return ndarray_values, end
+        return ndarray_values
 
 
 # TODO: include more basic types in testing (strings, etc.)
@@ -538,6 +584,94 @@ def test_to_json_from_json():
     logging.info('<< PASS : test_to_json_from_json >>')
 
 
+def test_NumpyDecoder():
+    """Check that `NumpyDecoder` decodes to exactly the same objects as when
+    converting each array while parsing (with the pure-Python scanner), and
+    benchmark both on large Map and TransformSet resources"""
+    import time
+    from pisa.core.binning import MultiDimBinning
+    from pisa.core.map import Map, MapSet
+    from pisa.core.transform import BinnedTensorTransform, TransformSet
+
+    class ParseTimeDecoder(NumpyDecoder):
+        """Reference: convert arrays while parsing"""
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.parse_array = self.json_array_numpy
+            self.scan_once = json.scanner.py_make_scanner(self)
+
+        def decode(self, s, *args, **kwargs):  # pylint: disable=arguments-differ
+            return json.JSONDecoder.decode(self, s, *args, **kwargs)
+
+    def assert_identical(ref, test, path='/'):
+        assert type(ref) is type(test), '%s: %s != %s' % (path, type(ref), type(test))
+        if isinstance(ref, ureg.Quantity):
+            assert str(ref.units) == str(test.units), path
+            assert_identical(ref.magnitude, test.magnitude, path)
+        elif isinstance(ref, np.ndarray):
+            assert ref.dtype == test.dtype and ref.shape == test.shape, path
+            assert np.array_equal(ref, test) or np.allclose(ref, test, rtol=0, atol=0, equal_nan=True), path
+        elif isinstance(ref, Mapping):
+            assert list(ref.keys()) == list(test.keys()), path
+            for key in ref:
+                assert_identical(ref[key], test[key], path + str(key) + '/')
+        elif isinstance(ref, list):
+            assert len(ref) == len(test), path
+            for idx, (ref_val, test_val) in enumerate(zip(ref, test)):
+                assert_identical(ref_val, test_val, path + str(idx) + '/')
+        else:
+            assert ref == test or (ref != ref and test != test), path
+
+    binning = MultiDimBinning([
+        dict(name='energy', is_log=True, domain=(1, 80)*ureg.GeV, num_bins=40),
+        dict(name='coszen', is_lin=True, domain=(-1, 1), num_bins=40),
+        dict(name='pid', bin_edges=[-3, 0.5, 2, 1000]),
+    ])
+    small_binning = binning.downsample(8, 4, 1)
+    hist = np.random.random(binning.shape)
+    mapset = MapSet([
+        Map(name='nue', binning=binning, hist=hist, error_hist=np.sqrt(hist)),
+        Map(name='numu', binning=binning, hist=2*hist),
+    ])
+    xforms = TransformSet([
+        BinnedTensorTransform(
+            input_names=['nue', 'numu'],
+            output_name='nue',
+            input_binning=small_binning,
+            output_binning=small_binning,
+            xform_array=np.random.random((2,) + small_binning.shape + small_binning.shape),
+        ),
+    ])
+    misc = OrderedDict([
+        ('quantity', 9.8*ureg.m/ureg.s**2),
+        ('array_quantity', np.arange(6).reshape(2, 3)*ureg.m),
+        ('units', [['meter', 1.0], ['second', -2.0]]),
+        ('strings', ['a', 'ab', '']),
+        ('dicts', [OrderedDict(a=1), OrderedDict(b=[1, 2])]),
+        ('ragged', [[1, 2], [3], []]),
+        ('mixed', [1, 'a', None, [1.5, 2]]),
+        ('empty', [[], []]),
+        ('bools', [True, False]),
+        ('nested', [[1, 2], [3.5, 4]]),
+    ])
+
+    for name, obj in [('misc', misc), ('MapSet', mapset), ('TransformSet', xforms)]:
+        json_str = dumps(obj)
+        t0 = time.time()
+        ref = json.loads(json_str, cls=ParseTimeDecoder, object_pairs_hook=OrderedDict)
+        t1 = time.time()
+        test = json.loads(json_str, cls=NumpyDecoder, object_pairs_hook=OrderedDict)
+        t2 = time.time()
+        assert_identical(ref, test)
+        logging.debug(
+            '%s (%.1f MiB of JSON): decoding took %.3f s (converting while'
+            ' parsing: %.3f s)', name, len(json_str)/1024**2, t2 - t1, t1 - t0
+        )
+
+    logging.info('<< PASS : test_NumpyDecoder >>')
+
+
 if __name__ == '__main__':
     set_verbosity(1)
     test_to_json_from_json()
+    test_NumpyDecoder()
@@ -11,6 +11,11 @@ Currently, we have three loggers
   (`have x many events`, `the flux is ...`)
 * tprofile: for how much time it takes to run some step (in the format of
   `time : start bla`, `time : stop bla`)
+
+Messages are only built if they are actually emitted, so long as they are
+passed as a format string plus arguments, e.g. ``logging.trace('x = %s', x)``
+rather than ``logging.trace('x = %s' % x)``; wrap arguments that are expensive
+to compute in the first place with `Lazy`.
 """
 
 
@@ -22,10 +27,12 @@ import logging as logging_module
 import logging.config as logging_config
 from os import environ
 from os.path import expanduser, expandvars, isfile, join
+from time import perf_counter
 from pkg_resources import resource_stream
 
 
-__all__ = ['Levels', 'logging', 'physics', 'tprofile', 'set_verbosity']
+__all__ = ['Levels', 'Lazy', 'logging', 'physics', 'tprofile',
+           'set_verbosity', 'test_Lazy']
 
 __author__ = 'S. Boeser'
 
@@ -57,6 +64,37 @@ class Levels(enum.IntEnum):
     TRACE = 3  # pass "-vvv" at command line
 
 
+class Lazy(object):
+    """Argument to a logging call that is only computed, as
+    ``func(*args, **kwargs)``, once the message is formatted, i.e. not at all
+    if the message's level is below the logger's.
+
+    Parameters
+    ----------
+    func : callable
+    *args, **kwargs
+        Passed to `func`
+
+    Examples
+    --------
+    >>> logging.trace('Bins not found in other = %s',
+    ...               Lazy(my_edges.difference, other_edges))
+
+    """
+    __slots__ = ('func', 'args', 'kwargs')
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.func(*self.args, **self.kwargs))
+
+    def __repr__(self):
+        return repr(self.func(*self.args, **self.kwargs))
+
+
 def initialize_logging():
     """Intializing PISA logging"""
     # Add a trace level
@@ -64,7 +102,8 @@ def initialize_logging():
     logging_module.addLevelName(logging_module.TRACE, 'TRACE')
     def trace(self, message, *args, **kws):
         """Trace-level logging"""
-        self.log(logging_module.TRACE, message, *args, **kws)
+        if self.isEnabledFor(logging_module.TRACE):
+            self._log(logging_module.TRACE, message, args, **kws) # pylint: disable=protected-access
     logging_module.Logger.trace = trace
     logging_module.RootLogger.trace = trace
     logging_module.trace = logging_module.root.trace
@@ -141,3 +180,51 @@ def set_verbosity(verbosity):
 
 # Make the loggers public
 logging, physics, tprofile = initialize_logging() # pylint: disable=invalid-name
+
+
+def test_Lazy():
+    """Unit tests for `Lazy` class and deferred formatting of log messages,
+    including a benchmark vs. formatting messages eagerly"""
+    calls = []
+
+    def expensive(value):
+        calls.append(value)
+        return value
+
+    orig_levels = logging.level, tprofile.level
+    try:
+        set_verbosity(Levels.DEBUG)
+        logging.trace('value = %s', Lazy(expensive, 1))
+        assert not calls
+        logging.debug('value = %s', Lazy(expensive, 2))
+        assert calls == [2]
+        assert str(Lazy(expensive, 'a')) == 'a'
+        assert repr(Lazy(expensive, 'a')) == "'a'"
+
+        # Per-call cost of a disabled trace message with an argument whose
+        # string representation is expensive (like that of a MapSet)
+        outputs = [float(x) for x in range(1000)]
+        num_iter = 1000
+        t0 = perf_counter()
+        for _ in range(num_iter):
+            logging.trace('outputs: %s' % (outputs,))
+        t1 = perf_counter()
+        for _ in range(num_iter):
+            logging.trace('outputs: %s', outputs)
+        t2 = perf_counter()
+        eager, deferred = (t1 - t0) / num_iter, (t2 - t1) / num_iter
+        logging.debug(
+            'disabled trace message: %.2f us formatting eagerly, %.2f us'
+            ' deferred', eager*1e6, deferred*1e6
+        )
+        assert deferred < eager
+    finally:
+        logging.setLevel(orig_levels[0])
+        tprofile.setLevel(orig_levels[1])
+
+    logging.info('<< PASS : test_Lazy >>')
+
+
+if __name__ == '__main__':
+    set_verbosity(Levels.DEBUG)
+    test_Lazy()
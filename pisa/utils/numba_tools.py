@@ -14,6 +14,7 @@ __all__ = [
     "ctype",
     "ftype",
     "WHERE",
+    "CACHE",
     "myjit",
     "conjugate_transpose",
     "conjugate_transpose_guf",
@@ -91,6 +92,15 @@ else:
     WHERE = "host"
 
 
+CACHE = TARGET != "cuda"
+"""Whether to cache compiled kernels on disk (in `NUMBA_CACHE_DIR`) such that
+they needn't be recompiled by every new process; pass as ``cache=CACHE`` to
+`guvectorize` and `jit` along with ``target=TARGET``, as Numba cannot cache CUDA
+gufuncs. Note that Numba only recompiles a cached kernel if its own source file
+changed, not if a kernel it calls from another file did; remove the cache
+directory after modifying such kernels."""
+
+
 if FTYPE == np.float32:
     FX = "f4"
     CX = "c8"
@@ -107,6 +117,10 @@ def myjit(func):
     near future numba will support numpy array allocation and this will
     not be necessary anymore
 
+    The modified source is compiled with the file name and line numbers of
+    `func`, such that Numba can cache the compiled function on disk (see
+    `CACHE`).
+
     Parameters
     ----------
     func : callable
@@ -125,13 +139,15 @@ def myjit(func):
         new_nb_func = cuda.jit(func, device=True)
 
     else:
-        source = inspect.getsource(func).splitlines()
+        source, first_lineno = inspect.getsourcelines(func)
         assert source[0].strip().startswith("@myjit")
-        source = "\n".join(source[1:]) + "\n"
+        # pad with newlines (in place of the decorator line and the ones above)
+        # to keep line numbers consistent with the original source file
+        source = "\n" * first_lineno + "".join(source[1:])
         source = source.replace("cuda.local.array", "np.empty")
-        exec(source)
+        exec(compile(source, inspect.getsourcefile(func), "exec"))
         new_py_func = eval(func.__name__)
-        new_nb_func = jit(new_py_func, nopython=True)
+        new_nb_func = jit(new_py_func, nopython=True, cache=CACHE)
         # needs to be exported to globals
         globals()[func.__name__] = new_nb_func
 
@@ -157,7 +173,10 @@ def conjugate_transpose(A, B):
 
 
 @guvectorize(
-    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]], "(i, j) -> (j, i)", target=TARGET,
+    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]],
+    "(i, j) -> (j, i)",
+    target=TARGET,
+    cache=CACHE,
 )
 def conjugate_transpose_guf(A, out):
     """gufunc that calls conjugate_transpose"""
@@ -212,7 +231,10 @@ def conjugate(A, B):
 
 
 @guvectorize(
-    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]], "(i, j) -> (i, j)", target=TARGET,
+    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]],
+    "(i, j) -> (i, j)",
+    target=TARGET,
+    cache=CACHE,
 )
 def conjugate_guf(A, out):
     """gufunc that calls `conjugate`"""
@@ -268,6 +290,7 @@ def matrix_dot_matrix(A, B, C):
     [f"({XX}[:, :], {XX}[:, :], {XX}[:, :])" for XX in [FX, CX]],
     "(i, n), (n, j) -> (i, j)",
     target=TARGET,
+    cache=CACHE,
 )
 def matrix_dot_matrix_guf(A, B, out):
     """gufunc that calls matrix_dot_matrix"""
@@ -310,6 +333,7 @@ def matrix_dot_vector(A, v, w):
     [f"({XX}[:, :], {XX}[:], {XX}[:])" for XX in [FX, CX]],
     "(i, j), (j) -> (i)",
     target=TARGET,
+    cache=CACHE,
 )
 def matrix_dot_vector_guf(A, B, out):
     """gufunc that calls matrix_dot_vector"""
@@ -348,7 +372,10 @@ def clear_matrix(A):
 
 
 @guvectorize(
-    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]], "(i, j) -> (i, j)", target=TARGET,
+    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]],
+    "(i, j) -> (i, j)",
+    target=TARGET,
+    cache=CACHE,
 )
 def clear_matrix_guf(dummy, out):  # pylint: disable=unused-argument
     """gufunc that calls `clear_matrix`"""
@@ -385,7 +412,10 @@ def copy_matrix(A, B):
 
 
 @guvectorize(
-    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]], "(i, j) -> (i, j)", target=TARGET,
+    [f"({XX}[:, :], {XX}[:, :])" for XX in [FX, CX]],
+    "(i, j) -> (i, j)",
+    target=TARGET,
+    cache=CACHE,
 )
 def copy_matrix_guf(A, out):
     """gufunc that calls `copy_matrix`"""
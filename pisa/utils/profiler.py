@@ -5,16 +5,32 @@ Tools for profiling code
 
 from __future__ import absolute_import
 
+from collections import OrderedDict, deque
 from functools import wraps
-from time import time
+import json
+import subprocess
+import sys
+from time import perf_counter, time
 
-from line_profiler import LineProfiler
+import numpy as np
 
 # Note this relative import (might be) necessary to avoid circular imports
 from pisa.utils import log
 
 
-__all__ = ['line_profile', 'test_line_profile', 'profile', 'test_profile']
+__all__ = [
+    'IMPORT_TIME_BUDGETS',
+    'get_line_profiler',
+    'line_profile',
+    'test_line_profile',
+    'profile',
+    'test_profile',
+    'TimingRegistry',
+    'TIMINGS',
+    'test_TimingRegistry',
+    'time_import',
+    'test_import_time',
+]
 
 __license__ = '''Copyright (c) 2014-2017, The IceCube Collaboration
 
@@ -44,8 +60,26 @@ class Log(object):
 TLOG = Log()
 """Instance of a global timing logger"""
 
-LINE_PROFILER = LineProfiler()
-"""Instance of a global LineProfiler"""
+IMPORT_TIME_BUDGETS = {
+    'pisa': 3,
+    'pisa.utils.fileio': 4,
+    'pisa.core.binning': 5,
+}
+"""Max seconds it may take to import each module in a fresh interpreter (i.e.,
+the start-up time of any script), see `test_import_time`"""
+
+LINE_PROFILER = None
+"""Instance of a global LineProfiler, created by `get_line_profiler` only once a
+`line_profile`-decorated function is called"""
+
+
+def get_line_profiler():
+    """Get the global `LINE_PROFILER`, instantiating it if necessary"""
+    global LINE_PROFILER  # pylint: disable=global-statement
+    if LINE_PROFILER is None:
+        from line_profiler import LineProfiler  # pylint: disable=import-outside-toplevel
+        LINE_PROFILER = LineProfiler()
+    return LINE_PROFILER
 
 
 def line_profile(func):
@@ -70,15 +104,16 @@ def line_profile(func):
     @wraps(func)
     def profiled_func(*args, **kwargs):
         """<< docstring will be inherited from wrapped `func` >>"""
+        line_profiler = get_line_profiler()
         try:
-            LINE_PROFILER.enable_by_count()
-            LINE_PROFILER.add_function(func)
+            line_profiler.enable_by_count()
+            line_profiler.add_function(func)
             return func(*args, **kwargs)
         finally:
-            LINE_PROFILER.disable_by_count()
+            line_profiler.disable_by_count()
             # Only print if it is the outermost function
-            if LINE_PROFILER.functions[0] == func:
-                LINE_PROFILER.print_stats(stream=TLOG)
+            if line_profiler.functions[0] == func:
+                line_profiler.print_stats(stream=TLOG)
     return profiled_func
 
 
@@ -151,7 +186,281 @@ def test_profile():
     log.logging.info('<< ??? : test_profile >> inspect above outputs')
 
 
+class _TimingStats(object):
+    """Aggregated timings of one name in a `TimingRegistry`"""
+    __slots__ = ('count', 'total', 'min', 'max', 'samples')
+
+    def __init__(self, max_samples):
+        self.count = 0
+        self.total = 0.
+        self.min = np.inf
+        self.max = -np.inf
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, seconds):
+        """Record one timing"""
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+
+class _Timer(object):
+    """Context manager recording the time spent within it to a registry"""
+    __slots__ = ('registry', 'name', 'start_t')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start_t = None
+
+    def __enter__(self):
+        self.start_t = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.record(self.name, perf_counter() - self.start_t)
+
+
+class TimingRegistry(object):
+    """Aggregate the timings of named sections of code (e.g. the compute
+    function of a stage) across any number of calls, keeping the count, total,
+    min, and max of all timings and percentiles of the most recent ones.
+
+    Names are dot-separated, by convention starting with the stage and service
+    name, such as "flux.pi_honda.compute", such that the timings of a stage
+    (or of any other group) can be selected by prefix.
+
+    Parameters
+    ----------
+    max_samples : int
+        Number of most recent timings kept per name for computing percentiles
+
+    enabled : bool
+        Whether to record timings at all
+
+    Examples
+    --------
+    >>> timings = TimingRegistry()
+    >>> with timings.time('stage.service.compute'):
+    ...     pass
+    >>> timings.stats()['stage.service.compute']['count']
+    1
+
+    """
+    PERCENTILES = (50, 90, 99)
+    """Percentiles reported in `stats`"""
+
+    def __init__(self, max_samples=10000, enabled=True):
+        self.max_samples = max_samples
+        self.enabled = enabled
+        self._stats = OrderedDict()
+
+    def record(self, name, seconds):
+        """Record that the code named `name` took `seconds` to run"""
+        if not self.enabled:
+            return
+        try:
+            stats = self._stats[name]
+        except KeyError:
+            stats = self._stats[name] = _TimingStats(self.max_samples)
+        stats.add(seconds)
+
+    def time(self, name):
+        """Context manager recording the time spent within it as `name`"""
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """Use as `@timed(name)` decorator to record the time a function takes
+        to complete"""
+        def decorator(func):
+            @wraps(func)
+            def timed_func(*args, **kwargs):
+                """<< docstring will be inherited from wrapped `func` >>"""
+                with _Timer(self, name):
+                    return func(*args, **kwargs)
+            return timed_func
+        return decorator
+
+    @property
+    def names(self):
+        """list of str : names with timings, in order of first occurrence"""
+        return list(self._stats.keys())
+
+    def _select(self, prefixes):
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        return [
+            name for name in self._stats
+            if prefixes is None or any(name.startswith(p) for p in prefixes)
+        ]
+
+    def reset(self, prefixes=None):
+        """Forget timings of names starting with any of `prefixes` (str or
+        sequence thereof), or of all names if `prefixes` is None"""
+        for name in self._select(prefixes):
+            del self._stats[name]
+
+    def stats(self, prefixes=None):
+        """Statistics of the timings of names starting with any of `prefixes`
+        (str or sequence thereof), or of all names if `prefixes` is None.
+
+        Returns
+        -------
+        stats : OrderedDict
+            Keys are names and values are OrderedDicts with the "count" of
+            timings and their "total", "mean", "min", "max", and percentiles
+            (e.g. "p50") in seconds
+
+        """
+        stats = OrderedDict()
+        for name in self._select(prefixes):
+            entry = self._stats[name]
+            percentiles = np.percentile(entry.samples, self.PERCENTILES)
+            stats[name] = OrderedDict([
+                ('count', entry.count),
+                ('total', entry.total),
+                ('mean', entry.total / entry.count),
+                ('min', entry.min),
+                ('max', entry.max),
+            ])
+            for pct, val in zip(self.PERCENTILES, percentiles):
+                stats[name]['p%d' % pct] = float(val)
+        return stats
+
+    def to_json(self, prefixes=None, filename=None):
+        """Dump `stats` as a JSON string, and to `filename` if specified"""
+        string = json.dumps(self.stats(prefixes), indent=2)
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(string + '\n')
+        return string
+
+    def table(self, prefixes=None):
+        """Format `stats` as a text table, with times in milliseconds"""
+        stats = self.stats(prefixes)
+        columns = ['total', 'mean', 'min', 'max'] + [
+            'p%d' % pct for pct in self.PERCENTILES
+        ]
+        name_width = max([len('name')] + [len(name) for name in stats])
+        lines = [
+            '%s %10s ' % ('name'.ljust(name_width), 'count')
+            + ' '.join('%12s' % (col + ' [ms]') for col in columns)
+        ]
+        for name, entry in stats.items():
+            lines.append(
+                '%s %10d ' % (name.ljust(name_width), entry['count'])
+                + ' '.join('%12.4f' % (entry[col] * 1e3) for col in columns)
+            )
+        return '\n'.join(lines)
+
+
+TIMINGS = TimingRegistry()
+"""Global registry of timings that PISA's pipelines, stages, translation
+functions and analyses record to"""
+
+
+def test_TimingRegistry():
+    """Unit tests for `TimingRegistry` class"""
+    timings = TimingRegistry(max_samples=3)
+
+    for seconds in [4., 1., 2., 3.]:
+        timings.record('a.b.compute', seconds)
+    with timings.time('a.b.apply'):
+        pass
+
+    @timings.timed('c.d.apply')
+    def func():
+        return 'result'
+
+    assert func() == 'result'
+    assert timings.names == ['a.b.compute', 'a.b.apply', 'c.d.apply']
+
+    stats = timings.stats('a.b.')
+    assert list(stats.keys()) == ['a.b.compute', 'a.b.apply']
+    compute = stats['a.b.compute']
+    assert compute['count'] == 4
+    assert compute['total'] == 10.
+    assert compute['mean'] == 2.5
+    assert compute['min'] == 1.
+    assert compute['max'] == 4.
+    # percentiles only consider the most recent `max_samples` timings
+    assert compute['p50'] == 2.
+    assert 0 <= stats['a.b.apply']['max'] < 1
+
+    assert json.loads(timings.to_json())['c.d.apply']['count'] == 1
+    table = timings.table(['a.b.', 'c.d.'])
+    assert len(table.splitlines()) == 4
+    log.logging.debug('Timings:\n%s', table)
+
+    timings.enabled = False
+    timings.record('a.b.compute', 5.)
+    assert timings.stats()['a.b.compute']['count'] == 4
+
+    timings.reset('a.')
+    assert timings.names == ['c.d.apply']
+    timings.reset()
+    assert not timings.names
+
+    log.logging.info('<< PASS : test_TimingRegistry >>')
+
+
+def time_import(module):
+    """Time importing `module` in a fresh Python interpreter.
+
+    Parameters
+    ----------
+    module : str
+        Full path of the module, e.g. "pisa.core.binning"
+
+    Returns
+    -------
+    seconds : float
+        Time it took to import `module`
+    modules : list of str
+        Names of all modules loaded after importing `module`
+
+    """
+    code = (
+        'import json, sys, time\n'
+        't0 = time.time()\n'
+        f'import {module}\n'
+        't1 = time.time()\n'
+        'print(json.dumps([t1 - t0, sorted(sys.modules)]))\n'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    seconds, modules = json.loads(output.splitlines()[-1])
+    return seconds, modules
+
+
+def test_import_time():
+    """Unit tests for start-up time, i.e. for the time it takes to import
+    modules that every script uses (see `IMPORT_TIME_BUDGETS`)"""
+    for module, budget in IMPORT_TIME_BUDGETS.items():
+        seconds, modules = time_import(module)
+        log.logging.info('importing %s took %.3f s', module, seconds)
+        assert seconds < budget, \
+                f'importing {module} took {seconds:.3f} s > {budget} s'
+
+        # slow to import or to initialize, so deferred until actually needed
+        for lazy_module in ['line_profiler', 'numba.cuda', 'pisa.core.pipeline']:
+            assert lazy_module not in modules, \
+                    f'importing {module} also imported {lazy_module}'
+
+    log.logging.info('<< PASS : test_import_time >>')
+
+
 if __name__ == '__main__':
     log.set_verbosity(2)
     test_line_profile()
     test_profile()
+    test_TimingRegistry()
+    test_import_time()
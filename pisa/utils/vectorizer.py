@@ -14,7 +14,7 @@ from numba import guvectorize, SmartArray
 
 from pisa import FTYPE, TARGET
 from pisa.utils.log import logging, set_verbosity
-from pisa.utils.numba_tools import WHERE
+from pisa.utils.numba_tools import CACHE, WHERE
 
 
 __all__ = [
@@ -48,7 +48,7 @@ def scale(vals, scale, out):
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}, {FX}[:])"], "(), () -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}, {FX}[:])"], "(), () -> ()", target=TARGET, cache=CACHE)
 def scale_gufunc(vals, scale, out):
     out[0] = vals[0] * scale
 
@@ -66,7 +66,7 @@ def mul(vals0, vals1, out):
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}[:], {FX}[:])"], "(), () -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}[:], {FX}[:])"], "(), () -> ()", target=TARGET, cache=CACHE)
 def mul_gufunc(vals0, vals1, out):
     out[0] = vals0[0] * vals1[0]
 
@@ -84,7 +84,7 @@ def imul(vals, out):
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET, cache=CACHE)
 def imul_gufunc(vals, out):
     out[0] *= vals[0]
 
@@ -102,7 +102,7 @@ def imul_and_scale(vals, scale, out):
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}, {FX}[:])"], "(), () -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}, {FX}[:])"], "(), () -> ()", target=TARGET, cache=CACHE)
 def imul_and_scale_gufunc(vals, scale, out):
     out[0] *= vals[0] * scale
 
@@ -130,7 +130,7 @@ def itruediv(vals, out):
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET, cache=CACHE)
 def itruediv_gufunc(vals, out):
     if vals[0] == 0.0:
         out[0] = 0.0
@@ -151,7 +151,7 @@ def assign(vals, out):  # pylint: disable=redefined-builtin
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET, cache=CACHE)
 def assign_gufunc(vals, out):
     out[0] = vals[0]
 
@@ -169,7 +169,7 @@ def pow(vals, pwr, out):  # pylint: disable=redefined-builtin
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}, {FX}[:])"], "(), () -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}, {FX}[:])"], "(), () -> ()", target=TARGET, cache=CACHE)
 def pow_gufunc(vals, pwr, out):
     out[0] = vals[0] ** pwr
 
@@ -187,7 +187,7 @@ def sqrt(vals, out):
     out.mark_changed(WHERE)
 
 
-@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}[:])"], "() -> ()", target=TARGET, cache=CACHE)
 def sqrt_gufunc(vals, out):
     out[0] = math.sqrt(vals[0])
 
@@ -202,7 +202,7 @@ def replace_where_counts_gt(vals, counts, min_count, out):
     )
 
 
-@guvectorize([f"({FX}[:], {FX}[:], {FX}, {FX}[:])"], "(), (), () -> ()", target=TARGET)
+@guvectorize([f"({FX}[:], {FX}[:], {FX}, {FX}[:])"], "(), (), () -> ()", target=TARGET, cache=CACHE)
 def replace_where_counts_gt_gufunc(vals, counts, min_count, out):
     """Replace `out[i]` with `vals[i]` where `counts[i]` > `min_count`"""
     if counts[0] > min_count:
@@ -90,7 +90,7 @@ INSTALL_REQUIRES = [
     'matplotlib>=3.0', # 1.5: inferno colormap; 2.0: 'C0' colorspec
     'numba==0.45.1', # >=0.35: fastmath jit flag; >=0.38: issue #439; 0.44 segfaults; 0.46 removes SmartArray
     'numpy>=1.17',
-    'pint>=0.8.1', # see https://github.com/hgrecco/pint/issues/512
+    'pint>=0.9', # >=0.8.1: issue #512; >=0.9: set_application_registry
     'scipy>=0.17',
     'simplejson>=3.2',
     'tables',
@@ -293,6 +293,7 @@ def do_setup():
                 'pisa-postproc = pisa.scripts.analysis_postprocess:main',
                 'pisa-compare = pisa.scripts.compare:main',
                 'pisa-convert_config_format = pisa.scripts.convert_config_format:main',
+                'pisa-convert_hypersurfaces = pisa.scripts.convert_hypersurfaces:main',
                 'pisa-fit_discrete_sys = pisa.scripts.fit_discrete_sys:main',
                 'pisa-fit_discrete_sys_nd = pisa.scripts.fit_discrete_sys_nd:main',
                 'pisa-make_asymmetry_plots = pisa.scripts.make_asymmetry_plots:main',
@@ -302,6 +303,7 @@ def do_setup():
                 'pisa-make_toy_events = pisa.scripts.make_toy_events:main',
                 'pisa-profile_scan = pisa.scripts.profile_scan:main',
                 'pisa-scan_allsyst = pisa.scripts.scan_allsyst:main',
+                'pisa-warmup = pisa.scripts.warmup:main',
 
                 # Scripts in pisa_tests dir
                 'pisa-test_changes_with_combined_pidreco = pisa_tests.test_changes_with_combined_pidreco:main',